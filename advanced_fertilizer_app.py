@@ -1,15 +1,33 @@
 
-import streamlit as st
-import pandas as pd
+from startup_timing import import_timer, lazy_import, mark_first_render, rerun_report, rerun_timer, startup_report
+with import_timer("streamlit"):
+    import streamlit as st
+with import_timer("pandas"):
+    import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from sklearn.ensemble import RandomForestRegressor
-import folium
-from streamlit_folium import st_folium
+import functools
 import json
 from datetime import datetime, timedelta
 import requests
+import os
+import tempfile
+from config import AppConfig
+from recommendations import (
+    COLOR_N_MAP, TEXTURE_PK_MAP, YIELD_MAP, TARGET_MAP, process_visual_assessment, visual_soil_estimates
+)
+from yield_model import yield_model_available
+from reference_data import load_lga_reference
+from ingest import OUTPUT_FORMATS, stream_bulk_recommendations
+from analytics import track_usage
+from trial_analysis import ANALYSIS_TYPES, analyze_upload
+from parallel import shard_report, sharded
+from prices import get_price_service
+from schema import memory_report
+from upload_cache import cached_upload
+from experimental_design import (
+    DESIGN_TYPES, EXPORT_FORMATS, export_design, incomplete_factorial, randomized_complete_block, split_plot
+)
+from instrumentation import stage_report, timed
 
 # Page configuration
 st.set_page_config(
@@ -75,6 +93,17 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 def main():
+    with rerun_timer("app"):
+        render_app()
+
+    mark_first_render()
+    if AppConfig.DEBUG:
+        display_startup_timing()
+        display_stage_latency()
+        display_memory_report()
+        display_shard_timing()
+
+def render_app():
     # Main header
     st.markdown("""
     <div class="main-header">
@@ -95,6 +124,11 @@ def main():
         ["👨‍🌾 Farmer (Manomi)", "🎓 Extension Agent", "🔬 Researcher", "🏛️ Policy Maker"]
     )
 
+    # Every widget interaction reruns the script; count a view only when the page changes
+    if st.session_state.get('viewed_page') != user_type:
+        st.session_state.viewed_page = user_type
+        track_usage('page_view', user_type, {'language': languages[selected_lang]})
+
     if user_type == "👨‍🌾 Farmer (Manomi)":
         farmer_interface()
     elif user_type == "🎓 Extension Agent":
@@ -104,6 +138,40 @@ def main():
     elif user_type == "🏛️ Policy Maker":
         policy_interface()
 
+def display_startup_timing():
+    """Show per-module import times, time to first render and recent reruns in the sidebar"""
+    with st.sidebar.expander("⏱️ Startup Timing"):
+        st.dataframe(pd.DataFrame(startup_report()), hide_index=True)
+        st.markdown("**Recent reruns**")
+        st.dataframe(pd.DataFrame(rerun_report(), columns=["scope", "seconds"]), hide_index=True)
+
+def display_stage_latency():
+    """Show per-stage call counts and p50/p95/p99 latency in the sidebar"""
+    with st.sidebar.expander("📈 Stage Latency"):
+        report = stage_report()
+        if report:
+            st.dataframe(pd.DataFrame(report).round(3), hide_index=True)
+        else:
+            st.caption("No instrumented stages have run yet")
+
+def display_memory_report():
+    """Show each compacted frame's footprint before and after dtype narrowing in the sidebar"""
+    with st.sidebar.expander("🧮 Frame Memory"):
+        report = memory_report()
+        if report:
+            st.dataframe(pd.DataFrame(report).round(2), hide_index=True)
+        else:
+            st.caption("No frames have been compacted yet")
+
+def display_shard_timing():
+    """Show per-shard compute and wall time of recent process-pool bulk steps in the sidebar"""
+    with st.sidebar.expander("🧵 Shard Timing"):
+        report = shard_report()
+        if report:
+            st.dataframe(pd.DataFrame(report).round(3), hide_index=True)
+        else:
+            st.caption("No sharded bulk steps have run yet")
+
 def farmer_interface():
     """Simplified interface for farmers"""
     st.header("👨‍🌾 Farmer Dashboard / Dashboard na Manomi")
@@ -113,163 +181,121 @@ def farmer_interface():
 
     with col1:
         st.subheader("🧪 Simple Soil Assessment")
+        farm_location_selector()
+        farmer_input_form()
 
-        # Simplified inputs
-        state = st.selectbox("State", ["Kaduna", "Kano", "Katsina", "Sokoto", "Kebbi"])
-        lga = st.selectbox("Local Government Area", ["Select your LGA", "Kaduna North", "Kaduna South"])
-
+    with col2:
+        farmer_results_panel()
+
+@st.fragment
+def farm_location_selector():
+    """State and LGA pickers; the LGA list depends on the state, so changes rerun only this fragment"""
+    with rerun_timer("farm_location_selector"):
+        lga_reference = load_lga_reference()
+        state = st.selectbox("State", AppConfig.SUPPORTED_STATES, key="farmer_state")
+        lga = st.selectbox("Local Government Area", ["Select your LGA"] + lga_reference.lgas(state),
+                           key="farmer_lga")
+
+        lga_profile = lga_reference.lookup(state, lga)
+        if lga_profile:
+            st.caption(f"📍 {lga} typical soil: N {lga_profile['N_status']}, "
+                       f"P {lga_profile['P_status']}, K {lga_profile['K_status']} · "
+                       f"LGA guide rate {lga_profile['N_rec_kg_ha']}-{lga_profile['P_rec_kg_ha']}-"
+                       f"{lga_profile['K_rec_kg_ha']} kg/ha N-P-K")
+
+def farmer_input_form():
+    """Soil and farm inputs, submitted together so editing them triggers no reruns"""
+    with st.form("farmer_assessment"):
         st.markdown("**🗺️ Farm Location (Optional)**")
         use_gps = st.checkbox("📍 Use current GPS location")
-
-        if not use_gps:
-            latitude = st.number_input("Latitude (if known)", value=11.5, step=0.01)
-            longitude = st.number_input("Longitude (if known)", value=8.5, step=0.01)
+        latitude = st.number_input("Latitude (if known)", value=11.5, step=0.01)
+        longitude = st.number_input("Longitude (if known)", value=8.5, step=0.01)
 
         st.markdown("**🌱 Soil Information**")
 
         # Visual soil assessment
-        soil_color = st.selectbox("Soil Color", 
-                                ["Very Dark Brown/Black", "Dark Brown", "Brown", "Light Brown", "Red", "Gray"])
-
-        soil_texture = st.selectbox("Soil Feel (when wet)",
-                                  ["Very Sandy (gritty)", "Sandy", "Balanced (loamy)", "Clay-like (sticky)"])
+        soil_color = st.selectbox("Soil Color", list(COLOR_N_MAP))
 
-        previous_yield = st.selectbox("Last Season Yield per Hectare",
-                                    ["Less than 1 ton", "1-2 tons", "2-3 tons", "3-4 tons", "More than 4 tons"])
+        soil_texture = st.selectbox("Soil Feel (when wet)", list(TEXTURE_PK_MAP))
 
-        # Simple soil test results (if available)
-        has_soil_test = st.checkbox("I have professional soil test results")
+        previous_yield = st.selectbox("Last Season Yield per Hectare", list(YIELD_MAP))
 
-        if has_soil_test:
+        # Simple soil test results (if available); a form cannot reveal widgets
+        # before it is submitted, so they sit in an expander instead
+        with st.expander("🧪 Professional soil test results"):
+            has_soil_test = st.checkbox("I have professional soil test results")
             n_percent = st.number_input("Nitrogen (%)", min_value=0.1, max_value=5.0, value=1.2)
             p_ppm = st.number_input("Phosphorus (ppm)", min_value=1.0, max_value=100.0, value=15.0)
             k_ppm = st.number_input("Potassium (ppm)", min_value=50.0, max_value=500.0, value=180.0)
             ph = st.number_input("Soil pH", min_value=4.0, max_value=9.0, value=6.2)
 
         farm_size = st.number_input("Farm Size (hectares)", min_value=0.1, max_value=100.0, value=2.0)
-        target_yield = st.selectbox("Target Yield this Season",
-                                  ["2 tons/ha", "3 tons/ha", "4 tons/ha", "5 tons/ha"])
-
-        if st.button("🔬 Get My Fertilizer Recommendation", type="primary"):
-            # Process visual assessment
-            recommendations = process_visual_assessment(
-                soil_color, soil_texture, previous_yield, target_yield, farm_size, has_soil_test,
-                n_percent if has_soil_test else None,
-                p_ppm if has_soil_test else None,
-                k_ppm if has_soil_test else None,
-                ph if has_soil_test else None
+        target_yield = st.selectbox("Target Yield this Season", list(TARGET_MAP))
+
+        submitted = st.form_submit_button("🔬 Get My Fertilizer Recommendation", type="primary")
+
+    if submitted:
+        # Process visual assessment
+        recommendations = process_visual_assessment(
+            soil_color, soil_texture, previous_yield, target_yield, farm_size, has_soil_test,
+            n_percent if has_soil_test else None,
+            p_ppm if has_soil_test else None,
+            k_ppm if has_soil_test else None,
+            ph if has_soil_test else None,
+            state=st.session_state.farmer_state
+        )
+        if yield_model_available():
+            soil = (n_percent, p_ppm, k_ppm) if has_soil_test else visual_soil_estimates(soil_color, soil_texture)
+            recommendations['model_yield'] = predict_farmer_yield(
+                recommendations, soil, ph if has_soil_test else None,
+                None if use_gps else latitude, None if use_gps else longitude,
+                YIELD_MAP[previous_yield]
             )
-            st.session_state.farmer_rec = recommendations
-
-    with col2:
+        recommendations['farm'] = {
+            'farm_size': farm_size,
+            'location': ", ".join(part for part in (st.session_state.farmer_lga, st.session_state.farmer_state)
+                                  if part and part != "Select your LGA")
+        }
+        st.session_state.farmer_rec = recommendations
+        economics = recommendations['economics']
+        baseline = economics['expected_yield'] - economics['yield_increase']
+        track_usage('recommendation_generated', details={'state': st.session_state.farmer_state},
+                    value=100 * economics['yield_increase'] / baseline if baseline > 0 else None)
+        save_farmer_recommendation(recommendations)
+
+@st.fragment
+def farmer_results_panel():
+    """Results column; its own widgets rerun only this fragment"""
+    with rerun_timer("farmer_results_panel"):
         if 'farmer_rec' in st.session_state:
             display_farmer_recommendations(st.session_state.farmer_rec)
 
-def process_visual_assessment(soil_color, soil_texture, prev_yield, target_yield, 
-                            farm_size, has_test=False, n=None, p=None, k=None, ph=None):
-    """Process visual soil assessment into recommendations"""
-
-    # Convert qualitative to quantitative estimates
-    color_n_map = {
-        "Very Dark Brown/Black": 2.0,
-        "Dark Brown": 1.5,
-        "Brown": 1.2,
-        "Light Brown": 0.8,
-        "Red": 0.9,
-        "Gray": 0.7
-    }
-
-    texture_pk_map = {
-        "Very Sandy (gritty)": {"p": 8, "k": 80},
-        "Sandy": {"p": 12, "k": 120},
-        "Balanced (loamy)": {"p": 20, "k": 200},
-        "Clay-like (sticky)": {"p": 25, "k": 250}
-    }
-
-    yield_map = {
-        "Less than 1 ton": 800,
-        "1-2 tons": 1500,
-        "2-3 tons": 2500,
-        "3-4 tons": 3500,
-        "More than 4 tons": 4500
-    }
-
-    target_map = {
-        "2 tons/ha": 2000,
-        "3 tons/ha": 3000,
-        "4 tons/ha": 4000,
-        "5 tons/ha": 5000
-    }
-
-    # Use test results if available, otherwise estimate
-    if has_test and all([n, p, k, ph]):
-        n_est, p_est, k_est = n, p, k
-    else:
-        n_est = color_n_map.get(soil_color, 1.2)
-        p_est = texture_pk_map.get(soil_texture, {"p": 15})["p"]
-        k_est = texture_pk_map.get(soil_texture, {"k": 150})["k"]
-
-    # Calculate recommendations
-    return calculate_simple_recommendations(
-        n_est, p_est, k_est, 
-        yield_map[prev_yield], 
-        target_map[target_yield], 
-        farm_size
-    )
-
-def calculate_simple_recommendations(n_percent, p_ppm, k_ppm, prev_yield, target_yield, farm_size):
-    """Simplified recommendation calculation"""
-
-    # Limitation assessment
-    n_limitation = "High" if n_percent < 1.0 else "Medium" if n_percent < 1.5 else "Low"
-    p_limitation = "High" if p_ppm < 15 else "Medium" if p_ppm < 25 else "Low"
-    k_limitation = "High" if k_ppm < 120 else "Medium" if k_ppm < 200 else "Low"
-
-    # Base rates (kg/ha)
-    base_n = 80 if n_limitation == "High" else 60 if n_limitation == "Medium" else 40
-    base_p = 50 if p_limitation == "High" else 35 if p_limitation == "Medium" else 25
-    base_k = 40 if k_limitation == "High" else 30 if k_limitation == "Medium" else 20
-
-    # Adjust for yield target
-    yield_factor = min(target_yield / 3000, 1.5)
-
-    n_rec = base_n * yield_factor
-    p_rec = base_p * yield_factor
-    k_rec = base_k * yield_factor
-
-    # Convert to fertilizer products
-    urea_needed = (n_rec / 0.46) * farm_size  # Urea is 46% N
-    dap_needed = (p_rec / 0.46) * farm_size   # DAP is 46% P2O5
-    mop_needed = (k_rec / 0.60) * farm_size   # MOP is 60% K2O
-
-    # Economic analysis
-    fertilizer_cost = (n_rec * 1.2 + p_rec * 2.5 + k_rec * 1.0) * farm_size
-    expected_yield = min(prev_yield * 1.3, target_yield)
-    yield_increase = expected_yield - prev_yield
-
-    revenue_increase = yield_increase * farm_size * 0.45  # USD/kg maize price
-    net_profit = revenue_increase - fertilizer_cost
-    roi = (net_profit / fertilizer_cost * 100) if fertilizer_cost > 0 else 0
-
-    return {
-        'limitations': {'N': n_limitation, 'P': p_limitation, 'K': k_limitation},
-        'fertilizers': {
-            'urea_kg': urea_needed,
-            'dap_kg': dap_needed,
-            'mop_kg': mop_needed
-        },
-        'rates': {'N': n_rec, 'P2O5': p_rec, 'K2O': k_rec},
-        'economics': {
-            'total_cost': fertilizer_cost,
-            'expected_yield': expected_yield,
-            'yield_increase': yield_increase,
-            'revenue_increase': revenue_increase,
-            'net_profit': net_profit,
-            'roi': roi
-        },
-        'farm_size': farm_size
-    }
-
+def predict_farmer_yield(rec, soil, ph, latitude, longitude, prev_yield):
+    """Yield predicted by the trained model for the recommended rates"""
+    from yield_model import predict_yield
+
+    farm = pd.DataFrame([{
+        'n_percent': soil[0], 'p_ppm': soil[1], 'k_ppm': soil[2], 'ph': ph,
+        'n_rate': rec['rates']['N'], 'p_rate': rec['rates']['P2O5'], 'k_rate': rec['rates']['K2O'],
+        'latitude': latitude, 'longitude': longitude, 'previous_yield': prev_yield
+    }])
+    return float(predict_yield(farm)[0])
+
+def save_farmer_recommendation(rec):
+    """Queue a farmer-page recommendation for the background database writer"""
+    from database import current_season, get_recommendation_writer
+
+    get_recommendation_writer().submit({
+        'season': current_season(),
+        'n_rate': rec['rates']['N'],
+        'p_rate': rec['rates']['P2O5'],
+        'k_rate': rec['rates']['K2O'],
+        'previous_yield': rec['economics']['expected_yield'] - rec['economics']['yield_increase'],
+        'predicted_yield': rec['economics']['expected_yield'],
+        'cost_estimate': rec['economics']['total_cost']
+    })
+
+@timed("app.display_farmer_recommendations")
 def display_farmer_recommendations(rec):
     """Display recommendations in farmer-friendly format"""
 
@@ -341,6 +367,9 @@ def display_farmer_recommendations(rec):
         else:
             st.metric("Investment Period", "1 Season", "Break-even expected")
 
+    if 'model_yield' in rec:
+        st.info(f"🤖 Our yield model predicts about {rec['model_yield']:,.0f} kg/ha with these rates")
+
     # Application instructions
     st.markdown("### 📅 Application Instructions")
 
@@ -366,9 +395,12 @@ def display_farmer_recommendations(rec):
     st.markdown(instructions)
     st.markdown('</div>', unsafe_allow_html=True)
 
-    # Download recommendation
-    if st.button("📄 Download Recommendation Report"):
-        create_farmer_report(rec)
+    # Download recommendation; the PDF is rendered once per recommendation, not on every fragment rerun
+    report = st.session_state.get('farmer_report')
+    if report is None or report['rec'] is not rec:
+        report = st.session_state.farmer_report = {'rec': rec, 'pdf': create_farmer_report(rec)}
+    st.download_button("📄 Download Recommendation Report", report['pdf'],
+                       file_name="fertilizer_recommendation.pdf", mime="application/pdf")
 
 def extension_interface():
     """Interface for extension agents"""
@@ -382,14 +414,35 @@ def extension_interface():
         # Upload farmer list
         uploaded_file = st.file_uploader("📄 Upload Farmer List (Excel/CSV)", type=['xlsx', 'csv'])
 
-        if uploaded_file:
-            df = pd.read_excel(uploaded_file) if uploaded_file.name.endswith('.xlsx') else pd.read_csv(uploaded_file)
-            st.success(f"✅ Loaded {len(df)} farmers")
-            st.dataframe(df.head())
+        upload = load_upload(uploaded_file) if uploaded_file else None
+        if upload:
+            st.success(f"✅ Received {uploaded_file.name} ({upload.rows:,} farmers, "
+                       f"{uploaded_file.size / 1e6:.1f} MB)")
+            st.dataframe(upload.preview)
+
+            output_format = st.radio("Output format", list(OUTPUT_FORMATS.keys()), horizontal=True)
+            save_to_db = st.checkbox("💾 Save farmers and recommendations to the database")
+            add_weather = st.checkbox("🌦️ Add rainfall timing advice (needs latitude/longitude columns)")
+            add_optimum = st.checkbox("💹 Add economic-optimum rates (optional budget_usd column caps spend)")
+            add_model_yield = st.checkbox("🤖 Add model-predicted yield", disabled=not yield_model_available())
 
             if st.button("🔬 Generate Bulk Recommendations"):
-                st.info("Processing recommendations for all farmers...")
-                # Bulk processing logic here
+                run_bulk_recommendations(upload, OUTPUT_FORMATS[output_format], save_to_db,
+                                         add_weather, add_optimum, add_model_yield)
+
+            if 'bulk_output' in st.session_state:
+                output = st.session_state.bulk_output
+                with open(output['path'], 'rb') as result_file:
+                    st.download_button(f"📥 Download Recommendations ({output['rows']:,} farmers)",
+                                       result_file, file_name=output['file_name'], mime=output['mime'])
+
+                if st.button("🖨️ Generate Farmer Reports (PDF)"):
+                    run_bulk_reports(output)
+                if 'bulk_reports' in st.session_state:
+                    reports_zip = st.session_state.bulk_reports
+                    with open(reports_zip['path'], 'rb') as zip_file:
+                        st.download_button(f"📥 Download {reports_zip['count']:,} Farmer Reports (ZIP)", zip_file,
+                                           file_name="farmer_reports.zip", mime="application/zip")
 
         # Manual farmer addition
         st.markdown("**➕ Add New Farmer**")
@@ -402,7 +455,13 @@ def extension_interface():
             farm_size = st.number_input("Farm Size (ha)", min_value=0.1, value=2.0)
 
         if st.button("➕ Add Farmer"):
-            st.success(f"Added farmer: {farmer_name}")
+            if not farmer_name.strip():
+                st.error("Please enter the farmer's name")
+            else:
+                from database import add_farmer
+                farmer_id = add_farmer(farmer_name.strip(), farmer_phone or None,
+                                       farmer_location or None, farm_size)
+                st.success(f"Added farmer: {farmer_name} (ID {farmer_id})")
 
     with tab2:
         st.subheader("📊 Bulk Soil Analysis")
@@ -412,8 +471,10 @@ def extension_interface():
         with col1:
             analysis_type = st.selectbox("Analysis Type", 
                                        ["Ward Level", "LGA Level", "State Level"])
-            location = st.selectbox("Select Location", 
-                                  ["Kaduna North", "Kaduna South", "Kano Municipal"])
+            lga_reference = load_lga_reference()
+            location = st.selectbox("Select Location",
+                                  [f"{lga}, {state}" for state in lga_reference.states()
+                                   for lga in lga_reference.lgas(state)])
 
         with col2:
             season = st.selectbox("Season", ["2024 Wet Season", "2024 Dry Season", "2025 Wet Season"])
@@ -425,17 +486,7 @@ def extension_interface():
     with tab3:
         st.subheader("📈 Impact Tracking Dashboard")
 
-        # Sample impact metrics
-        col1, col2, col3, col4 = st.columns(4)
-
-        with col1:
-            st.metric("Farmers Reached", "245", "+23 this month")
-        with col2:
-            st.metric("Avg Yield Increase", "35%", "+5% vs last season")
-        with col3:
-            st.metric("Total Area (ha)", "680", "+120 ha this season")
-        with col4:
-            st.metric("Adoption Rate", "78%", "+12% improvement")
+        display_impact_metrics()
 
         # Impact charts
         create_impact_charts()
@@ -466,6 +517,109 @@ def extension_interface():
             for item in items:
                 st.markdown(f"• {item}")
 
+def display_impact_metrics():
+    """Impact tiles computed by aggregate queries over the tracking tables"""
+    from database import get_session
+    from impact import impact_summary, start_impact_refresher
+
+    start_impact_refresher()
+    with get_session() as session:
+        summary = impact_summary(session)
+
+    if summary['farmers_reached'] == 0:
+        st.info("No recommendations recorded yet. Save bulk recommendations to start tracking impact.")
+        return
+
+    # Season-over-season change, when at least two seasons have adoption records
+    by_season = summary['by_season']
+    adoption_delta = gain_delta = None
+    if len(by_season) >= 2:
+        latest, previous = by_season.iloc[-1], by_season.iloc[-2]
+        adoption_delta = f"{(latest['adoption_rate'] - previous['adoption_rate']) * 100:+.0f}% vs last season"
+        if pd.notna(latest['avg_yield_gain']) and pd.notna(previous['avg_yield_gain']):
+            gain_delta = f"{latest['avg_yield_gain'] - previous['avg_yield_gain']:+.0f} kg/ha vs last season"
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("Farmers Reached", f"{summary['farmers_reached']:,}")
+    with col2:
+        avg_gain = summary['avg_yield_gain']
+        st.metric("Avg Yield Gain", f"{avg_gain:.0f} kg/ha" if avg_gain is not None else "—", gain_delta)
+    with col3:
+        st.metric("Total Area (ha)", f"{summary['area_ha']:,.0f}")
+    with col4:
+        adoption = summary['adoption_rate']
+        st.metric("Adoption Rate", f"{adoption:.0%}" if adoption is not None else "—", adoption_delta)
+
+def load_upload(uploaded_file):
+    """Parsed upload from the content-hashed cache, or None after showing why it could not be read"""
+    try:
+        return cached_upload(uploaded_file)
+    except ValueError as e:
+        st.error(f"Could not read {uploaded_file.name}: {e}")
+        return None
+
+def run_bulk_recommendations(upload, fmt, save_to_db=False, add_weather=False, add_optimum=False,
+                             add_model_yield=False):
+    """Stream a cached farmer list upload through the bulk engine into a temp file"""
+
+    for key in ('bulk_output', 'bulk_reports'):
+        previous = st.session_state.pop(key, None)
+        if previous and os.path.exists(previous['path']):
+            os.remove(previous['path'])
+
+    suffix = f".{fmt}"
+    fd, output_path = tempfile.mkstemp(prefix="bulk_recommendations_", suffix=suffix)
+    os.close(fd)
+
+    progress_bar = st.progress(0.0, text="Processing recommendations for all farmers...")
+
+    def report_progress(rows_done, fraction):
+        progress_bar.progress(fraction if fraction is not None else 0.0,
+                              text=f"Processed {rows_done:,} farmers...")
+
+    try:
+        on_chunk = None
+        if save_to_db:
+            from database import persist_bulk_chunk
+            on_chunk = persist_bulk_chunk
+        transforms = []
+        if add_weather:
+            from weather import get_weather_service
+            transforms.append(get_weather_service().attach_rainfall_advice)
+        # One snapshot prices the run, including the optimum step in every worker
+        snapshot = get_price_service().snapshot()
+        # CPU-bound steps are sharded by state across the process pool
+        if add_optimum:
+            from recommendations import add_optimal_rates
+            transforms.append(sharded(functools.partial(add_optimal_rates, snapshot=snapshot)))
+        if add_model_yield:
+            from yield_model import add_model_yield as predict_model_yield
+            transforms.append(sharded(predict_model_yield))
+
+        def transform(results):
+            for step in transforms:
+                results = step(results)
+            return results
+
+        rows = stream_bulk_recommendations(upload.path, output_path, fmt=fmt, progress=report_progress,
+                                           on_chunk=on_chunk, transform=transform, snapshot=snapshot)
+    except ValueError as e:
+        os.remove(output_path)
+        st.error(str(e))
+        return
+
+    progress_bar.progress(1.0, text=f"Processed {rows:,} farmers")
+    track_usage('bulk_recommendation', details={'format': fmt}, value=rows)
+    st.success(f"✅ Generated {rows:,} recommendations")
+    st.session_state.bulk_output = {
+        'path': output_path,
+        'rows': rows,
+        'file_name': f"bulk_recommendations{suffix}",
+        'mime': "application/octet-stream" if fmt == "parquet" else "text/csv"
+    }
+
 def researcher_interface():
     """Interface for researchers"""
     st.header("🔬 Research Dashboard")
@@ -479,18 +633,37 @@ def researcher_interface():
                                 ["Fertilizer Response Trial", "Variety x Nutrition Study", 
                                  "Farmer Participatory Research", "On-station Trial"])
 
+        design_type = st.selectbox("Design", DESIGN_TYPES)
+
         col1, col2 = st.columns(2)
         with col1:
-            treatments = st.number_input("Number of Treatments", min_value=2, max_value=20, value=6)
+            if design_type == "Split-Plot":
+                treatments = st.number_input("N Levels (main plots)", min_value=2, max_value=10, value=3)
+                sub_levels = st.number_input("P/K Levels (sub-plots)", min_value=2, max_value=10, value=3)
+            elif design_type == "Incomplete Factorial":
+                treatments = st.selectbox("Levels per Nutrient", [2, 3, 5, 7], index=1)
+                st.caption(f"{treatments ** 2} of {treatments ** 3} N x P x K combinations per block")
+            else:
+                treatments = st.number_input("Number of Treatments", min_value=2, max_value=20, value=6)
             replications = st.number_input("Replications", min_value=3, max_value=10, value=4)
+            locations = st.number_input("Locations", min_value=1, max_value=1000, value=1)
 
         with col2:
             plot_size = st.number_input("Plot Size (m²)", min_value=10, max_value=500, value=100)
             duration = st.selectbox("Study Duration", ["1 Season", "2 Seasons", "3 Seasons"])
+            seed = st.number_input("Randomization Seed", min_value=0, value=2024)
 
         if st.button("🎯 Generate Experimental Design"):
-            st.success("✅ Experimental design generated!")
-            create_experimental_design_demo(treatments, replications)
+            if design_type == "Split-Plot":
+                design = split_plot(treatments, sub_levels, replications, plot_size, locations, seed)
+            elif design_type == "Incomplete Factorial":
+                design = incomplete_factorial(treatments, replications, plot_size, locations, seed)
+            else:
+                design = randomized_complete_block(treatments, replications, plot_size, locations, seed)
+            st.session_state.trial_design = design
+
+        if 'trial_design' in st.session_state:
+            display_experimental_design(st.session_state.trial_design)
 
     with tab2:
         st.subheader("📊 Statistical Analysis Tools")
@@ -499,15 +672,11 @@ def researcher_interface():
         st.markdown("**📤 Upload Research Data**")
         data_file = st.file_uploader("Upload CSV/Excel file", type=['csv', 'xlsx'])
 
-        if data_file:
-            df = pd.read_excel(data_file) if data_file.name.endswith('.xlsx') else pd.read_csv(data_file)
-            st.dataframe(df.head())
-
-            analysis_type = st.selectbox("Analysis Type", 
-                                       ["ANOVA", "Regression", "Correlation", "Mixed Models"])
-
-            if st.button("🔬 Run Statistical Analysis"):
-                run_statistical_analysis_demo(analysis_type)
+        upload = load_upload(data_file) if data_file else None
+        if upload:
+            df = upload.preview
+            st.dataframe(df)
+            research_analysis_controls(upload)
 
     with tab3:
         st.subheader("📈 Advanced Visualizations")
@@ -522,6 +691,33 @@ def researcher_interface():
         if st.button("📝 Generate Report Template"):
             st.success(f"✅ {report_type} template generated!")
 
+def research_analysis_controls(upload):
+    """Analysis type and column choices for an uploaded trial, and the button that runs it"""
+    df = upload.preview
+    columns = list(df.columns)
+    numeric_columns = list(df.select_dtypes('number').columns)
+    if not numeric_columns:
+        st.warning("The uploaded data has no numeric columns to analyse. Include a numeric response such as yield.")
+        return
+
+    analysis_type = st.selectbox("Analysis Type", ANALYSIS_TYPES)
+    response = st.selectbox("Response Variable", numeric_columns,
+                            index=numeric_columns.index('yield') if 'yield' in numeric_columns else 0)
+    factors, predictors, interaction = [], [], False
+    if analysis_type == "ANOVA":
+        factors = st.multiselect("Factors", [c for c in columns if c != response])
+        interaction = st.checkbox("Include interaction of the first two factors")
+    elif analysis_type == "Mixed Models":
+        treatment = st.selectbox("Fixed Effect (treatment)", [c for c in columns if c != response])
+        group = st.selectbox("Random Effect (site/block)",
+                             [c for c in columns if c not in (response, treatment)])
+        factors = [treatment, group]
+    else:
+        predictors = st.multiselect("Predictors", [c for c in numeric_columns if c != response])
+
+    if st.button("🔬 Run Statistical Analysis"):
+        run_statistical_analysis(upload, analysis_type, response, factors, predictors, interaction)
+
 def policy_interface():
     """Interface for policy makers"""
     st.header("🏛️ Policy Dashboard")
@@ -583,6 +779,8 @@ def create_regional_analysis_demo():
     st.dataframe(df)
 
 def create_impact_charts():
+    px = lazy_import("plotly.express")
+
     # Sample yield improvement chart
     months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun']
     adoption = [45, 52, 58, 65, 71, 78]
@@ -591,37 +789,82 @@ def create_impact_charts():
     fig.update_layout(xaxis_title="Month", yaxis_title="Adoption Rate (%)")
     st.plotly_chart(fig, use_container_width=True)
 
-def create_experimental_design_demo(treatments, reps):
-    st.markdown("**🎯 Recommended Experimental Layout:**")
+def display_experimental_design(design):
+    px = lazy_import("plotly.express")
 
-    layout_data = []
-    for rep in range(1, reps + 1):
-        for treat in range(1, treatments + 1):
-            layout_data.append({
-                'Plot_ID': f"R{rep}T{treat}",
-                'Replication': rep,
-                'Treatment': f"Treatment_{treat}",
-                'N_Rate': treat * 20,
-                'P_Rate': treat * 10,
-                'K_Rate': treat * 15
-            })
+    st.markdown("**🎯 Randomized Experimental Layout:**")
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Plots", f"{len(design):,}")
+    col2.metric("Treatments", design['treatment'].nunique())
+    col3.metric("Trial Area", f"{design['plot_area_m2'].sum() / 10_000:,.2f} ha")
+
+    st.dataframe(design.head(200), hide_index=True)
+
+    # Field map of the first location; every location uses the same local coordinates
+    field = design[design['location'] == 1]
+    fig = px.scatter(field, x='x_m', y='y_m', color=field['treatment'].astype(str), symbol_sequence=['square'],
+                     hover_data=['plot_id', 'n_rate', 'p_rate', 'k_rate'],
+                     labels={'x_m': 'x (m)', 'y_m': 'y (m)', 'color': 'Treatment'}, title="Field Map (Location 1)")
+    fig.update_traces(marker_size=14)
+    fig.update_yaxes(scaleanchor='x')
+    st.plotly_chart(fig, use_container_width=True)
 
-    layout_df = pd.DataFrame(layout_data)
-    st.dataframe(layout_df.head(12))
+    export_format = st.radio("Export format", list(EXPORT_FORMATS), horizontal=True, key="design_export_format")
+    fmt = EXPORT_FORMATS[export_format]
+    st.download_button(f"📥 Download Design ({export_format})", export_design(design, fmt),
+                       file_name=f"trial_design.{fmt}",
+                       mime="application/octet-stream" if fmt == "parquet" else "text/csv")
+
+def run_statistical_analysis(upload, analysis_type, response, factors, predictors, interaction=False):
+    """Stream the whole cached upload through the sufficient-statistics engine and show the results"""
+
+    if analysis_type == "ANOVA" and not factors:
+        st.error("Select at least one factor")
+        return
+    if analysis_type in ("Regression", "Correlation") and not predictors:
+        st.error("Select at least one predictor")
+        return
+
+    try:
+        with st.spinner("Analysing all rows..."):
+            stats = analyze_upload(upload.path, response, factors, predictors)
+        if analysis_type == "ANOVA":
+            result = stats.anova(interaction)
+        elif analysis_type == "Regression":
+            result = stats.regression()
+        elif analysis_type == "Correlation":
+            result = stats.correlation()
+        else:
+            result = stats.mixed_model(*factors)
+    except ValueError as e:
+        st.error(str(e))
+        return
 
-def run_statistical_analysis_demo(analysis_type):
-    st.success(f"✅ {analysis_type} analysis completed!")
+    st.success(f"✅ {analysis_type} analysis completed on {stats.n:,} rows")
 
     if analysis_type == "ANOVA":
         st.markdown("**ANOVA Results:**")
-        st.text("""
-        Source          DF    Sum Sq    Mean Sq   F Value   Pr(>F)
-        Treatment        5    125.4      25.08     15.2     <0.001 ***
-        Replication      3     12.3       4.10      2.5     0.089
-        Residuals       15     24.7       1.65
-        """)
+        st.dataframe(result, hide_index=True)
+    elif analysis_type == "Regression":
+        st.markdown("**Regression Coefficients:**")
+        st.dataframe(result['coefficients'], hide_index=True)
+        st.caption(f"R² {result['r_squared']:.3f} · adjusted R² {result['adj_r_squared']:.3f} · "
+                   f"residual SE {result['residual_se']:.2f}")
+    elif analysis_type == "Correlation":
+        st.markdown("**Pearson Correlation Matrix:**")
+        st.dataframe(result.round(3))
+    else:
+        st.markdown("**Treatment Test:**")
+        st.dataframe(result['treatment_test'], hide_index=True)
+        st.markdown("**Treatment Means:**")
+        st.dataframe(result['treatment_means'])
+        st.markdown("**Variance Components:**")
+        st.dataframe(result['variance_components'], hide_index=True)
+        st.caption(f"Intraclass correlation {result['icc']:.3f}")
 
 def create_research_visualizations():
+    px = lazy_import("plotly.express")
+
     # Sample research visualization
     treatments = ['Control', 'N50', 'N100', 'NPK50', 'NPK100', 'NPK150']
     yields = [1800, 2400, 2800, 3200, 3600, 3400]
@@ -630,42 +873,67 @@ def create_research_visualizations():
     fig.update_layout(xaxis_title="Treatment", yaxis_title="Yield (kg/ha)")
     st.plotly_chart(fig, use_container_width=True)
 
+@st.fragment
+@timed("app.create_policy_map")
 def create_policy_map():
-    # Simple map for policy overview
-    st.markdown("**🗺️ Northern Nigeria Nutrient Limitation Map**")
+    from geodata import policy_map_html
+    components = lazy_import("streamlit.components.v1")
 
-    # Sample coordinates for Nigerian states
-    map_center = [11.0, 8.0]
-    m = folium.Map(location=map_center, zoom_start=6)
+    st.markdown("**🗺️ Northern Nigeria Nutrient Limitation Map**")
 
-    # Add sample markers
-    locations = [
-        [10.5, 7.4, "Kaduna", "High N, Medium P"],
-        [12.0, 8.5, "Kano", "Medium N, High P"],
-        [13.0, 5.2, "Katsina", "High N, Low P"]
-    ]
+    reference = load_lga_reference()
+    detail = st.radio("Map detail", list(AppConfig.MAP_DETAIL_LEVELS), horizontal=True)
+    html = policy_map_html(reference, AppConfig.MAP_DETAIL_LEVELS[detail])
 
-    for lat, lon, city, status in locations:
-        folium.Marker([lat, lon], popup=f"{city}: {status}", tooltip=city).add_to(m)
+    if html is None:
+        st.info("LGA boundaries have not been built yet (python geodata.py build <boundaries.geojson>); "
+                "showing the limitation ranking instead.")
+        ranking = reference.frame[["state", "lga_name", "combined_limitation_index", "priority_rank"]]
+        st.dataframe(ranking.sort_values("combined_limitation_index", ascending=False), hide_index=True)
+        return
 
-    st_folium(m, width=700, height=400)
+    # Static HTML: no widget round trip on pan/zoom, and the payload is built once per data version
+    components.html(html, height=450)
+    st.caption(f"Map payload {len(html) / 1024:.0f} KB")
 
 def simulate_policy_impact(subsidy, coverage, budget, years):
-    st.success("🎯 Policy simulation complete!")
+    from policy_simulation import PolicyScenario, run_scenarios
+    px = lazy_import("plotly.express")
 
-    # Sample calculations
-    farmers_reached = int((budget * 1000000 * coverage / 100) / 500)  # Assume $500 per farmer
-    yield_increase = subsidy * 0.8  # Simplified relationship
-    total_production_increase = farmers_reached * 2 * yield_increase / 100 * 1000  # kg
+    # The chosen scenario plus a subsidy sweep, simulated in parallel
+    chosen = PolicyScenario(subsidy, coverage, budget, years)
+    sweep = [PolicyScenario(rate, coverage, budget, years) for rate in range(0, 101, 10)]
+    with st.spinner("Running Monte Carlo simulation..."):
+        results = run_scenarios([chosen] + sweep)
 
+    st.success(f"🎯 Policy simulation complete! ({chosen.n_draws:,} draws per LGA, 90% intervals shown)")
+
+    result = results[0]
     col1, col2, col3 = st.columns(3)
 
+    def interval(metric, scale=1.0):
+        return f"90% CI {result[metric]['p5'] * scale:,.0f} - {result[metric]['p95'] * scale:,.0f}"
+
     with col1:
-        st.metric("Farmers Reached", f"{farmers_reached:,}")
+        st.metric("Farmers Reached", f"{result['farmers_reached']['p50']:,.0f}",
+                  interval('farmers_reached'), delta_color="off")
     with col2:
-        st.metric("Avg Yield Increase", f"{yield_increase:.1f}%")
+        st.metric("Additional Production", f"{result['production_increase_tons']['p50']:,.0f} tons",
+                  interval('production_increase_tons'), delta_color="off")
     with col3:
-        st.metric("Additional Production", f"{total_production_increase:,.0f} tons")
+        st.metric("Additional Farmer Income", f"${result['additional_income_usd']['p50'] / 1e6:,.1f}M",
+                  interval('additional_income_usd', 1e-6) + "M", delta_color="off")
+
+    sweep_df = pd.DataFrame({
+        'Subsidy Rate (%)': [s.subsidy_rate for s in sweep],
+        'Median': [r['production_increase_tons']['p50'] for r in results[1:]],
+        'Low (5%)': [r['production_increase_tons']['p5'] for r in results[1:]],
+        'High (95%)': [r['production_increase_tons']['p95'] for r in results[1:]]
+    })
+    fig = px.line(sweep_df, x='Subsidy Rate (%)', y=['Low (5%)', 'Median', 'High (95%)'],
+                  title="Additional Production by Subsidy Rate")
+    fig.update_layout(yaxis_title="Additional Production (tons)", legend_title="")
+    st.plotly_chart(fig, use_container_width=True)
 
 def create_impact_assessment_dashboard():
     # Sample impact metrics
@@ -690,8 +958,32 @@ def create_impact_assessment_dashboard():
         st.dataframe(pd.DataFrame(economic_data))
 
 def create_farmer_report(recommendations):
-    st.success("📄 Recommendation report ready for download!")
-    # Implementation for PDF generation would go here
+    """PDF report for the farmer page recommendation"""
+    from database import current_season
+    from reports import render_report
+
+    farm = recommendations.get('farm', {})
+    return render_report(recommendations, location=farm.get('location', ''), farm_size=farm.get('farm_size'),
+                         season=current_season())
+
+def run_bulk_reports(output):
+    """Render one PDF per farmer in a bulk output file into a ZIP in a temp file"""
+    from ingest import iter_result_chunks
+    from reports import write_reports_zip
+
+    previous = st.session_state.pop('bulk_reports', None)
+    if previous and os.path.exists(previous['path']):
+        os.remove(previous['path'])
+
+    fd, zip_path = tempfile.mkstemp(prefix="farmer_reports_", suffix=".zip")
+    os.close(fd)
+    progress_bar = st.progress(0.0, text="Rendering farmer reports...")
+
+    def report_progress(done):
+        progress_bar.progress(min(done / output['rows'], 1.0), text=f"Rendered {done:,} reports...")
+
+    count = write_reports_zip(iter_result_chunks(output['path']), zip_path, progress=report_progress)
+    st.session_state.bulk_reports = {'path': zip_path, 'count': count}
 
 if __name__ == "__main__":
     main()
@@ -1,46 +1,208 @@
-# Analytics and Usage Tracking Enhancement
-# Add this to the top of your advanced_fertilizer_app.py file
+# Analytics and usage tracking for Northern Nigeria Fertilizer Advisor
+import atexit
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
 
 import streamlit as st
-from datetime import datetime
-import json
-import os
 
-# Initialize session state for analytics
-if 'session_start' not in st.session_state:
-    st.session_state.session_start = datetime.now()
-    st.session_state.page_views = 0
-    st.session_state.user_type = None
-    st.session_state.recommendations_generated = 0
+from config import AppConfig
+
+logger = logging.getLogger(__name__)
+
+# Logged once per session and never sampled, so sessions can be counted exactly
+SESSION_START_EVENT = "session_start"
+
+EVENTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    ts REAL NOT NULL,
+    event_type TEXT NOT NULL,
+    user_type TEXT,
+    session_id TEXT,
+    value REAL,
+    weight REAL NOT NULL,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_events_type_ts ON events (event_type, ts);
+"""
+
+class EventLog:
+    """Append-only event store fed through an in-memory ring buffer
+
+    record() only appends to a bounded deque, so the calling thread never
+    touches the database. A background thread drains the buffer every
+    flush_interval seconds, or as soon as batch_size events are waiting, and
+    writes each batch in one transaction. When the buffer is full the oldest
+    events are dropped rather than blocking the caller.
+
+    Event types listed in sample_rates are kept with that probability and
+    stored with weight 1/rate, so weighted aggregates stay unbiased.
+    Session starts are always kept.
+    """
+
+    def __init__(self, path: Optional[str] = None, buffer_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None, batch_size: Optional[int] = None,
+                 sample_rates: Optional[Dict[str, float]] = None):
+        self.path = path or AppConfig.ANALYTICS_DB_PATH
+        self.buffer_size = buffer_size or AppConfig.ANALYTICS_BUFFER_SIZE
+        self.flush_interval = flush_interval or AppConfig.ANALYTICS_FLUSH_SECONDS
+        self.batch_size = batch_size or AppConfig.ANALYTICS_BATCH_SIZE
+        self.sample_rates = AppConfig.ANALYTICS_SAMPLE_RATES if sample_rates is None else sample_rates
+        self.dropped = 0
+
+        self._buffer: deque = deque(maxlen=self.buffer_size)
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._write_lock = threading.Lock()
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(EVENTS_SCHEMA)
+
+        self._thread = threading.Thread(target=self._run, name="analytics-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, event_type: str, user_type: Optional[str] = None, session_id: Optional[str] = None,
+               value: Optional[float] = None, details: Optional[Dict] = None):
+        """Buffer one event, subject to sampling; never blocks on I/O"""
+
+        rate = 1.0 if event_type == SESSION_START_EVENT else self.sample_rates.get(event_type, 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            return
+        if len(self._buffer) == self.buffer_size:
+            self.dropped += 1
+        self._buffer.append((time.time(), event_type, user_type, session_id, value, 1.0 / rate, details))
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    def flush(self):
+        """Write every buffered event now"""
+        while self._write_batch():
+            pass
 
-# Simple analytics function
-def track_usage(event_type, user_type=None, details=None):
+    def close(self):
+        self._stopped.set()
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        self._conn.close()
+
+    def _write_batch(self) -> int:
+        with self._write_lock:
+            batch = []
+            while self._buffer and len(batch) < self.batch_size:
+                batch.append(self._buffer.popleft())
+            if not batch:
+                return 0
+            rows = [event[:6] + (json.dumps(event[6], default=str) if event[6] is not None else None,)
+                    for event in batch]
+            try:
+                with self._conn:
+                    self._conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            except sqlite3.Error:
+                logger.exception("Failed to write %d analytics events", len(rows))
+            return len(rows)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _query(self, sql: str, params=()) -> List[tuple]:
+        # Readers get their own connection; WAL lets them run alongside the writer
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def counts(self, since: Optional[float] = None, until: Optional[float] = None) -> Dict[str, float]:
+        """Estimated event count per type (sampling weights applied)"""
+
+        rows = self._query("SELECT event_type, SUM(weight) FROM events WHERE ts >= ? AND ts < ? GROUP BY event_type",
+                           (since or 0.0, until or float("inf")))
+        return {event_type: total for event_type, total in rows}
+
+    def summary(self, since: Optional[float] = None, until: Optional[float] = None) -> Dict:
+        """Headline figures for the statistics panels over [since, until)"""
+
+        bounds = (since or 0.0, until or float("inf"))
+        recommendations, avg_value = self._query(
+            "SELECT SUM(weight), SUM(value * weight) / SUM(CASE WHEN value IS NULL THEN 0 ELSE weight END) "
+            "FROM events WHERE event_type = 'recommendation_generated' AND ts >= ? AND ts < ?", bounds
+        )[0]
+        bulk_rows, = self._query("SELECT SUM(value * weight) FROM events "
+                                 "WHERE event_type = 'bulk_recommendation' AND ts >= ? AND ts < ?", bounds)[0]
+        counts = self.counts(*bounds)
+        return {
+            # Distinct session ids would undercount: sampling drops most one-page sessions' page views
+            "sessions": int(counts.get(SESSION_START_EVENT, 0)),
+            "page_views": counts.get("page_view", 0.0),
+            # Bulk runs record their row count as the event value
+            "recommendations": (recommendations or 0.0) + (bulk_rows or 0.0),
+            "avg_yield_increase_pct": avg_value,
+        }
+
+_event_log: Optional[EventLog] = None
+_event_log_lock = threading.Lock()
+
+def get_event_log() -> EventLog:
+    """Process-wide event log, started on first use and flushed at exit"""
+
+    global _event_log
+    if _event_log is None:
+        with _event_log_lock:
+            if _event_log is None:
+                _event_log = EventLog()
+                atexit.register(_event_log.close)
+    return _event_log
+
+def init_session_analytics():
+    """Per-session counters; must run inside each session, not once at import"""
+    if 'session_start' not in st.session_state:
+        st.session_state.session_start = datetime.now()
+        st.session_state.session_id = uuid.uuid4().hex
+        st.session_state.page_views = 0
+        st.session_state.user_type = None
+        st.session_state.recommendations_generated = 0
+        try:
+            get_event_log().record(SESSION_START_EVENT, None, st.session_state.session_id)
+        except Exception:
+            logger.exception("Failed to track %s event", SESSION_START_EVENT)
+
+def track_usage(event_type, user_type=None, details=None, value=None):
     """Track user interactions for analytics"""
     try:
-        analytics_data = {
-            'timestamp': datetime.now().isoformat(),
-            'event_type': event_type,
-            'user_type': user_type or st.session_state.get('user_type', 'unknown'),
-            'session_duration': str(datetime.now() - st.session_state.session_start),
-            'details': details
-        }
-        
-        # In a production app, you'd send this to an analytics service
-        # For now, we'll just increment session counters
+        init_session_analytics()
+        if user_type:
+            st.session_state.user_type = user_type
+        get_event_log().record(event_type, user_type or st.session_state.user_type or 'unknown',
+                               st.session_state.session_id, value, details)
+
         if event_type == 'page_view':
             st.session_state.page_views += 1
         elif event_type == 'recommendation_generated':
             st.session_state.recommendations_generated += 1
-            
-    except Exception as e:
-        pass  # Don't break the app if analytics fail
+
+    except Exception:
+        logger.exception("Failed to track %s event", event_type)  # Don't break the app if analytics fail
 
 # Add to your sidebar
 def display_session_stats():
     """Display session statistics in sidebar"""
+    init_session_analytics()
     with st.sidebar:
         st.markdown("---")
         st.markdown("### 📊 Session Stats")
         st.write(f"⏱️ Session time: {str(datetime.now() - st.session_state.session_start).split('.')[0]}")
         st.write(f"👀 Page views: {st.session_state.page_views}")
-        st.write(f"🌾 Recommendations: {st.session_state.recommendations_generated}")
\ No newline at end of file
+        st.write(f"🌾 Recommendations: {st.session_state.recommendations_generated}")
@@ -0,0 +1,210 @@
+# Headless recommendation API for Northern Nigeria Fertilizer Advisor
+#
+# Run with: gunicorn api:app --worker-class gthread --threads 8 --keep-alive 30
+#
+# Heroku routes traffic only to the web process, so deploy the API as a
+# separate app from this repository whose Procfile web line is:
+#   web: gunicorn api:app --worker-class gthread --workers ${WEB_CONCURRENCY:-2} --threads 8 --keep-alive 30 --bind 0.0.0.0:$PORT
+import json
+import logging
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from config import AppConfig
+from instrumentation import prometheus_text, timed
+from prices import current_prices
+from recommendations import (
+    BULK_INPUT_COLUMNS, calculate_bulk_recommendations, process_visual_assessment, soil_test_recommendations
+)
+from utils import NutrientCalculator
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+MAX_BATCH_SIZE = 50_000
+# The rate optimizer searches a grid per farm, so its batches are kept smaller
+MAX_OPTIMIZE_FARMS = 10_000
+
+class ApiError(Exception):
+    """Client error returned as a JSON body with the given HTTP status"""
+
+    def __init__(self, message: str, status: str = "400 Bad Request"):
+        super().__init__(message)
+        self.status = status
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def _number(payload: Dict, key: str) -> float:
+    try:
+        value = float(payload[key])
+    except KeyError:
+        raise ApiError(f"Missing field: {key}")
+    except (TypeError, ValueError):
+        raise ApiError(f"Field {key} must be a number")
+    if not np.isfinite(value):
+        raise ApiError(f"Field {key} must be a finite number")
+    return value
+
+def _numbers(payload: Dict, keys: Sequence[str], defaults: Optional[Dict[str, float]] = None,
+             nullable: Sequence[str] = (), max_length: int = MAX_BATCH_SIZE) -> Tuple[List[np.ndarray], bool]:
+    """Fields that are each a number or a list of numbers, as equal-length float arrays
+
+    Scalars broadcast against lists. Nulls in the nullable fields become inf
+    (no limit); any other NaN or Inf is rejected. Also returns whether any
+    field was a list, so single-farm calls can answer with scalars.
+    """
+
+    defaults = defaults or {}
+    arrays, is_list = [], False
+    for key in keys:
+        if key not in payload and key not in defaults:
+            raise ApiError(f"Missing field: {key}")
+        value = payload.get(key, defaults.get(key))
+        items = value if isinstance(value, list) else [value]
+        is_list = is_list or isinstance(value, list)
+        if not items or len(items) > max_length:
+            raise ApiError(f"Field {key} must have between 1 and {max_length} values")
+        if key in nullable:
+            items = [np.inf if item is None else item for item in items]
+        try:
+            array = np.array([float(item) for item in items])
+        except (TypeError, ValueError):
+            raise ApiError(f"Field {key} must be a number or a list of numbers")
+        if np.isnan(array).any() or (key not in nullable and np.isinf(array).any()):
+            raise ApiError(f"Field {key} must contain only finite numbers")
+        arrays.append(array)
+
+    lengths = {len(array) for array in arrays} - {1}
+    if len(lengths) > 1:
+        raise ApiError(f"List fields {', '.join(keys)} must have the same length")
+    length = lengths.pop() if lengths else 1
+    return [np.broadcast_to(array, (length,)) for array in arrays], is_list
+
+def recommend(payload: Dict) -> Dict:
+    """One farmer: visual assessment labels, or soil test values (N in %, P and K in ppm)"""
+
+    if "soil_color" in payload:
+        try:
+            return process_visual_assessment(
+                payload["soil_color"], payload.get("soil_texture"), payload["previous_yield"],
+                payload["target_yield"], _number(payload, "farm_size"), state=payload.get("state")
+            )
+        except KeyError as e:
+            raise ApiError(f"Missing or unknown value for {e.args[0]}")
+
+    return soil_test_recommendations(*(_number(payload, key) for key in BULK_INPUT_COLUMNS),
+                                     prices=current_prices(payload.get("state")))
+
+def recommend_batch(payload: Dict) -> bytes:
+    """Many farmers in one vectorized call; rows are returned in input order"""
+
+    farmers = payload.get("farmers")
+    if not isinstance(farmers, list) or not farmers:
+        raise ApiError("Field farmers must be a non-empty list")
+    if len(farmers) > MAX_BATCH_SIZE:
+        raise ApiError(f"At most {MAX_BATCH_SIZE} farmers per batch", "413 Payload Too Large")
+
+    frame = pd.DataFrame.from_records(farmers)
+    for column in BULK_INPUT_COLUMNS:
+        if column not in frame.columns:
+            raise ApiError(f"Missing field: {column}")
+        values = pd.to_numeric(frame[column], errors="coerce").to_numpy(dtype=np.float64)
+        invalid = np.flatnonzero(~np.isfinite(values))
+        if len(invalid):
+            raise ApiError(f"Field {column} must be a finite number (farmer {invalid[0]})")
+        frame[column] = values
+    try:
+        results = calculate_bulk_recommendations(frame)
+    except (TypeError, ValueError) as e:
+        raise ApiError(str(e))
+    # pandas serializes the frame in C; wrap it rather than round-tripping through dicts
+    return b'{"recommendations":' + results.to_json(orient="records").encode() + b"}"
+
+def yield_response(payload: Dict) -> Dict:
+    """NutrientCalculator.estimate_yield_response; accepts scalars or equal-length lists"""
+
+    values, is_list = _numbers(payload, ("current_yield", "n_rate", "p_rate", "k_rate"))
+    expected = NutrientCalculator.estimate_yield_response(*values)
+    return {"expected_yield": expected if is_list else float(expected[0])}
+
+def optimize(payload: Dict) -> Dict:
+    """NutrientCalculator.optimize_rates over lists of farms; a null budget means no limit"""
+
+    (current_yield, farm_size, budget), _ = _numbers(
+        payload, ("current_yield", "farm_size", "budget"), defaults={"farm_size": 1.0, "budget": None},
+        nullable=("budget",), max_length=MAX_OPTIMIZE_FARMS
+    )
+    if (farm_size <= 0).any():
+        raise ApiError("Field farm_size must be greater than zero")
+    return NutrientCalculator.optimize_rates(current_yield, farm_size, budget=budget)
+
+def health(payload: Dict) -> Dict:
+    return {"status": "ok", "version": AppConfig.VERSION}
+
+def metrics(payload: Dict) -> bytes:
+    """Stage latency histograms for Prometheus to scrape
+
+    Only the answering worker's histograms (labelled with its pid); with
+    several gunicorn workers each scrape samples one of them.
+    """
+    return prometheus_text().encode()
+
+ROUTES: Dict[Tuple[str, str], Callable[[Dict], Union[Dict, bytes]]] = {
+    ("GET", "/health"): health,
+    ("GET", "/metrics"): metrics,
+    ("POST", "/recommend"): recommend,
+    ("POST", "/recommend/batch"): recommend_batch,
+    ("POST", "/yield-response"): yield_response,
+    ("POST", "/optimize"): optimize,
+}
+CONTENT_TYPES = {"/metrics": "text/plain; version=0.0.4"}
+
+def _read_json(environ) -> Dict:
+    try:
+        length = int(environ.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        raise ApiError("Invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise ApiError("Request body too large", "413 Payload Too Large")
+    if length == 0:
+        return {}
+    try:
+        payload = json.loads(environ["wsgi.input"].read(length))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise ApiError("Request body must be valid JSON")
+    if not isinstance(payload, dict):
+        raise ApiError("Request body must be a JSON object")
+    return payload
+
+def app(environ, start_response) -> List[bytes]:
+    """WSGI entry point"""
+
+    method = environ["REQUEST_METHOD"]
+    path = environ.get("PATH_INFO", "/").rstrip("/") or "/"
+
+    handler = ROUTES.get((method, path))
+    try:
+        if handler is None:
+            if any(route_path == path for _, route_path in ROUTES):
+                raise ApiError(f"Method {method} not allowed", "405 Method Not Allowed")
+            raise ApiError(f"No route for {path}", "404 Not Found")
+        with timed(f"api {method} {path}"):
+            status, body = "200 OK", handler(_read_json(environ) if method == "POST" else {})
+    except ApiError as e:
+        status, body = e.status, {"error": str(e)}
+    except Exception:
+        logger.exception("Unhandled error on %s %s", method, path)
+        status, body = "500 Internal Server Error", {"error": "Internal server error"}
+
+    data = body if isinstance(body, bytes) else json.dumps(body, default=_json_default).encode()
+    # An explicit Content-Length lets the worker keep the connection alive
+    content_type = CONTENT_TYPES.get(path, "application/json") if status == "200 OK" else "application/json"
+    start_response(status, [("Content-Type", content_type), ("Content-Length", str(len(data)))])
+    return [data]
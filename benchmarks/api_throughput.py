@@ -0,0 +1,112 @@
+# Throughput benchmark for the headless recommendation API
+#
+#   python benchmarks/api_throughput.py                      # in-process WSGI calls
+#   python benchmarks/api_throughput.py --url http://127.0.0.1:8000 --concurrency 16
+import argparse
+import http.client
+import io
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SINGLE_PAYLOAD = {
+    "soil_color": "Brown", "soil_texture": "Sandy", "previous_yield": "1-2 tons",
+    "target_yield": "4 tons/ha", "farm_size": 2.0
+}
+SOIL_TEST_PAYLOAD = {
+    "n_percent": 1.2, "p_ppm": 15.0, "k_ppm": 180.0, "previous_yield": 1500,
+    "target_yield": 3000, "farm_size": 2.0
+}
+
+def batch_payload(size: int) -> dict:
+    return {"farmers": [dict(SOIL_TEST_PAYLOAD, n_percent=0.5 + (i % 200) / 100) for i in range(size)]}
+
+def bench_in_process(path: str, payload: dict, duration: float) -> dict:
+    """Call the WSGI app directly; measures the per-core ceiling without network cost"""
+
+    from api import app
+
+    body = json.dumps(payload).encode()
+    statuses = []
+
+    def start_response(status, headers):
+        statuses.append(status)
+
+    requests_done = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        environ = {"REQUEST_METHOD": "POST", "PATH_INFO": path, "CONTENT_LENGTH": str(len(body)),
+                   "wsgi.input": io.BytesIO(body)}
+        app(environ, start_response)
+        requests_done += 1
+    elapsed = time.perf_counter() - start
+
+    assert all(status.startswith("200") for status in statuses), statuses[-1]
+    return {"requests": requests_done, "seconds": elapsed, "rps": requests_done / elapsed}
+
+def bench_http(url: str, path: str, payload: dict, duration: float, concurrency: int) -> dict:
+    """Hit a running server over persistent (keep-alive) connections"""
+
+    target = urlparse(url)
+    body = json.dumps(payload)
+    headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+    counts = [0] * concurrency
+    latencies = [[] for _ in range(concurrency)]
+    deadline = time.perf_counter() + duration
+
+    def worker(slot):
+        conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+        while time.perf_counter() < deadline:
+            sent = time.perf_counter()
+            conn.request("POST", path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                raise RuntimeError(f"HTTP {response.status}")
+            latencies[slot].append(time.perf_counter() - sent)
+            counts[slot] += 1
+        conn.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(slot,)) for slot in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    all_latencies = sorted(latency for slot in latencies for latency in slot)
+    p50 = all_latencies[len(all_latencies) // 2] if all_latencies else float("nan")
+    p99 = all_latencies[int(len(all_latencies) * 0.99)] if all_latencies else float("nan")
+    return {"requests": sum(counts), "seconds": elapsed, "rps": sum(counts) / elapsed,
+            "p50_ms": p50 * 1000, "p99_ms": p99 * 1000}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", help="Base URL of a running server; omit to call the app in-process")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Keep-alive connections (HTTP mode)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Farmers per batch request")
+    args = parser.parse_args()
+
+    scenarios = [
+        ("visual", "/recommend", SINGLE_PAYLOAD),
+        ("soil test", "/recommend", SOIL_TEST_PAYLOAD),
+        (f"batch x{args.batch_size}", "/recommend/batch", batch_payload(args.batch_size)),
+    ]
+    for name, path, payload in scenarios:
+        if args.url:
+            result = bench_http(args.url, path, payload, args.duration, args.concurrency)
+            print(f"{name:<14} {result['rps']:>9.0f} req/s  p50 {result['p50_ms']:.1f} ms  "
+                  f"p99 {result['p99_ms']:.1f} ms")
+        else:
+            result = bench_in_process(path, payload, args.duration)
+            print(f"{name:<14} {result['rps']:>9.0f} req/s  (in-process, one core)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# Benchmark suite for Northern Nigeria Fertilizer Advisor
+#
+#   python benchmarks/run_benchmarks.py --size 100000              # compare against the stored baseline
+#   python benchmarks/run_benchmarks.py --size 100000 --save       # record a new baseline
+#   python benchmarks/run_benchmarks.py --size 10000000 --only bulk_recommendations
+#
+# Exits with status 1 when any benchmark is slower than its baseline by more
+# than --threshold.
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import generate_farms, write_farms_csv
+
+from ingest import iter_upload_chunks, stream_bulk_recommendations
+from prices import get_price_service
+from recommendations import (
+    COLOR_N_MAP, TARGET_MAP, TEXTURE_PK_MAP, YIELD_MAP, calculate_bulk_recommendations,
+    process_visual_assessment, soil_test_recommendations
+)
+from utils import MarketIntegration, NutrientCalculator, SpatialAnalysis, SpatialIndex
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+DEFAULT_THRESHOLD = 0.20
+# Slowdowns smaller than this are timer noise on sub-millisecond benchmarks, whatever the ratio
+MIN_REGRESSION_SECONDS = 0.005
+
+# Scalar and per-query benchmarks are capped so large --size runs stay tractable
+SCALAR_CALLS = 10_000
+SPATIAL_QUERIES = 200
+OPTIMIZER_FARMS = 50_000
+
+def bench_bulk_recommendations(farms, snapshot, workdir) -> int:
+    calculate_bulk_recommendations(farms, snapshot)
+    return len(farms)
+
+def bench_soil_test_scalar(farms, snapshot, workdir) -> int:
+    # Prices fetched once, so this times the cached calculation rather than the price lookup
+    prices = snapshot.prices()
+    sample = farms.head(SCALAR_CALLS)
+    for row in sample[["n_percent", "p_ppm", "k_ppm", "previous_yield", "target_yield", "farm_size"]].itertuples(
+            index=False):
+        soil_test_recommendations(*row, prices=prices)
+    return len(sample)
+
+def bench_visual_assessment(farms, snapshot, workdir) -> int:
+    # process_visual_assessment takes no prices, so each call includes its own price lookup;
+    # with the table lookup this cheap, that lookup is a large share of the time
+    rng = np.random.default_rng(0)
+    options = [list(COLOR_N_MAP), list(TEXTURE_PK_MAP), list(YIELD_MAP), list(TARGET_MAP)]
+    picks = [rng.integers(len(choices), size=SCALAR_CALLS) for choices in options]
+    for i in range(SCALAR_CALLS):
+        color, texture, prev, target = (choices[pick[i]] for choices, pick in zip(options, picks))
+        process_visual_assessment(color, texture, prev, target, 2.0)
+    return SCALAR_CALLS
+
+def bench_similar_farms_scan(farms, snapshot, workdir) -> int:
+    targets = farms[["latitude", "longitude"]].to_numpy()[:SPATIAL_QUERIES]
+    for lat, lon in targets:
+        SpatialAnalysis.find_similar_farms(lat, lon, farms, k=10)
+    return len(targets)
+
+def bench_similar_farms_indexed(farms, snapshot, workdir) -> int:
+    index = SpatialIndex.from_frame(farms)
+    targets = farms[["latitude", "longitude"]].to_numpy()[:SPATIAL_QUERIES]
+    for lat, lon in targets:
+        SpatialAnalysis.find_similar_farms(lat, lon, farms, k=10, index=index)
+    return len(targets)
+
+def _upload_file(farms, workdir) -> str:
+    upload = os.path.join(workdir, "farms.csv")
+    if not os.path.exists(upload):
+        farms.to_csv(upload, index=False)
+    return upload
+
+def bench_upload_parsing(farms, snapshot, workdir) -> int:
+    return sum(len(chunk) for chunk in iter_upload_chunks(_upload_file(farms, workdir)))
+
+def bench_upload_pipeline(farms, snapshot, workdir) -> int:
+    # Parsing, the bulk engine and the Parquet write together
+    return stream_bulk_recommendations(_upload_file(farms, workdir), os.path.join(workdir, "out.parquet"),
+                                       fmt="parquet", snapshot=snapshot)
+
+def bench_optimize_rates(farms, snapshot, workdir) -> int:
+    sample = farms.head(OPTIMIZER_FARMS)
+    NutrientCalculator.optimize_rates(sample["previous_yield"].to_numpy(), sample["farm_size"].to_numpy())
+    return len(sample)
+
+def bench_yield_response(farms, snapshot, workdir) -> int:
+    NutrientCalculator.estimate_yield_response(farms["previous_yield"].to_numpy(), 90.0, 60.0, 40.0)
+    return len(farms)
+
+def bench_profitability_bulk(farms, snapshot, workdir) -> int:
+    MarketIntegration.calculate_profitability_bulk(farms["previous_yield"].to_numpy() * 0.5,
+                                                   farms["farm_size"].to_numpy() * 150.0,
+                                                   farms["farm_size"].to_numpy())
+    return len(farms)
+
+BENCHMARKS: Dict[str, Callable] = {
+    "bulk_recommendations": bench_bulk_recommendations,
+    "soil_test_scalar": bench_soil_test_scalar,
+    "visual_assessment": bench_visual_assessment,
+    "similar_farms_scan": bench_similar_farms_scan,
+    "similar_farms_indexed": bench_similar_farms_indexed,
+    "upload_parsing": bench_upload_parsing,
+    "upload_pipeline": bench_upload_pipeline,
+    "optimize_rates": bench_optimize_rates,
+    "yield_response": bench_yield_response,
+    "profitability_bulk": bench_profitability_bulk,
+}
+
+def time_benchmark(func: Callable, args: Tuple, repeats: int) -> Tuple[float, int]:
+    """Best wall time over repeats, after one untimed warm-up call"""
+
+    items = func(*args)
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        items = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, items
+
+def baseline_path(size: int, name: str = None) -> str:
+    return os.path.join(BASELINE_DIR, f"{name or 'baseline'}_{size}.json")
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> Dict[str, float]:
+    """Benchmarks slower than baseline by more than threshold, mapped to their slowdown ratio"""
+
+    regressions = {}
+    for name, result in results.items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            continue
+        ratio = result["seconds"] / reference["seconds"]
+        if ratio > 1 + threshold and result["seconds"] - reference["seconds"] > MIN_REGRESSION_SECONDS:
+            regressions[name] = ratio
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Time the recommendation engine on synthetic farms")
+    parser.add_argument("--size", type=int, default=100_000, help="Synthetic farms (10k to 10M)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Run a subset")
+    parser.add_argument("--save", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--baseline", default=None, help="Baseline name, e.g. a machine label")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown before failing (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    farms = generate_farms(args.size, args.seed)
+    snapshot = get_price_service().snapshot()
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="fertilizer_bench_") as workdir:
+        for name in args.only or BENCHMARKS:
+            seconds, items = time_benchmark(BENCHMARKS[name], (farms, snapshot, workdir), args.repeats)
+            results[name] = {"seconds": seconds, "items": items, "per_second": items / seconds}
+            print(f"{name:<24} {seconds * 1000:10.1f} ms  {items / seconds:14,.0f} items/s")
+
+    path = baseline_path(args.size, args.baseline)
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({
+                "size": args.size,
+                "seed": args.seed,
+                "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2)
+        print(f"Saved baseline to {path}")
+        return 0
+
+    if not os.path.exists(path):
+        print(f"No baseline at {path}; run with --save to record one")
+        return 0
+    with open(path) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    for name, ratio in regressions.items():
+        print(f"REGRESSION {name}: {ratio:.2f}x baseline")
+    if not regressions:
+        print(f"No regressions beyond {args.threshold:.0%} against {path}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
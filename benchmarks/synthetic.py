@@ -0,0 +1,104 @@
+# Synthetic farm generator for Northern Nigeria Fertilizer Advisor benchmarks
+import os
+import sys
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import AppConfig
+from reference_data import LGAReference, load_lga_reference
+
+# LGA table column each farm column is drawn from
+SOURCE_COLUMNS = {
+    "n_percent": "N_percent",
+    "p_ppm": "P_ppm",
+    "k_ppm": "K_ppm",
+    "ph": "pH",
+    "previous_yield": "current_yield_kg_ha",
+    "target_yield": "potential_yield_kg_ha",
+}
+# Floor on the coefficient of variation, so a small reference table still yields a spread
+MIN_RELATIVE_SPREAD = 0.25
+FARM_SIZE_MEDIAN_HA = 1.5
+
+def soil_distributions(reference: Optional[LGAReference] = None) -> Dict[str, Dict[str, float]]:
+    """Log-normal parameters per state and farm column, fitted to the LGA table
+
+    States without LGA rows use the table-wide fit.
+    """
+
+    reference = reference or load_lga_reference()
+    frame = reference.frame
+
+    def fit(rows: pd.DataFrame) -> Dict[str, tuple]:
+        params = {}
+        for column, source in SOURCE_COLUMNS.items():
+            values = rows[source].astype(np.float64)
+            mean = float(values.mean())
+            cv = max(float(values.std(ddof=0)) / mean if mean else 0.0, MIN_RELATIVE_SPREAD)
+            sigma = np.sqrt(np.log1p(cv ** 2))
+            params[column] = (np.log(mean) - sigma ** 2 / 2, sigma)
+        return params
+
+    overall = fit(frame)
+    states = frame["state"].astype(str)
+    return {state: fit(frame[states == state]) if (states == state).any() else overall
+            for state in AppConfig.SUPPORTED_STATES}
+
+def iter_farm_chunks(n_farms: int, seed: int = 0, chunk_rows: int = 1_000_000,
+                     reference: Optional[LGAReference] = None) -> Iterator[pd.DataFrame]:
+    """Yield n_farms synthetic farms in chunks, so 10M farms never sit in memory at once
+
+    Farms are spread evenly over the supported states, placed uniformly inside
+    each state's bounding box, with soil and yield drawn from that state's
+    fitted distributions. The same seed always gives the same farms.
+    """
+
+    distributions = soil_distributions(reference)
+    states = np.array(AppConfig.SUPPORTED_STATES)
+    bounds = np.array([AppConfig.STATE_BOUNDS[state] for state in states])
+    rng = np.random.default_rng(seed)
+
+    for start in range(0, n_farms, chunk_rows):
+        rows = min(chunk_rows, n_farms - start)
+        state_idx = rng.integers(len(states), size=rows)
+        lat_min, lat_max, lon_min, lon_max = bounds[state_idx].T
+
+        chunk = {
+            "farmer_id": np.arange(start, start + rows),
+            "state": pd.Categorical.from_codes(state_idx, categories=states),
+            "latitude": lat_min + (lat_max - lat_min) * rng.random(rows),
+            "longitude": lon_min + (lon_max - lon_min) * rng.random(rows),
+        }
+        for column in SOURCE_COLUMNS:
+            mu = np.array([distributions[state][column][0] for state in states])[state_idx]
+            sigma = np.array([distributions[state][column][1] for state in states])[state_idx]
+            chunk[column] = rng.lognormal(mu, sigma)
+        chunk["ph"] = np.clip(chunk["ph"], 4.0, 9.0)
+        chunk["target_yield"] = np.maximum(chunk["target_yield"], chunk["previous_yield"])
+        chunk["farm_size"] = np.round(rng.lognormal(np.log(FARM_SIZE_MEDIAN_HA), 0.6, rows), 2).clip(0.1, 100.0)
+        yield pd.DataFrame(chunk)
+
+def generate_farms(n_farms: int, seed: int = 0, reference: Optional[LGAReference] = None) -> pd.DataFrame:
+    """n_farms synthetic farms as one frame"""
+    return pd.concat(iter_farm_chunks(n_farms, seed, reference=reference), ignore_index=True)
+
+def write_farms_csv(path: str, n_farms: int, seed: int = 0) -> str:
+    """Stream synthetic farms to a CSV upload file"""
+
+    for i, chunk in enumerate(iter_farm_chunks(n_farms, seed)):
+        chunk.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    return path
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write synthetic northern Nigeria farms to CSV")
+    parser.add_argument("n_farms", type=int)
+    parser.add_argument("out")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_farms_csv(args.out, args.n_farms, args.seed)
@@ -9,18 +9,60 @@ class AppConfig:
     APP_NAME = "Northern Nigeria Smart Fertilizer Advisor"
     VERSION = "2.0.0"
     DEBUG = os.getenv("DEBUG", "False").lower() == "true"
+    # Stage latency histograms (instrumentation.py); always on in debug mode
+    INSTRUMENTATION_ENABLED = DEBUG or os.getenv("INSTRUMENTATION_ENABLED", "False").lower() == "true"
 
     # Database settings
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///fertilizer_advisor.db")
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "500"))
+    # Impact rollup: refreshed in the background; records younger than the lag wait for late commits
+    IMPACT_REFRESH_SECONDS = float(os.getenv("IMPACT_REFRESH_SECONDS", "300"))
+    IMPACT_ROLLUP_LAG_SECONDS = float(os.getenv("IMPACT_ROLLUP_LAG_SECONDS", "120"))
 
     # API settings
     WEATHER_API_KEY = os.getenv("WEATHER_API_KEY", "")
     MARKET_API_KEY = os.getenv("MARKET_API_KEY", "")
 
+    # Analytics event log (append-only SQLite file, written by a background thread)
+    ANALYTICS_DB_PATH = os.getenv("ANALYTICS_DB_PATH", "analytics_events.db")
+    ANALYTICS_BUFFER_SIZE = int(os.getenv("ANALYTICS_BUFFER_SIZE", "10000"))
+    ANALYTICS_FLUSH_SECONDS = float(os.getenv("ANALYTICS_FLUSH_SECONDS", "2.0"))
+    ANALYTICS_BATCH_SIZE = 500
+    # Fraction of events kept per type; unlisted types are always kept
+    ANALYTICS_SAMPLE_RATES = {"page_view": float(os.getenv("ANALYTICS_PAGE_VIEW_SAMPLE_RATE", "0.2"))}
+
+    # Weather settings
+    WEATHER_BUCKET_DEGREES = 0.25  # Farms in the same ~28 km cell share a forecast
+    WEATHER_CACHE_TTL_SECONDS = int(os.getenv("WEATHER_CACHE_TTL_SECONDS", "10800"))
+    WEATHER_MAX_CONCURRENCY = int(os.getenv("WEATHER_MAX_CONCURRENCY", "8"))
+
+    # Yield model artifact (train with: python yield_model.py train)
+    YIELD_MODEL_PATH = os.getenv("YIELD_MODEL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                  "artifacts", "yield_model.joblib"))
+
     # Regional settings
     DEFAULT_LATITUDE = 11.5
     DEFAULT_LONGITUDE = 8.5
+    LGA_DATA_PATH = os.getenv("LGA_DATA_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                            "npk_fertilizer_recommendations.csv"))
+    # Simplified LGA boundaries (build with: python geodata.py build <boundaries.geojson>)
+    LGA_BOUNDARIES_DIR = os.getenv("LGA_BOUNDARIES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                      "artifacts", "lga_boundaries"))
+    # Simplification tolerance in degrees per map detail level; coarser means a smaller payload
+    MAP_DETAIL_LEVELS = {"Low bandwidth": 0.02, "Standard": 0.005, "Detailed": 0.001}
     SUPPORTED_STATES = ["Kaduna", "Kano", "Katsina", "Sokoto", "Kebbi", "Zamfara", "Jigawa"]
+    # Approximate bounding boxes (lat_min, lat_max, lon_min, lon_max) of each supported state
+    STATE_BOUNDS = {
+        "Kaduna": (9.0, 11.3, 6.1, 8.8),
+        "Kano": (10.3, 12.6, 7.7, 9.4),
+        "Katsina": (11.1, 13.4, 6.9, 8.7),
+        "Sokoto": (12.0, 13.9, 4.1, 6.3),
+        "Kebbi": (10.1, 13.3, 3.5, 5.8),
+        "Zamfara": (11.0, 13.1, 5.4, 7.2),
+        "Jigawa": (11.0, 13.0, 8.1, 10.6),
+    }
 
     # Nutrient thresholds
     N_THRESHOLDS = {"low": 1.0, "medium": 1.5, "high": 2.5}
@@ -34,6 +76,23 @@ class AppConfig:
         "dap_usd_kg": 2.5,
         "mop_usd_kg": 1.0
     }
+    # Optional CSV of per-state prices (state, maize_usd_kg, urea_usd_kg, ...)
+    PRICE_TABLE_PATH = os.getenv("PRICE_TABLE_PATH", "")
+    PRICE_REFRESH_SECONDS = int(os.getenv("PRICE_REFRESH_SECONDS", "900"))
+
+    # Parsed uploads cached as Parquet by content hash; least recently used files are evicted
+    UPLOAD_CACHE_DIR = os.getenv("UPLOAD_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                  "artifacts", "upload_cache"))
+    UPLOAD_CACHE_MAX_BYTES = int(os.getenv("UPLOAD_CACHE_MAX_BYTES", str(1024 ** 3)))
+    UPLOAD_CACHE_MEMORY_ENTRIES = 64
+
+    # Farmer PDF reports
+    REPORT_TEMPLATE_PATH = os.getenv("REPORT_TEMPLATE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                          "templates", "farmer_report.txt"))
+
+    # Process pool shared by CPU-bound jobs: sharded bulk steps, PDF reports, policy scenarios
+    PROCESS_WORKERS = int(os.getenv("PROCESS_WORKERS", "0")) or None  # None: one per CPU
+    PARALLEL_MIN_ROWS = 20_000  # Smaller frames run in-process; the pool's overhead would dominate
 
     # Language support
     SUPPORTED_LANGUAGES = {
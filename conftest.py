@@ -0,0 +1,2 @@
+# Test configuration for Northern Nigeria Fertilizer Advisor
+# Lives at the repository root so pytest puts the top-level modules on sys.path
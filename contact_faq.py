@@ -1,6 +1,14 @@
 # Enhanced Contact and FAQ Section
 # Add this to your advanced_fertilizer_app.py
 
+import time
+
+import streamlit as st
+
+from analytics import get_event_log
+
+STATS_WINDOW_DAYS = 30
+
 def show_contact_and_faq():
     """Display contact information and FAQ section"""
     
@@ -68,19 +76,35 @@ def show_app_statistics():
     
     st.markdown("### 📊 App Impact Statistics")
     
+    # Last STATS_WINDOW_DAYS days against the window before it
+    window = STATS_WINDOW_DAYS * 86400
+    now = time.time()
+    event_log = get_event_log()
+    current = event_log.summary(since=now - window)
+    previous = event_log.summary(since=now - 2 * window, until=now - window)
+
+    def change(metric):
+        if not previous[metric] or current[metric] is None:
+            return None
+        return f"{(current[metric] - previous[metric]) / previous[metric]:+.0%}"
+
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("👨‍🌾 Farmers Reached", "12,547", "↗️ +23%")
+        st.metric("👨‍🌾 Sessions", f"{current['sessions']:,}", change("sessions"))
     
     with col2:
-        st.metric("🌾 Recommendations", "45,892", "↗️ +156%")
+        st.metric("🌾 Recommendations", f"{current['recommendations']:,.0f}", change("recommendations"))
     
     with col3:
-        st.metric("📈 Avg Yield Increase", "42%", "↗️ +5%")
+        avg_increase = current["avg_yield_increase_pct"]
+        st.metric("📈 Avg Yield Increase", "n/a" if avg_increase is None else f"{avg_increase:.0f}%",
+                  change("avg_yield_increase_pct"))
     
     with col4:
-        st.metric("💰 Economic Impact", "$2.3M", "↗️ +89%")
+        st.metric("👀 Page Views", f"{current['page_views']:,.0f}", change("page_views"))
+
+    st.caption(f"Last {STATS_WINDOW_DAYS} days, change against the previous {STATS_WINDOW_DAYS}")
     
     st.markdown("""
     **Recent Achievements:**
@@ -0,0 +1,213 @@
+# Database access for Northern Nigeria Fertilizer Advisor
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from config import AppConfig
+from models import Base, Farmer, Recommendation
+
+logger = logging.getLogger(__name__)
+
+# Upload columns copied onto Farmer rows
+FARMER_COLUMNS = ["name", "phone", "location", "state", "lga", "latitude", "longitude", "farm_size"]
+
+# Bulk engine output column -> Recommendation column
+RECOMMENDATION_COLUMNS = {
+    "n_rate": "n_rate",
+    "p2o5_rate": "p_rate",
+    "k2o_rate": "k_rate",
+    "previous_yield": "previous_yield",
+    "expected_yield": "predicted_yield",
+    "total_cost": "cost_estimate",
+}
+
+_engines: Dict[str, Engine] = {}
+_session_factories: Dict[str, sessionmaker] = {}
+_engine_lock = threading.Lock()
+
+def _create_engine(url: str) -> Engine:
+    if url.startswith("sqlite"):
+        engine = create_engine(url, connect_args={"check_same_thread": False}, pool_pre_ping=True)
+
+        @event.listens_for(engine, "connect")
+        def _set_sqlite_pragmas(dbapi_connection, connection_record):
+            # WAL lets page reads proceed while the write-behind thread commits
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.close()
+
+        return engine
+
+    return create_engine(url, pool_size=AppConfig.DB_POOL_SIZE, max_overflow=AppConfig.DB_MAX_OVERFLOW,
+                         pool_pre_ping=True, pool_recycle=1800)
+
+def get_engine(url: Optional[str] = None) -> Engine:
+    """Pooled engine shared by every session in the process, created on first use"""
+
+    url = url or AppConfig.DATABASE_URL
+    engine = _engines.get(url)
+    if engine is None:
+        with _engine_lock:
+            engine = _engines.get(url)
+            if engine is None:
+                engine = _create_engine(url)
+                Base.metadata.create_all(engine)
+                _session_factories[url] = sessionmaker(bind=engine, expire_on_commit=False)
+                _engines[url] = engine
+    return engine
+
+def get_session(url: Optional[str] = None) -> Session:
+    """New session bound to the shared engine"""
+
+    url = url or AppConfig.DATABASE_URL
+    get_engine(url)
+    return _session_factories[url]()
+
+def current_season(when: Optional[datetime] = None) -> str:
+    """Season label for a date, e.g. "2025 Wet Season" (April-October)"""
+
+    when = when or datetime.now()
+    return f"{when.year} {'Wet' if 4 <= when.month <= 10 else 'Dry'} Season"
+
+def _to_records(frame: pd.DataFrame) -> List[Dict]:
+    """Frame rows as dicts of plain Python values with NaN mapped to None"""
+
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict("records")
+
+def add_farmer(name: str, phone: str = None, location: str = None, farm_size: float = None,
+               latitude: float = None, longitude: float = None) -> int:
+    """Insert one farmer and return the new id"""
+
+    with get_session() as session, session.begin():
+        farmer = Farmer(name=name, phone=phone, location=location, farm_size=farm_size,
+                        latitude=latitude, longitude=longitude)
+        session.add(farmer)
+        session.flush()
+        return farmer.id
+
+def bulk_insert_farmers(farmers: pd.DataFrame) -> np.ndarray:
+    """Insert every row of an upload as a Farmer in one statement; returns new ids in row order"""
+
+    if farmers.empty:
+        return np.empty(0, dtype=np.int64)
+
+    columns = [col for col in FARMER_COLUMNS if col in farmers.columns]
+    rows = farmers[columns].copy()
+    if "name" not in rows.columns:
+        rows["name"] = "Unnamed farmer"
+    else:
+        # Cached uploads may hold names as a categorical, which cannot take a new fill value
+        rows["name"] = rows["name"].astype(object).fillna("Unnamed farmer").astype(str)
+
+    with get_session() as session, session.begin():
+        ids = session.scalars(
+            insert(Farmer).returning(Farmer.id, sort_by_parameter_order=True),
+            _to_records(rows)
+        ).all()
+    return np.asarray(ids, dtype=np.int64)
+
+def bulk_insert_recommendations(records: List[Dict]) -> int:
+    """Insert Recommendation rows in one executemany batch"""
+
+    if not records:
+        return 0
+    with get_session() as session, session.begin():
+        session.execute(insert(Recommendation), records)
+    return len(records)
+
+def recommendation_records(results: pd.DataFrame, farmer_ids=None, season: str = None) -> List[Dict]:
+    """Map bulk engine output rows onto Recommendation column dicts"""
+
+    records = results[list(RECOMMENDATION_COLUMNS)].rename(columns=RECOMMENDATION_COLUMNS)
+    records["season"] = season or current_season()
+    if farmer_ids is not None:
+        records["farmer_id"] = farmer_ids
+    return _to_records(records)
+
+class RecommendationWriter:
+    """Write-behind queue that persists recommendations on a background thread
+
+    submit() only enqueues, so the request thread never waits on the database.
+    The writer thread drains the queue in batches of up to batch_size rows, or
+    whatever has arrived after flush_interval seconds.
+    """
+
+    def __init__(self, batch_size: int = None, flush_interval: float = 1.0, max_pending: int = 100_000):
+        self.batch_size = batch_size or AppConfig.DB_WRITE_BATCH_SIZE
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="recommendation-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, record: Dict):
+        """Queue one Recommendation row; blocks only if max_pending rows are waiting"""
+        self._queue.put(record)
+
+    def submit_many(self, records: List[Dict]):
+        for record in records:
+            self._queue.put(record)
+
+    def flush(self):
+        """Block until every queued row has been written"""
+        self._queue.join()
+
+    def close(self):
+        self.flush()
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not (self._stopped.is_set() and self._queue.empty()):
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            if not batch:
+                continue
+
+            try:
+                bulk_insert_recommendations(batch)
+            except Exception:
+                logger.exception("Failed to write %d recommendations", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+_writer: Optional[RecommendationWriter] = None
+_writer_lock = threading.Lock()
+
+def get_recommendation_writer() -> RecommendationWriter:
+    """Process-wide write-behind writer, started on first use and drained at exit"""
+
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = RecommendationWriter()
+                atexit.register(_writer.close)
+    return _writer
+
+def persist_bulk_chunk(results: pd.DataFrame):
+    """Save one chunk of bulk output: farmers inserted in bulk, recommendations write-behind"""
+
+    farmer_ids = bulk_insert_farmers(results)
+    get_recommendation_writer().submit_many(recommendation_records(results, farmer_ids))
@@ -0,0 +1,141 @@
+# Randomized field trial designs for Northern Nigeria Fertilizer Advisor
+import io
+import itertools
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils import MAX_RATES
+
+DESIGN_TYPES = ["Randomized Complete Block", "Split-Plot", "Incomplete Factorial"]
+EXPORT_FORMATS = {"CSV": "csv", "Parquet": "parquet"}
+
+# Walkway left between blocks (and between main plots in a split-plot), metres
+ALLEY_M = 1.0
+
+def rate_levels(n_levels: int, max_rate: float) -> np.ndarray:
+    """Evenly spaced rates from a zero-rate control up to max_rate, rounded to 5 kg/ha"""
+    return np.round(np.linspace(0.0, max_rate, n_levels) / 5) * 5
+
+def _block_permutations(rng: np.random.Generator, n_blocks: int, n_items: int) -> np.ndarray:
+    """Independent random order of n_items within each of n_blocks blocks (n_blocks x n_items)"""
+    return rng.permuted(np.tile(np.arange(n_items), (n_blocks, 1)), axis=1)
+
+def _finish(columns: Dict[str, np.ndarray], plot_size: float, plots_per_block: int) -> pd.DataFrame:
+    """Add plot ids and field-map coordinates, then build the frame
+
+    Plots are square with side sqrt(plot_size). Each block is one row of
+    plots along x, and blocks are stacked along y with an alley between them.
+    Coordinates (plot centres, metres) are local to each location.
+    """
+
+    side = float(np.sqrt(plot_size))
+    position = columns["position"]
+    columns["x_m"] = (position + 0.5) * side
+    columns["y_m"] = (columns["block"] - 1) * (side + ALLEY_M) + side / 2
+    columns["plot_area_m2"] = np.full(len(position), float(plot_size))
+
+    frame = pd.DataFrame(columns)
+    width = len(str(plots_per_block))
+    frame.insert(0, "plot_id", "L" + frame["location"].astype(str) + "-B" + frame["block"].astype(str)
+                 + "-P" + (frame["position"] + 1).astype(str).str.zfill(width))
+    return frame
+
+def _locations_and_blocks(n_locations: int, n_blocks: int, per_block: int):
+    location = np.repeat(np.arange(1, n_locations + 1), n_blocks * per_block)
+    block = np.tile(np.repeat(np.arange(1, n_blocks + 1), per_block), n_locations)
+    position = np.tile(np.arange(per_block), n_locations * n_blocks)
+    return location, block, position
+
+def randomized_complete_block(n_treatments: int, n_blocks: int, plot_size: float = 100.0,
+                              n_locations: int = 1, seed: Optional[int] = None) -> pd.DataFrame:
+    """RCBD: every treatment once per block, in an independent random order per block
+
+    Treatment t applies N, P2O5 and K2O at the t-th of n_treatments evenly
+    spaced levels, treatment 1 being the zero-fertilizer control.
+    """
+
+    rng = np.random.default_rng(seed)
+    n_rates, p_rates, k_rates = (rate_levels(n_treatments, max_rate) for max_rate in MAX_RATES)
+    location, block, position = _locations_and_blocks(n_locations, n_blocks, n_treatments)
+    treatment = _block_permutations(rng, n_locations * n_blocks, n_treatments).ravel()
+
+    return _finish({
+        "location": location, "block": block, "position": position,
+        "treatment": treatment + 1,
+        "n_rate": n_rates[treatment], "p_rate": p_rates[treatment], "k_rate": k_rates[treatment],
+    }, plot_size, n_treatments)
+
+def split_plot(n_main_levels: int, n_sub_levels: int, n_blocks: int, plot_size: float = 100.0,
+               n_locations: int = 1, seed: Optional[int] = None) -> pd.DataFrame:
+    """Split-plot: N rate on main plots, P and K rate on sub-plots
+
+    Main-plot levels are randomized within each block and sub-plot levels
+    independently within each main plot. plot_size is the sub-plot area;
+    sub-plots of a main plot are adjacent, with an alley between main plots.
+    """
+
+    rng = np.random.default_rng(seed)
+    n_rates = rate_levels(n_main_levels, MAX_RATES[0])
+    p_rates, k_rates = rate_levels(n_sub_levels, MAX_RATES[1]), rate_levels(n_sub_levels, MAX_RATES[2])
+    per_block = n_main_levels * n_sub_levels
+    n_block_total = n_locations * n_blocks
+
+    location, block, position = _locations_and_blocks(n_locations, n_blocks, per_block)
+    main = np.repeat(_block_permutations(rng, n_block_total, n_main_levels).ravel(), n_sub_levels)
+    sub = _block_permutations(rng, n_block_total * n_main_levels, n_sub_levels).ravel()
+    main_plot = position // n_sub_levels
+
+    frame = _finish({
+        "location": location, "block": block, "position": position,
+        "main_plot": main_plot + 1, "sub_plot": position % n_sub_levels + 1,
+        "treatment": main * n_sub_levels + sub + 1,
+        "main_level": main + 1, "sub_level": sub + 1,
+        "n_rate": n_rates[main], "p_rate": p_rates[sub], "k_rate": k_rates[sub],
+    }, plot_size, per_block)
+    # Shift each main plot past the alleys before it
+    frame["x_m"] += main_plot * ALLEY_M
+    return frame
+
+def fractional_factorial_runs(n_levels: int, n_factors: int = 3) -> np.ndarray:
+    """Level indices of the 1/n_levels fraction of an n_levels^n_factors factorial
+
+    Keeps the combinations whose level indices sum to 0 modulo n_levels, a
+    regular fraction in which every level of every factor appears equally
+    often and every pair of factors is balanced. Exact for prime n_levels.
+    """
+
+    combos = np.array(list(itertools.product(range(n_levels), repeat=n_factors)))
+    return combos[combos.sum(axis=1) % n_levels == 0]
+
+def incomplete_factorial(n_levels: int, n_blocks: int, plot_size: float = 100.0, n_locations: int = 1,
+                         seed: Optional[int] = None) -> pd.DataFrame:
+    """N x P x K incomplete factorial: one fraction of the full factorial per block
+
+    With 3 levels this is the classic 9-treatment fraction of the 27
+    combinations, randomized independently within each block.
+    """
+
+    rng = np.random.default_rng(seed)
+    runs = fractional_factorial_runs(n_levels)
+    levels = [rate_levels(n_levels, max_rate) for max_rate in MAX_RATES]
+    location, block, position = _locations_and_blocks(n_locations, n_blocks, len(runs))
+    treatment = _block_permutations(rng, n_locations * n_blocks, len(runs)).ravel()
+    chosen = runs[treatment]
+
+    return _finish({
+        "location": location, "block": block, "position": position,
+        "treatment": treatment + 1,
+        "n_level": chosen[:, 0] + 1, "p_level": chosen[:, 1] + 1, "k_level": chosen[:, 2] + 1,
+        "n_rate": levels[0][chosen[:, 0]], "p_rate": levels[1][chosen[:, 1]], "k_rate": levels[2][chosen[:, 2]],
+    }, plot_size, len(runs))
+
+def export_design(design: pd.DataFrame, fmt: str = "csv") -> bytes:
+    """Design as CSV or Parquet file contents"""
+
+    if fmt == "parquet":
+        buffer = io.BytesIO()
+        design.to_parquet(buffer, index=False)
+        return buffer.getvalue()
+    return design.to_csv(index=False).encode()
@@ -0,0 +1,195 @@
+# LGA boundary layers and policy map rendering for Northern Nigeria Fertilizer Advisor
+import argparse
+import json
+import math
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from config import AppConfig
+from reference_data import LGAReference
+
+# Decimal places kept in simplified coordinates (~1 m); more only inflates the payload
+COORDINATE_PRECISION = 5
+
+# Fixed scale so colours stay comparable when the LGA table is updated
+LIMITATION_INDEX_RANGE = (0.0, 100.0)
+LIMITATION_COLORS = ["#ffffb2", "#fecc5c", "#fd8d3c", "#f03b20", "#bd0026"]
+NO_DATA_COLOR = "#d9d9d9"
+
+# Feature properties carried into the map; everything else is dropped
+LAYER_PROPERTIES = ["state", "lga_name", "combined_limitation_index", "priority_rank",
+                    "N_status", "P_status", "K_status"]
+
+_boundary_cache: Dict[str, Tuple[int, Dict]] = {}
+_map_cache: Dict[Tuple, str] = {}
+_cache_lock = threading.Lock()
+
+def boundaries_path(tolerance: float, directory: Optional[str] = None) -> str:
+    """Path of the simplified boundary file for a tolerance"""
+    return os.path.join(directory or AppConfig.LGA_BOUNDARIES_DIR, f"lga_boundaries_{tolerance:g}.geojson")
+
+def _round_coordinates(coords, ndigits: int):
+    if isinstance(coords[0], (int, float)):
+        return [round(value, ndigits) for value in coords]
+    return [_round_coordinates(part, ndigits) for part in coords]
+
+def build_boundaries(source: str, out_dir: Optional[str] = None, tolerances: Optional[List[float]] = None,
+                     lga_column: str = "lganame", state_column: str = "statename") -> List[str]:
+    """Simplify source LGA boundaries once per tolerance and write compact GeoJSON files
+
+    ``source`` is any file geopandas can read (e.g. the GRID3 or HDX LGA
+    boundaries). Only LGAs in supported states are kept.
+    """
+    import geopandas as gpd
+
+    out_dir = out_dir or AppConfig.LGA_BOUNDARIES_DIR
+    tolerances = tolerances or list(AppConfig.MAP_DETAIL_LEVELS.values())
+    os.makedirs(out_dir, exist_ok=True)
+
+    boundaries = gpd.read_file(source).to_crs(epsg=4326)
+    boundaries = boundaries.rename(columns={lga_column: "lga_name", state_column: "state"})
+    boundaries = boundaries[boundaries["state"].isin(AppConfig.SUPPORTED_STATES)][["state", "lga_name", "geometry"]]
+
+    written = []
+    for tolerance in tolerances:
+        simplified = boundaries.copy()
+        simplified["geometry"] = simplified.geometry.simplify(tolerance, preserve_topology=True)
+        collection = json.loads(simplified.to_json(drop_id=True))
+        for feature in collection["features"]:
+            geometry = feature["geometry"]
+            geometry["coordinates"] = _round_coordinates(geometry["coordinates"], COORDINATE_PRECISION)
+
+        path = boundaries_path(tolerance, out_dir)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(collection, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        written.append(path)
+    return written
+
+def load_boundaries(tolerance: float) -> Optional[Tuple[int, Dict]]:
+    """(version, FeatureCollection) for a tolerance, or None if it has not been built
+
+    Parsed once per process and reloaded when the file changes.
+    """
+
+    path = boundaries_path(tolerance)
+    try:
+        version = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    cached = _boundary_cache.get(path)
+    if cached is None or cached[0] != version:
+        with open(path) as f:
+            cached = (version, json.load(f))
+        with _cache_lock:
+            _boundary_cache[path] = cached
+    return cached
+
+def limitation_color(index: Optional[float]) -> str:
+    """Fill colour for a combined limitation index on the fixed scale"""
+
+    if index is None or math.isnan(index):
+        return NO_DATA_COLOR
+    low, high = LIMITATION_INDEX_RANGE
+    fraction = min(max((index - low) / (high - low), 0.0), 0.999)
+    return LIMITATION_COLORS[int(fraction * len(LIMITATION_COLORS))]
+
+def choropleth_layer(reference: LGAReference, boundaries: Dict) -> Dict:
+    """Boundary features joined to the LGA table, with only the properties the map shows"""
+
+    table = reference.frame[LAYER_PROPERTIES].copy()
+    table["combined_limitation_index"] = table["combined_limitation_index"].astype(float).round(1)
+    rows = {(str(row["state"]).lower(), str(row["lga_name"]).lower()): row
+            for row in table.astype(object).to_dict("records")}
+
+    features = []
+    for feature in boundaries["features"]:
+        source = feature["properties"]
+        row = rows.get((str(source.get("state")).lower(), str(source.get("lga_name")).lower()))
+        properties = dict(row) if row else {"state": source.get("state"), "lga_name": source.get("lga_name"),
+                                            "combined_limitation_index": None, "priority_rank": "No data",
+                                            "N_status": "", "P_status": "", "K_status": ""}
+        properties["fill"] = limitation_color(properties["combined_limitation_index"])
+        features.append({"type": "Feature", "properties": properties, "geometry": feature["geometry"]})
+    return {"type": "FeatureCollection", "features": features}
+
+def _bounds(layer: Dict) -> List[List[float]]:
+    lats, lons = [], []
+
+    def walk(coords):
+        if isinstance(coords[0], (int, float)):
+            lons.append(coords[0])
+            lats.append(coords[1])
+        else:
+            for part in coords:
+                walk(part)
+
+    for feature in layer["features"]:
+        walk(feature["geometry"]["coordinates"])
+    return [[min(lats), min(lons)], [max(lats), max(lons)]]
+
+def _render_map(layer: Dict) -> str:
+    import branca.colormap
+    import folium
+
+    m = folium.Map(location=[AppConfig.DEFAULT_LATITUDE, AppConfig.DEFAULT_LONGITUDE], zoom_start=6,
+                   prefer_canvas=True)
+    folium.GeoJson(
+        layer,
+        name="Nutrient limitation",
+        style_function=lambda feature: {"fillColor": feature["properties"]["fill"], "color": "#555555",
+                                        "weight": 0.5, "fillOpacity": 0.75},
+        tooltip=folium.GeoJsonTooltip(
+            fields=["lga_name", "state", "combined_limitation_index", "priority_rank"],
+            aliases=["LGA", "State", "Limitation index", "Priority"]
+        ),
+        smooth_factor=1.5,
+    ).add_to(m)
+    branca.colormap.StepColormap(
+        LIMITATION_COLORS, vmin=LIMITATION_INDEX_RANGE[0], vmax=LIMITATION_INDEX_RANGE[1],
+        caption="Combined limitation index"
+    ).add_to(m)
+    if layer["features"]:
+        m.fit_bounds(_bounds(layer))
+    return m.get_root().render()
+
+def policy_map_html(reference: LGAReference, tolerance: float) -> Optional[str]:
+    """Standalone map HTML, cached on the LGA table and boundary file versions
+
+    Returns None when boundaries for this tolerance have not been built.
+    """
+
+    loaded = load_boundaries(tolerance)
+    if loaded is None:
+        return None
+    boundary_version, boundaries = loaded
+
+    key = (reference.version, boundary_version, tolerance)
+    html = _map_cache.get(key)
+    if html is None:
+        html = _render_map(choropleth_layer(reference, boundaries))
+        with _cache_lock:
+            # Older versions can never be requested again
+            for stale in [k for k in _map_cache if k[2] == tolerance]:
+                del _map_cache[stale]
+            _map_cache[key] = html
+    return html
+
+def main():
+    parser = argparse.ArgumentParser(description="LGA boundary layers for the policy map")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Simplify source boundaries at each map detail level")
+    build.add_argument("source", help="LGA boundary file (GeoJSON, shapefile, GeoPackage)")
+    build.add_argument("--out", default=None, help="Output directory")
+    build.add_argument("--lga-column", default="lganame")
+    build.add_argument("--state-column", default="statename")
+    args = parser.parse_args()
+
+    for path in build_boundaries(args.source, args.out, lga_column=args.lga_column, state_column=args.state_column):
+        print(f"{path}: {os.path.getsize(path) / 1024:.0f} KB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# Impact tracking queries for Northern Nigeria Fertilizer Advisor
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import pandas as pd
+from sqlalchemy import case, distinct, func, insert, select
+from sqlalchemy.orm import Session
+
+from config import AppConfig
+from models import AdoptionTracking, Farmer, ImpactRollupState, Recommendation, SeasonImpactRollup
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_LGA = "Unknown"
+
+def farmers_reached(session: Session, season: Optional[str] = None) -> int:
+    """Distinct farmers with at least one recommendation"""
+
+    query = select(func.count(distinct(Recommendation.farmer_id)))
+    if season:
+        query = query.where(Recommendation.season == season)
+    return session.scalar(query) or 0
+
+def area_reached(session: Session, season: Optional[str] = None) -> float:
+    """Total farm area (ha) of farmers with at least one recommendation"""
+
+    reached = select(Recommendation.farmer_id)
+    if season:
+        reached = reached.where(Recommendation.season == season)
+    query = select(func.sum(Farmer.farm_size)).where(Farmer.id.in_(reached))
+    return session.scalar(query) or 0.0
+
+def _insert_ignore(session: Session, model, **values):
+    """Insert a row unless one with the same primary key already exists"""
+
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        if session.get(model, values["id"]) is None:
+            session.execute(insert(model).values(**values))
+        return
+    session.execute(dialect_insert(model).values(**values).on_conflict_do_nothing(index_elements=["id"]))
+
+def refresh_impact_rollup(session: Session, lag_seconds: Optional[float] = None) -> int:
+    """Fold adoption records added since the last refresh into the rollup table
+
+    Aggregates only rows above the stored watermark with one GROUP BY, then adds
+    the partial sums onto existing (season, lga) rows. The watermark row is
+    locked for the transaction so concurrent refreshes cannot double count.
+
+    Ids are handed out when a row is inserted, not when it commits, so a
+    transaction that commits late can leave a gap below ids already visible.
+    Only records older than lag_seconds (IMPACT_ROLLUP_LAG_SECONDS) are
+    folded, on the assumption that every writer commits within that window.
+    Returns the number of new adoption records folded in.
+    """
+
+    lag = AppConfig.IMPACT_ROLLUP_LAG_SECONDS if lag_seconds is None else lag_seconds
+    _insert_ignore(session, ImpactRollupState, id=1, last_tracking_id=0)
+    state = session.scalars(select(ImpactRollupState).where(ImpactRollupState.id == 1).with_for_update()).one()
+
+    settled = datetime.utcnow() - timedelta(seconds=lag)
+    max_id = session.scalar(
+        select(func.max(AdoptionTracking.id))
+        .where(AdoptionTracking.id > state.last_tracking_id, AdoptionTracking.recorded_at <= settled)
+    )
+    if max_id is None:
+        return 0
+
+    lga = func.coalesce(Farmer.lga, UNKNOWN_LGA)
+    gain = case(
+        (AdoptionTracking.adopted.is_(True), AdoptionTracking.actual_yield - Recommendation.previous_yield),
+        else_=None
+    )
+    partials = session.execute(
+        select(
+            AdoptionTracking.season,
+            lga.label("lga"),
+            func.count().label("records"),
+            func.sum(case((AdoptionTracking.adopted.is_(True), 1), else_=0)).label("adopted"),
+            func.coalesce(func.sum(gain), 0.0).label("yield_gain_sum"),
+            func.count(gain).label("yield_gain_count")
+        )
+        .select_from(AdoptionTracking)
+        .outerjoin(Farmer, Farmer.id == AdoptionTracking.farmer_id)
+        .outerjoin(Recommendation, Recommendation.id == AdoptionTracking.recommendation_id)
+        .where(AdoptionTracking.id > state.last_tracking_id, AdoptionTracking.id <= max_id)
+        .group_by(AdoptionTracking.season, lga)
+    ).all()
+
+    existing = {
+        (row.season, row.lga): row
+        for row in session.scalars(
+            select(SeasonImpactRollup).where(SeasonImpactRollup.season.in_({p.season for p in partials}))
+        )
+    }
+
+    folded = 0
+    now = datetime.utcnow()
+    for partial in partials:
+        row = existing.get((partial.season, partial.lga))
+        if row is None:
+            row = SeasonImpactRollup(season=partial.season, lga=partial.lga, records=0, adopted=0,
+                                     yield_gain_sum=0.0, yield_gain_count=0)
+            session.add(row)
+        row.records += partial.records
+        row.adopted += partial.adopted
+        row.yield_gain_sum += partial.yield_gain_sum
+        row.yield_gain_count += partial.yield_gain_count
+        row.updated_at = now
+        folded += partial.records
+
+    state.last_tracking_id = max_id
+    return folded
+
+_refresher: Optional[threading.Thread] = None
+_refresher_lock = threading.Lock()
+
+def _refresh_loop(interval: float):
+    from database import get_session
+
+    while True:
+        try:
+            with get_session() as session, session.begin():
+                folded = refresh_impact_rollup(session)
+            if folded:
+                logger.info("Folded %d adoption records into the impact rollup", folded)
+        except Exception:
+            logger.exception("Impact rollup refresh failed")
+        time.sleep(interval)
+
+def start_impact_refresher() -> threading.Thread:
+    """Refresh the rollup every IMPACT_REFRESH_SECONDS on a background thread
+
+    Started once per process; dashboards then only read the rollup table.
+    Several processes refreshing at once is safe, they queue on the
+    watermark row lock.
+    """
+
+    global _refresher
+    if _refresher is None:
+        with _refresher_lock:
+            if _refresher is None:
+                _refresher = threading.Thread(target=_refresh_loop, args=(AppConfig.IMPACT_REFRESH_SECONDS,),
+                                              name="impact-refresher", daemon=True)
+                _refresher.start()
+    return _refresher
+
+def _rollup_totals(session: Session, group_column, season: Optional[str] = None) -> pd.DataFrame:
+    query = select(
+        group_column,
+        func.sum(SeasonImpactRollup.records).label("records"),
+        func.sum(SeasonImpactRollup.adopted).label("adopted"),
+        func.sum(SeasonImpactRollup.yield_gain_sum).label("yield_gain_sum"),
+        func.sum(SeasonImpactRollup.yield_gain_count).label("yield_gain_count")
+    ).group_by(group_column).order_by(group_column)
+    if season:
+        query = query.where(SeasonImpactRollup.season == season)
+
+    totals = pd.DataFrame(session.execute(query).all(),
+                          columns=[group_column.key, "records", "adopted", "yield_gain_sum", "yield_gain_count"])
+    totals["adoption_rate"] = totals["adopted"] / totals["records"].where(totals["records"] > 0)
+    totals["avg_yield_gain"] = totals["yield_gain_sum"] / totals["yield_gain_count"].where(totals["yield_gain_count"] > 0)
+    return totals
+
+def impact_by_season(session: Session) -> pd.DataFrame:
+    """Adoption rate and average yield gain (kg/ha) per season, from the rollup table"""
+    return _rollup_totals(session, SeasonImpactRollup.season)
+
+def impact_by_lga(session: Session, season: Optional[str] = None) -> pd.DataFrame:
+    """Adoption rate and average yield gain (kg/ha) per LGA, from the rollup table"""
+    return _rollup_totals(session, SeasonImpactRollup.lga, season)
+
+def impact_summary(session: Session, season: Optional[str] = None) -> Dict:
+    """Dashboard tile values, every one computed by an aggregate query"""
+
+    totals = _rollup_totals(session, SeasonImpactRollup.season, season)
+    records = totals["records"].sum()
+    gain_count = totals["yield_gain_count"].sum()
+
+    return {
+        "farmers_reached": farmers_reached(session, season),
+        "area_ha": area_reached(session, season),
+        "adoption_rate": totals["adopted"].sum() / records if records else None,
+        "avg_yield_gain": totals["yield_gain_sum"].sum() / gain_count if gain_count else None,
+        "by_season": totals
+    }
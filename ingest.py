@@ -0,0 +1,183 @@
+# Streaming ingestion of uploaded farmer lists
+import os
+import pandas as pd
+from typing import Callable, Iterator, Optional
+
+from instrumentation import timed, timed_iter
+from prices import PriceSnapshot, get_price_service
+from recommendations import calculate_bulk_recommendations, missing_bulk_columns
+from schema import restore_precision
+
+# Rows parsed per chunk; peak memory is bounded by this, not by file size
+DEFAULT_CHUNK_ROWS = 50_000
+
+OUTPUT_FORMATS = {"CSV": "csv", "Parquet": "parquet"}
+
+def _source_name(source) -> str:
+    return getattr(source, "name", str(source))
+
+def _iter_excel_chunks(source, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Yield DataFrame chunks from the first sheet of an .xlsx workbook"""
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(col) for col in header]
+
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunk_rows:
+                yield pd.DataFrame(batch, columns=columns)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns)
+    finally:
+        workbook.close()
+
+def _iter_parquet_chunks(source, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows):
+        # Cached uploads may hold float32 columns; widen them to the values originally parsed
+        yield restore_precision(batch.to_pandas())
+
+def parquet_row_count(source) -> int:
+    """Rows in a Parquet file, from its footer metadata"""
+    import pyarrow.parquet as pq
+
+    return pq.ParquetFile(source).metadata.num_rows
+
+def iter_upload_chunks(source, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Yield an uploaded CSV/Excel/Parquet file as DataFrame chunks of at most chunk_rows"""
+
+    name = _source_name(source)
+    if name.endswith(".xlsx"):
+        yield from _iter_excel_chunks(source, chunk_rows)
+    elif name.endswith(".parquet"):
+        yield from _iter_parquet_chunks(source, chunk_rows)
+    else:
+        with pd.read_csv(source, chunksize=chunk_rows) as reader:
+            yield from reader
+
+@timed("ingest.read_upload_preview")
+def read_upload_preview(source, n_rows: int = 5) -> pd.DataFrame:
+    """Parse only the first rows of an uploaded file for display"""
+
+    chunks = iter_upload_chunks(source, n_rows)
+    try:
+        preview = next(chunks, pd.DataFrame())
+    finally:
+        chunks.close()
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return preview
+
+class _CsvSink:
+    """Append result chunks to a CSV file, writing the header once"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.header_written = False
+
+    def write(self, chunk: pd.DataFrame):
+        chunk.to_csv(self.path, mode="a" if self.header_written else "w",
+                     header=not self.header_written, index=False)
+        self.header_written = True
+
+    def close(self):
+        if not self.header_written:
+            open(self.path, "w").close()
+
+class _ParquetSink:
+    """Append result chunks to a Parquet file as row groups"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.writer = None
+        self.schema = None
+
+    def write(self, chunk: pd.DataFrame):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.writer is None:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            self.schema = table.schema
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+        else:
+            # Later chunks may infer narrower dtypes (e.g. int vs float); align to the first
+            table = pa.Table.from_pandas(chunk, schema=self.schema, preserve_index=False)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+def iter_result_chunks(path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Read a bulk output file written by stream_bulk_recommendations back in chunks"""
+
+    if path.endswith(".parquet"):
+        yield from _iter_parquet_chunks(path, chunk_rows)
+    else:
+        with pd.read_csv(path, chunksize=chunk_rows) as reader:
+            yield from reader
+
+def stream_bulk_recommendations(source, output_path: str, fmt: str = "csv",
+                                chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                                progress: Optional[Callable[[int, Optional[float]], None]] = None,
+                                on_chunk: Optional[Callable[[pd.DataFrame], None]] = None,
+                                transform: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+                                snapshot: Optional[PriceSnapshot] = None) -> int:
+    """Generate recommendations chunk by chunk, writing each to output_path
+
+    Returns the number of farmers processed. progress, if given, is called after
+    every chunk with the running row count and the fraction of the input
+    consumed (None when the source size is unknown). transform, if given, can
+    add columns to each result chunk before it is written; on_chunk, if given,
+    receives each written chunk, e.g. to persist it. snapshot prices the whole
+    run (the current one if not given); pass the same one to any priced transform.
+    """
+
+    sink = _ParquetSink(output_path) if fmt == "parquet" else _CsvSink(output_path)
+    total_bytes = getattr(source, "size", None)
+    if total_bytes is None and isinstance(source, (str, os.PathLike)):
+        total_bytes = os.path.getsize(source)
+    name = _source_name(source)
+    is_csv = not name.endswith((".xlsx", ".parquet"))
+    total_rows = parquet_row_count(source) if name.endswith(".parquet") else None
+
+    # One price snapshot for the whole run, however many chunks it takes
+    snapshot = snapshot or get_price_service().snapshot()
+
+    rows_done = 0
+    try:
+        for chunk in timed_iter("ingest.parse_chunk", iter_upload_chunks(source, chunk_rows)):
+            missing = missing_bulk_columns(chunk)
+            if missing:
+                raise ValueError(f"Farmer list is missing columns: {', '.join(missing)}")
+
+            results = chunk.join(calculate_bulk_recommendations(chunk, snapshot))
+            if transform is not None:
+                results = transform(results)
+            sink.write(results)
+            if on_chunk is not None:
+                on_chunk(results)
+            rows_done += len(chunk)
+
+            if progress is not None:
+                fraction = None
+                if is_csv and total_bytes and hasattr(source, "tell"):
+                    fraction = min(source.tell() / total_bytes, 1.0)
+                elif total_rows:
+                    fraction = min(rows_done / total_rows, 1.0)
+                progress(rows_done, fraction)
+    finally:
+        sink.close()
+
+    return rows_done
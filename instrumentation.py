@@ -0,0 +1,179 @@
+# Stage timing instrumentation for Northern Nigeria Fertilizer Advisor
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import AppConfig
+
+# Histogram bucket upper bounds in seconds (10us to 30s, roughly 2.5x apart)
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+METRIC_NAME = "fertilizer_advisor_stage_seconds"
+REPORTED_PERCENTILES = (50, 95, 99)
+
+class LatencyHistogram:
+    """Call count, total time and fixed-bucket latency counts for one stage"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        slot = bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[slot] += 1
+            self.count += 1
+            self.total += seconds
+
+    def snapshot(self) -> Tuple[List[int], int, float]:
+        """Consistent (bucket counts, count, total) at one instant"""
+        with self._lock:
+            return list(self.counts), self.count, self.total
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Estimate by linear interpolation inside the bucket holding the rank"""
+
+        counts, count, _ = self.snapshot()
+        if count == 0:
+            return None
+
+        rank = pct / 100 * count
+        seen = 0
+        for slot, in_bucket in enumerate(counts):
+            if in_bucket and seen + in_bucket >= rank:
+                lower = self.buckets[slot - 1] if slot > 0 else 0.0
+                if slot == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[slot] - lower) * (rank - seen) / in_bucket
+            seen += in_bucket
+        return self.buckets[-1]
+
+_histograms: Dict[str, LatencyHistogram] = {}
+_registry_lock = threading.Lock()
+
+def histogram(stage: str) -> LatencyHistogram:
+    hist = _histograms.get(stage)
+    if hist is None:
+        with _registry_lock:
+            hist = _histograms.setdefault(stage, LatencyHistogram())
+    return hist
+
+def _registered() -> List[Tuple[str, LatencyHistogram]]:
+    # Copy under the lock: histogram() may add a stage while a report iterates
+    with _registry_lock:
+        return sorted(_histograms.items())
+
+def enabled() -> bool:
+    return AppConfig.INSTRUMENTATION_ENABLED
+
+class timed:
+    """Record the latency of a stage, as a decorator or a context manager
+
+        @timed("recommendations.process_visual_assessment")
+        def process_visual_assessment(...): ...
+
+        with timed("ingest.parse_chunk"):
+            ...
+
+    When instrumentation is disabled the decorator returns the function
+    unchanged and the context manager records nothing.
+    """
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self._local = threading.local()
+
+    def __call__(self, func):
+        if not enabled():
+            return func
+        hist = histogram(self.stage)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                hist.observe(time.perf_counter() - start)
+        return wrapper
+
+    def __enter__(self):
+        # Thread-local so one instance can be shared, e.g. at module level
+        self._local.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if enabled():
+            histogram(self.stage).observe(time.perf_counter() - self._local.start)
+        return False
+
+def timed_iter(stage: str, items: Iterable) -> Iterator:
+    """Yield from items, timing how long each item takes to produce"""
+
+    iterator = iter(items)
+    if not enabled():
+        yield from iterator
+        return
+    hist = histogram(stage)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        hist.observe(time.perf_counter() - start)
+        yield item
+
+def stage_report() -> List[Dict]:
+    """Per-stage call count, mean and percentile latencies in milliseconds"""
+
+    report = []
+    for stage, hist in _registered():
+        _, count, total = hist.snapshot()
+        if count == 0:
+            continue
+        row = {"stage": stage, "calls": count, "mean_ms": total / count * 1000}
+        for pct in REPORTED_PERCENTILES:
+            row[f"p{pct}_ms"] = hist.percentile(pct) * 1000
+        report.append(row)
+    return report
+
+def prometheus_text() -> str:
+    """This process's stage histograms in the Prometheus text exposition format
+
+    Histograms live in process memory, so under a multi-worker server (e.g.
+    gunicorn -w 4) each scrape of /metrics only sees the worker that answered
+    it. Every series carries a pid label so those workers show up as
+    separate series; sum by stage in queries to get the service total.
+    """
+
+    pid = os.getpid()
+    lines = [f"# HELP {METRIC_NAME} Latency of instrumented stages.", f"# TYPE {METRIC_NAME} histogram"]
+    for stage, hist in _registered():
+        counts, count, total = hist.snapshot()
+        labels = f'stage="{stage}",pid="{pid}"'
+        cumulative = 0
+        for bound, in_bucket in zip(hist.buckets + (float("inf"),), counts):
+            cumulative += in_bucket
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'{METRIC_NAME}_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f'{METRIC_NAME}_sum{{{labels}}} {total!r}')
+        lines.append(f'{METRIC_NAME}_count{{{labels}}} {count}')
+    return "\n".join(lines) + "\n"
+
+def reset():
+    """Drop all recorded measurements"""
+    with _registry_lock:
+        for hist in _histograms.values():
+            with hist._lock:
+                hist.counts = [0] * len(hist.counts)
+                hist.count = 0
+                hist.total = 0.0
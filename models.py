@@ -1,5 +1,5 @@
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
@@ -14,6 +14,8 @@ class Farmer(Base):
     name = Column(String(100), nullable=False)
     phone = Column(String(20))
     location = Column(String(100))
+    state = Column(String(50), index=True)
+    lga = Column(String(100), index=True)
     latitude = Column(Float)
     longitude = Column(Float)
     farm_size = Column(Float)
@@ -23,7 +25,7 @@ class SoilTest(Base):
     __tablename__ = 'soil_tests'
 
     id = Column(Integer, primary_key=True)
-    farmer_id = Column(Integer)
+    farmer_id = Column(Integer, ForeignKey('farmers.id'), index=True)
     test_date = Column(DateTime)
     n_percent = Column(Float)
     p_ppm = Column(Float)
@@ -36,12 +38,13 @@ class Recommendation(Base):
     __tablename__ = 'recommendations'
 
     id = Column(Integer, primary_key=True)
-    farmer_id = Column(Integer)
-    soil_test_id = Column(Integer)
-    season = Column(String(50))
+    farmer_id = Column(Integer, ForeignKey('farmers.id'), index=True)
+    soil_test_id = Column(Integer, ForeignKey('soil_tests.id'), index=True)
+    season = Column(String(50), index=True)
     n_rate = Column(Float)
     p_rate = Column(Float)
     k_rate = Column(Float)
+    previous_yield = Column(Float)
     predicted_yield = Column(Float)
     cost_estimate = Column(Float)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -50,10 +53,31 @@ class AdoptionTracking(Base):
     __tablename__ = 'adoption_tracking'
 
     id = Column(Integer, primary_key=True)
-    farmer_id = Column(Integer)
-    recommendation_id = Column(Integer)
+    farmer_id = Column(Integer, ForeignKey('farmers.id'), index=True)
+    recommendation_id = Column(Integer, ForeignKey('recommendations.id'), index=True)
     adopted = Column(Boolean)
     actual_yield = Column(Float)
     feedback = Column(String(500))
-    season = Column(String(50))
+    season = Column(String(50), index=True)
     recorded_at = Column(DateTime, default=datetime.utcnow)
+
+class SeasonImpactRollup(Base):
+    """Per season/LGA adoption totals, refreshed incrementally from adoption_tracking"""
+    __tablename__ = 'season_impact_rollup'
+    __table_args__ = (UniqueConstraint('season', 'lga'),)
+
+    id = Column(Integer, primary_key=True)
+    season = Column(String(50), nullable=False, index=True)
+    lga = Column(String(100), nullable=False)
+    records = Column(Integer, nullable=False, default=0)
+    adopted = Column(Integer, nullable=False, default=0)
+    yield_gain_sum = Column(Float, nullable=False, default=0.0)
+    yield_gain_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class ImpactRollupState(Base):
+    """Single-row watermark: highest adoption_tracking id folded into the rollup"""
+    __tablename__ = 'impact_rollup_state'
+
+    id = Column(Integer, primary_key=True)
+    last_tracking_id = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,264 @@
+# Process-pool execution of CPU-bound bulk steps for Northern Nigeria Fertilizer Advisor
+import functools
+import math
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import AppConfig
+from instrumentation import enabled, histogram
+
+# Shards queued per worker, so one slow state does not leave the other workers idle
+SHARDS_PER_WORKER = 2
+SHARD_HISTORY_SIZE = 200
+ALIGNMENT = 8
+# Imported once in the forkserver so each worker starts with them loaded
+FORKSERVER_PRELOAD = ["numpy", "pandas", "recommendations"]
+
+Layout = List[Tuple[str, str, int]]  # (column, numpy dtype string, byte offset)
+
+def _layout(dtypes: Dict[str, np.dtype], rows: int) -> Tuple[Layout, int]:
+    layout, offset = [], 0
+    for column, dtype in dtypes.items():
+        layout.append((column, np.dtype(dtype).str, offset))
+        offset += -(-rows * np.dtype(dtype).itemsize // ALIGNMENT) * ALIGNMENT
+    return layout, offset
+
+def _views(buffer, layout: Layout, rows: int) -> Dict[str, np.ndarray]:
+    return {column: np.ndarray((rows,), dtype=np.dtype(dtype), buffer=buffer, offset=offset)
+            for column, dtype, offset in layout}
+
+def _read_rows(block: SharedMemory, layout: Layout, rows: int, start: int, stop: int) -> Dict[str, np.ndarray]:
+    """Copy rows [start, stop) of every column out of a segment"""
+
+    views = _views(block.buf, layout, rows)
+    try:
+        return {column: views[column][start:stop].copy() for column in views}
+    finally:
+        # Views pin the segment's buffer; drop them even on error so close() can succeed
+        views.clear()
+
+def _write_rows(block: SharedMemory, layout: Layout, rows: int, start: int, stop: int,
+                values: Dict[str, np.ndarray]):
+    """Copy values into rows [start, stop) of each column of a segment"""
+
+    views = _views(block.buf, layout, rows)
+    try:
+        for column in views:
+            views[column][start:stop] = values[column]
+    finally:
+        views.clear()
+
+def _create_block(size: int) -> SharedMemory:
+    # Zero-length segments are not allowed
+    return SharedMemory(create=True, size=max(size, 1))
+
+def _shareable(frame: pd.DataFrame, skip: str) -> Tuple[Dict[str, np.ndarray], Dict[str, Tuple[pd.Index, bool]]]:
+    """Numeric and boolean columns as arrays, categoricals as codes; other columns are left out"""
+
+    arrays, categories = {}, {}
+    for column in frame.columns:
+        if column == skip:
+            continue
+        series = frame[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            arrays[column] = series.cat.codes.to_numpy()
+            categories[column] = (series.cat.categories, series.cat.ordered)
+        elif isinstance(series.dtype, np.dtype) and series.dtype.kind in "biuf":
+            arrays[column] = series.to_numpy()
+    return arrays, categories
+
+def _shard_frame(arrays: Dict[str, np.ndarray], categories: Dict[str, Tuple[pd.Index, bool]],
+                 shard_column: str, shard_value) -> pd.DataFrame:
+    columns = {}
+    for column, values in arrays.items():
+        if column in categories:
+            levels, ordered = categories[column]
+            columns[column] = pd.Categorical.from_codes(values, categories=levels, ordered=ordered)
+        else:
+            columns[column] = values
+    frame = pd.DataFrame(columns)
+    frame[shard_column] = np.nan if shard_value is None else shard_value
+    return frame
+
+def _run_shard(func: Callable[[pd.DataFrame], pd.DataFrame], inputs: Tuple[str, Layout, int],
+               categories: Dict, outputs: Tuple[str, Layout], start: int, stop: int,
+               shard_column: str, shard_value) -> Tuple[Optional[pd.DataFrame], float, int]:
+    """Worker side: read rows [start, stop) from shared memory, run func, write new columns back
+
+    Numeric results go straight into the output segment; any other new
+    columns are returned (pickled) alongside the compute time and worker pid.
+    """
+
+    in_name, in_layout, rows = inputs
+    block = SharedMemory(name=in_name)
+    try:
+        arrays = _read_rows(block, in_layout, rows, start, stop)
+    finally:
+        block.close()
+    frame = _shard_frame(arrays, categories, shard_column, shard_value)
+
+    started = time.perf_counter()
+    result = func(frame)
+    seconds = time.perf_counter() - started
+    if len(result) != len(frame):
+        raise ValueError(f"Sharded step returned {len(result)} rows for {len(frame)}")
+
+    out_name, out_layout = outputs
+    numeric = {column for column, _, _ in out_layout}
+    values = {column: result[column].to_numpy() for column in numeric}
+    for column, dtype, _ in out_layout:
+        if values[column].dtype != np.dtype(dtype):
+            raise TypeError(f"Sharded step returned {values[column].dtype} for {column}, "
+                            f"but its first row gave {np.dtype(dtype)}")
+    block = SharedMemory(name=out_name)
+    try:
+        _write_rows(block, out_layout, rows, start, stop, values)
+    finally:
+        block.close()
+
+    others = [column for column in result.columns if column not in frame.columns and column not in numeric]
+    return (result[others].reset_index(drop=True) if others else None), seconds, os.getpid()
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """The one process pool shared by every CPU-bound job (bulk shards, reports, policy scenarios)
+
+    Workers come from a forkserver rather than fork: the app process runs
+    writer and analytics threads, and forking it could copy a held lock.
+    """
+
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload(FORKSERVER_PRELOAD)
+                _pool = ProcessPoolExecutor(max_workers=worker_count(), mp_context=context)
+    return _pool
+
+def worker_count() -> int:
+    return AppConfig.PROCESS_WORKERS or os.cpu_count() or 1
+
+def shard_bounds(keys: pd.Series, max_rows: int) -> Tuple[np.ndarray, List[Tuple[int, int, object]]]:
+    """Stable sort order grouping rows by key, and (start, stop, key) slices of that order
+
+    Groups larger than max_rows are split into equal pieces so big states still spread across
+    workers. Missing keys form their own group with key None.
+    """
+
+    codes, uniques = pd.factorize(keys, sort=False)
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    edges = np.flatnonzero(np.diff(sorted_codes)) + 1
+    bounds = []
+    for start, stop in zip(np.r_[0, edges], np.r_[edges, len(order)]):
+        code = sorted_codes[start] if stop > start else -1
+        key = None if code < 0 else uniques[code]
+        pieces = np.linspace(start, stop, -(-(stop - start) // max_rows) + 1).round().astype(int)
+        bounds.extend((int(a), int(b), key) for a, b in zip(pieces[:-1], pieces[1:]))
+    return order, bounds
+
+_history: deque = deque(maxlen=SHARD_HISTORY_SIZE)
+
+def _record(step: str, shard, rows: int, seconds: float, wall: float, worker: Optional[int]):
+    _history.append({"step": step, "shard": "-" if shard is None else str(shard), "rows": rows,
+                     "compute_s": seconds, "wall_s": wall, "worker": worker})
+    if enabled():
+        histogram(f"parallel.{step}").observe(seconds)
+
+def shard_report() -> List[Dict]:
+    """Most recent shard timings, oldest first"""
+    return list(_history)
+
+def run_sharded(frame: pd.DataFrame, func: Callable[[pd.DataFrame], pd.DataFrame], shard_column: str = "state",
+                workers: Optional[int] = None, min_rows: Optional[int] = None) -> pd.DataFrame:
+    """Apply a column-adding frame step across the process pool, sharded by shard_column
+
+    func must be a picklable module-level function (or a functools.partial
+    of one) that takes a frame and returns it with extra columns, like
+    recommendations.add_optimal_rates.
+    It sees the numeric, boolean and categorical columns plus shard_column,
+    which holds the shard's single value. Inputs and numeric outputs travel
+    through shared memory; only other new columns are pickled back. Results
+    are merged into frame in its original row order. Frames under min_rows,
+    or a single worker, run in-process.
+    """
+
+    step = getattr(func, "__name__", None) or getattr(getattr(func, "func", None), "__name__", "step")
+    workers = workers or worker_count()  # sets the shard size; the pool itself has PROCESS_WORKERS
+    min_rows = AppConfig.PARALLEL_MIN_ROWS if min_rows is None else min_rows
+    if workers <= 1 or len(frame) < min_rows:
+        started = time.perf_counter()
+        result = func(frame)
+        elapsed = time.perf_counter() - started
+        _record(step, None, len(frame), elapsed, elapsed, None)
+        return result
+
+    wall_start = time.perf_counter()
+    rows = len(frame)
+    keys = frame[shard_column] if shard_column in frame.columns else pd.Series(np.zeros(rows))
+    order, bounds = shard_bounds(keys, math.ceil(rows / (workers * SHARDS_PER_WORKER)))
+    arrays, categories = _shareable(frame, shard_column)
+
+    # One row through func in-process tells which columns it adds and their dtypes
+    probe = func(_shard_frame({column: values[order[:1]] for column, values in arrays.items()},
+                              categories, shard_column, bounds[0][2]))
+    added = [column for column in probe.columns if column not in frame.columns and column != shard_column]
+    numeric_out = {column: probe[column].dtype for column in added
+                   if isinstance(probe[column].dtype, np.dtype) and probe[column].dtype.kind in "biuf"}
+
+    in_layout, in_size = _layout({column: values.dtype for column, values in arrays.items()}, rows)
+    out_layout, out_size = _layout(numeric_out, rows)
+    in_block, out_block = _create_block(in_size), _create_block(out_size)
+    try:
+        _write_rows(in_block, in_layout, rows, 0, rows, {column: values[order] for column, values in arrays.items()})
+
+        pool = get_process_pool()
+        futures = [(start, stop, key, time.perf_counter(),
+                    pool.submit(_run_shard, func, (in_block.name, in_layout, rows), categories,
+                                (out_block.name, out_layout), start, stop, shard_column, key))
+                   for start, stop, key in bounds]
+        pickled, compute = [], 0.0
+        for start, stop, key, submitted, future in futures:
+            others, seconds, worker = future.result()
+            _record(step, key, stop - start, seconds, time.perf_counter() - submitted, worker)
+            compute += seconds
+            if others is not None:
+                others.index = order[start:stop]
+                pickled.append(others)
+
+        merged = {}
+        for column, shard_sorted in _read_rows(out_block, out_layout, rows, 0, rows).items():
+            merged[column] = np.empty(rows, dtype=shard_sorted.dtype)
+            merged[column][order] = shard_sorted
+    finally:
+        for block in (in_block, out_block):
+            block.close()
+            block.unlink()
+
+    if pickled:
+        others = pd.concat(pickled).sort_index()
+        for column in others.columns:
+            merged[column] = others[column].to_numpy()
+    _record(step, "all shards", rows, compute, time.perf_counter() - wall_start, None)
+    return frame.assign(**{column: merged[column] for column in added})
+
+def sharded(func: Callable[[pd.DataFrame], pd.DataFrame], shard_column: str = "state"
+            ) -> Callable[[pd.DataFrame], pd.DataFrame]:
+    """func as a bulk transform that runs through run_sharded"""
+
+    @functools.wraps(func)
+    def transform(frame: pd.DataFrame) -> pd.DataFrame:
+        return run_sharded(frame, func, shard_column)
+    return transform
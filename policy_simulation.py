@@ -0,0 +1,144 @@
+# Monte Carlo policy simulation for Northern Nigeria Fertilizer Advisor
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from parallel import get_process_pool
+from prices import current_prices
+from reference_data import LGAReference, load_lga_reference
+
+# Programme assumptions
+FARMERS_PER_KM2 = 40        # Smallholder maize households per km2 of LGA area
+HECTARES_PER_FARMER = 2.0
+BASE_ADOPTION = 0.2         # Adoption share with no subsidy
+SUBSIDY_ADOPTION_GAIN = 0.5  # Extra adoption share at a 100% subsidy
+ROI_ADOPTION_GAIN = 0.2     # Extra adoption share as LGA ROI grows large
+
+# Uncertainty
+YIELD_RESPONSE_CV = 0.25    # Coefficient of variation of the per-LGA yield gain
+PRICE_SIGMA = 0.15          # Log-sd of the market-wide maize price shock
+ADOPTION_CONCENTRATION = 20  # Beta concentration; larger = less adoption noise
+
+DRAW_BLOCK = 500            # Draws simulated together; bounds memory at DRAW_BLOCK x LGAs
+
+SUMMARY_METRICS = ["farmers_reached", "production_increase_tons", "additional_income_usd",
+                   "programme_cost_usd", "benefit_cost_ratio"]
+
+@dataclass(frozen=True)
+class PolicyScenario:
+    """Policy settings for one simulation; hashable so results can be cached"""
+
+    subsidy_rate: float   # Percent of fertilizer cost paid by the programme
+    coverage: float       # Percent of farmers eligible
+    budget_musd: float    # Annual budget, million USD
+    years: int
+    n_draws: int = 2000
+    seed: int = 0
+
+def lga_inputs(reference: LGAReference) -> Dict[str, np.ndarray]:
+    """Columns of the LGA table the simulation draws on"""
+
+    frame = reference.frame
+    return {col: frame[col].to_numpy(dtype=np.float64)
+            for col in ("yield_increase_kg_ha", "total_cost_usd_ha", "roi_percent", "area_km2")}
+
+def _summarize(draws: np.ndarray) -> Dict[str, float]:
+    draws = draws[np.isfinite(draws)]
+    if draws.size == 0:
+        return {"mean": float("nan"), "p5": float("nan"), "p50": float("nan"), "p95": float("nan")}
+    low, median, high = np.percentile(draws, [5, 50, 95])
+    return {"mean": float(draws.mean()), "p5": float(low), "p50": float(median), "p95": float(high)}
+
+def simulate_scenario(scenario: PolicyScenario, lgas: Dict[str, np.ndarray],
+                      maize_price: float) -> Dict[str, Dict[str, float]]:
+    """Run n_draws vectorized Monte Carlo draws of a scenario over every LGA
+
+    Each draw samples per-LGA adoption and yield gain plus one market-wide maize
+    price shock. If the subsidy bill exceeds the annual budget, adopters are
+    scaled down uniformly. Returns mean and 5/50/95th percentiles of each
+    summary metric over the programme's lifetime.
+    """
+
+    rng = np.random.default_rng(scenario.seed)
+    subsidy = scenario.subsidy_rate / 100
+    annual_budget = scenario.budget_musd * 1e6
+
+    eligible = lgas["area_km2"] * FARMERS_PER_KM2 * scenario.coverage / 100
+    adoption_mean = np.clip(BASE_ADOPTION + SUBSIDY_ADOPTION_GAIN * subsidy
+                            + ROI_ADOPTION_GAIN * np.tanh(np.maximum(lgas["roi_percent"], 0) / 100), 0.01, 0.99)
+    alpha = adoption_mean * ADOPTION_CONCENTRATION
+    beta = (1 - adoption_mean) * ADOPTION_CONCENTRATION
+    cost_ha = lgas["total_cost_usd_ha"]
+    gain_mean = lgas["yield_increase_kg_ha"]
+
+    results = {metric: [] for metric in SUMMARY_METRICS}
+    for start in range(0, scenario.n_draws, DRAW_BLOCK):
+        n = min(DRAW_BLOCK, scenario.n_draws - start)
+
+        adopters = eligible * rng.beta(alpha, beta, size=(n, len(eligible)))
+        subsidy_bill = (adopters * HECTARES_PER_FARMER * cost_ha * subsidy).sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            budget_scale = np.where(subsidy_bill > annual_budget, annual_budget / subsidy_bill, 1.0)
+        adopters *= budget_scale[:, None]
+
+        gain = np.maximum(rng.normal(gain_mean, YIELD_RESPONSE_CV * gain_mean, size=(n, len(gain_mean))), 0)
+        price = maize_price * rng.lognormal(0, PRICE_SIGMA, size=(n, 1))
+
+        hectares = adopters * HECTARES_PER_FARMER
+        production = (hectares * gain).sum(axis=1) / 1000
+        income = (hectares * (gain * price - cost_ha * (1 - subsidy))).sum(axis=1)
+        cost = np.minimum(subsidy_bill, annual_budget)
+
+        results["farmers_reached"].append(adopters.sum(axis=1))
+        results["production_increase_tons"].append(production * scenario.years)
+        results["additional_income_usd"].append(income * scenario.years)
+        results["programme_cost_usd"].append(cost * scenario.years)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            results["benefit_cost_ratio"].append(np.where(cost > 0, income / cost, np.nan))
+
+    return {metric: _summarize(np.concatenate(values)) for metric, values in results.items()}
+
+# Most recently used scenario results kept per process
+RESULTS_CACHE_SIZE = 256
+
+_results_cache: "OrderedDict[Tuple[PolicyScenario, int, float], Dict]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def run_scenarios(scenarios: List[PolicyScenario], reference: Optional[LGAReference] = None,
+                  parallel: bool = True) -> List[Dict[str, Dict[str, float]]]:
+    """Simulate independent scenarios, spread across the shared process pool
+
+    Results are cached by (scenario, LGA data version, maize price), so
+    repeating a scenario, e.g. moving a slider back, returns instantly. The
+    cache keeps the RESULTS_CACHE_SIZE most recently used results.
+    """
+
+    reference = reference or load_lga_reference()
+    maize_price = current_prices()["maize_usd_kg"]
+    keys = [(scenario, reference.version, maize_price) for scenario in scenarios]
+
+    results = {}
+    with _cache_lock:
+        for key in keys:
+            if key in _results_cache:
+                _results_cache.move_to_end(key)
+                results[key] = _results_cache[key]
+    missing = list(dict.fromkeys(key for key in keys if key not in results))
+
+    if missing:
+        lgas = lga_inputs(reference)
+        if parallel and len(missing) > 1:
+            futures = [get_process_pool().submit(simulate_scenario, key[0], lgas, maize_price) for key in missing]
+            computed = [future.result() for future in futures]
+        else:
+            computed = [simulate_scenario(key[0], lgas, maize_price) for key in missing]
+        results.update(zip(missing, computed))
+        with _cache_lock:
+            _results_cache.update(zip(missing, computed))
+            while len(_results_cache) > RESULTS_CACHE_SIZE:
+                _results_cache.popitem(last=False)
+
+    return [results[key] for key in keys]
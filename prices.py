@@ -0,0 +1,151 @@
+# Market price snapshots for Northern Nigeria Fertilizer Advisor
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import AppConfig
+
+logger = logging.getLogger(__name__)
+
+# Row used for farms whose state has no price entry
+DEFAULT_STATE = "default"
+
+USD_PRICE_COLUMNS = ["maize_usd_kg", "urea_usd_kg", "dap_usd_kg", "mop_usd_kg"]
+NAIRA_PRICE_COLUMNS = ["maize_naira_kg", "urea_naira_kg", "dap_naira_kg", "mop_naira_kg"]
+PRICE_COLUMNS = USD_PRICE_COLUMNS + NAIRA_PRICE_COLUMNS
+
+DEFAULT_NAIRA_PRICES = {
+    "maize_naira_kg": 180,
+    "urea_naira_kg": 480,
+    "dap_naira_kg": 1000,
+    "mop_naira_kg": 400
+}
+
+def default_prices() -> Dict[str, float]:
+    """Prices from AppConfig, used when no price table is configured"""
+
+    prices = {"maize_usd_kg": AppConfig.MAIZE_PRICE_USD_KG}
+    prices.update(AppConfig.FERTILIZER_PRICES)
+    prices.update(DEFAULT_NAIRA_PRICES)
+    return {col: float(prices[col]) for col in PRICE_COLUMNS}
+
+@dataclass(frozen=True)
+class PriceSnapshot:
+    """Immutable per-state price table taken at one point in time"""
+
+    table: pd.DataFrame  # Indexed by state, one column per PRICE_COLUMNS entry
+    version: int
+    taken_at: float
+    # Plain dict per state, built once; scalar lookups skip pandas indexing entirely
+    by_state: Dict[str, Dict[str, float]] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "by_state", {state: {col: float(value) for col, value in row.items()}
+                                              for state, row in self.table.to_dict("index").items()})
+
+    def prices(self, state: Optional[str] = None) -> Dict[str, float]:
+        """Prices for a state, falling back to the default row"""
+
+        row = self.by_state.get(state) if state is not None else None
+        return dict(row if row is not None else self.by_state[DEFAULT_STATE])
+
+    def price_arrays(self, states) -> Dict[str, np.ndarray]:
+        """Per-row USD prices for an array of states, for vectorized economics"""
+
+        states = pd.Index(np.asarray(states, dtype=object))
+        states = states.where(states.isin(self.table.index), DEFAULT_STATE)
+        rows = self.table.loc[states, USD_PRICE_COLUMNS]
+        return {col: rows[col].to_numpy(dtype=np.float64) for col in USD_PRICE_COLUMNS}
+
+def _build_table(per_state: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    defaults = default_prices()
+    states = [DEFAULT_STATE] + list(AppConfig.SUPPORTED_STATES)
+    table = pd.DataFrame([defaults] * len(states), index=pd.Index(states, name="state"))
+
+    if per_state is not None:
+        per_state = per_state.set_index("state")
+        columns = [col for col in PRICE_COLUMNS if col in per_state.columns]
+        table = table.reindex(table.index.union(per_state.index, sort=False))
+        table.loc[per_state.index, columns] = per_state[columns].to_numpy()
+        table = table.fillna(pd.Series(defaults))
+    return table.astype(np.float64)
+
+class PriceService:
+    """Keeps the current PriceSnapshot in memory and refreshes it on a schedule
+
+    The snapshot is rebuilt when refresh_seconds have passed and the price
+    file's mtime has changed since the last load. Callers that price many
+    farms should take one snapshot() and reuse it for the whole run.
+    """
+
+    def __init__(self, path: Optional[str] = None, refresh_seconds: Optional[float] = None):
+        self.path = path if path is not None else AppConfig.PRICE_TABLE_PATH
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else AppConfig.PRICE_REFRESH_SECONDS
+        self._lock = threading.Lock()
+        self._source_mtime = None
+        self._next_check = 0.0
+        self._snapshot = self._load(version=1)
+
+    def _file_mtime(self) -> Optional[int]:
+        if not self.path:
+            return None
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load(self, version: int) -> PriceSnapshot:
+        mtime = self._file_mtime()
+        per_state = None
+        if mtime is not None:
+            try:
+                per_state = pd.read_csv(self.path)
+            except Exception:
+                logger.exception("Could not read price table %s; using defaults", self.path)
+        self._source_mtime = mtime
+        self._next_check = time.monotonic() + self.refresh_seconds
+        return PriceSnapshot(_build_table(per_state), version, time.time())
+
+    def snapshot(self) -> PriceSnapshot:
+        """Current snapshot; cheap to call, reloads at most once per refresh interval"""
+
+        if time.monotonic() < self._next_check:
+            return self._snapshot
+
+        with self._lock:
+            if time.monotonic() >= self._next_check:
+                if self._file_mtime() != self._source_mtime:
+                    self._snapshot = self._load(self._snapshot.version + 1)
+                else:
+                    self._next_check = time.monotonic() + self.refresh_seconds
+        return self._snapshot
+
+    def refresh(self) -> PriceSnapshot:
+        """Reload prices now"""
+
+        with self._lock:
+            self._snapshot = self._load(self._snapshot.version + 1)
+        return self._snapshot
+
+_service: Optional[PriceService] = None
+_service_lock = threading.Lock()
+
+def get_price_service() -> PriceService:
+    """Process-wide price service, created on first use"""
+
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = PriceService()
+    return _service
+
+def current_prices(state: Optional[str] = None) -> Dict[str, float]:
+    """Prices for a state from the current snapshot"""
+    return get_price_service().snapshot().prices(state)
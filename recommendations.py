@@ -0,0 +1,348 @@
+# Recommendation engine for Northern Nigeria Fertilizer Advisor
+import math
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+from instrumentation import timed
+from prices import USD_PRICE_COLUMNS, PriceSnapshot, current_prices, get_price_service
+from utils import NutrientCalculator
+
+# Columns expected on farmer lists passed to calculate_bulk_recommendations
+BULK_INPUT_COLUMNS = ["n_percent", "p_ppm", "k_ppm", "previous_yield", "target_yield", "farm_size"]
+
+# Column order of the frame returned by calculate_bulk_recommendations
+BULK_OUTPUT_COLUMNS = [
+    "n_limitation", "p_limitation", "k_limitation",
+    "n_rate", "p2o5_rate", "k2o_rate",
+    "urea_kg", "dap_kg", "mop_kg",
+    "total_cost", "expected_yield", "yield_increase",
+    "revenue_increase", "net_profit", "roi"
+]
+
+LIMITATION_LEVELS = ["High", "Medium", "Low"]
+
+# Convert qualitative visual assessment to quantitative estimates
+COLOR_N_MAP = {
+    "Very Dark Brown/Black": 2.0,
+    "Dark Brown": 1.5,
+    "Brown": 1.2,
+    "Light Brown": 0.8,
+    "Red": 0.9,
+    "Gray": 0.7
+}
+
+TEXTURE_PK_MAP = {
+    "Very Sandy (gritty)": {"p": 8, "k": 80},
+    "Sandy": {"p": 12, "k": 120},
+    "Balanced (loamy)": {"p": 20, "k": 200},
+    "Clay-like (sticky)": {"p": 25, "k": 250}
+}
+
+YIELD_MAP = {
+    "Less than 1 ton": 800,
+    "1-2 tons": 1500,
+    "2-3 tons": 2500,
+    "3-4 tons": 3500,
+    "More than 4 tons": 4500
+}
+
+TARGET_MAP = {
+    "2 tons/ha": 2000,
+    "3 tons/ha": 3000,
+    "4 tons/ha": 4000,
+    "5 tons/ha": 5000
+}
+
+# Soil test quantization steps for the per-hectare cache. Every limitation
+# threshold is a whole multiple of its step, so flooring never changes a tier.
+N_STEP, P_STEP, K_STEP = 0.01, 0.1, 1.0
+SOIL_TEST_CACHE_SIZE = 4096
+
+@timed("recommendations.calculate_simple_recommendations")
+def calculate_simple_recommendations(n_percent, p_ppm, k_ppm, prev_yield, target_yield, farm_size,
+                                     prices: Optional[Dict[str, float]] = None):
+    """Simplified recommendation calculation
+
+    prices defaults to the default row of the current price snapshot.
+    """
+
+    prices = prices or current_prices()
+
+    # Limitation assessment
+    n_limitation = "High" if n_percent < 1.0 else "Medium" if n_percent < 1.5 else "Low"
+    p_limitation = "High" if p_ppm < 15 else "Medium" if p_ppm < 25 else "Low"
+    k_limitation = "High" if k_ppm < 120 else "Medium" if k_ppm < 200 else "Low"
+
+    # Base rates (kg/ha)
+    base_n = 80 if n_limitation == "High" else 60 if n_limitation == "Medium" else 40
+    base_p = 50 if p_limitation == "High" else 35 if p_limitation == "Medium" else 25
+    base_k = 40 if k_limitation == "High" else 30 if k_limitation == "Medium" else 20
+
+    # Adjust for yield target
+    yield_factor = min(target_yield / 3000, 1.5)
+
+    n_rec = base_n * yield_factor
+    p_rec = base_p * yield_factor
+    k_rec = base_k * yield_factor
+
+    # Convert to fertilizer products
+    urea_needed = (n_rec / 0.46) * farm_size  # Urea is 46% N
+    dap_needed = (p_rec / 0.46) * farm_size   # DAP is 46% P2O5
+    mop_needed = (k_rec / 0.60) * farm_size   # MOP is 60% K2O
+
+    # Economic analysis
+    fertilizer_cost = (n_rec * prices["urea_usd_kg"] + p_rec * prices["dap_usd_kg"]
+                       + k_rec * prices["mop_usd_kg"]) * farm_size
+    expected_yield = min(prev_yield * 1.3, target_yield)
+    yield_increase = expected_yield - prev_yield
+
+    revenue_increase = yield_increase * farm_size * prices["maize_usd_kg"]
+    net_profit = revenue_increase - fertilizer_cost
+    roi = (net_profit / fertilizer_cost * 100) if fertilizer_cost > 0 else 0
+
+    return {
+        'limitations': {'N': n_limitation, 'P': p_limitation, 'K': k_limitation},
+        'fertilizers': {
+            'urea_kg': urea_needed,
+            'dap_kg': dap_needed,
+            'mop_kg': mop_needed
+        },
+        'rates': {'N': n_rec, 'P2O5': p_rec, 'K2O': k_rec},
+        'economics': {
+            'total_cost': fertilizer_cost,
+            'expected_yield': expected_yield,
+            'yield_increase': yield_increase,
+            'revenue_increase': revenue_increase,
+            'net_profit': net_profit,
+            'roi': roi
+        },
+        'farm_size': farm_size
+    }
+
+def _limitation_tier(values: np.ndarray, high: float, medium: float) -> np.ndarray:
+    """Map nutrient values to tier codes (0=High, 1=Medium, 2=Low limitation)"""
+
+    return np.where(values < high, 0, np.where(values < medium, 1, 2)).astype(np.int8)
+
+def missing_bulk_columns(df: pd.DataFrame) -> List[str]:
+    """List required bulk input columns absent from a farmer frame"""
+
+    return [col for col in BULK_INPUT_COLUMNS if col not in df.columns]
+
+@timed("recommendations.calculate_bulk_recommendations")
+def calculate_bulk_recommendations(farmers: pd.DataFrame, snapshot: Optional[PriceSnapshot] = None) -> pd.DataFrame:
+    """Vectorized calculate_simple_recommendations over a frame of farmers
+
+    Every column operation mirrors the scalar function step for step, so each
+    row is identical to calling calculate_simple_recommendations on it with
+    its state's prices. Farms are priced from snapshot (the current one if not
+    given) using the optional state column.
+    """
+
+    missing = missing_bulk_columns(farmers)
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+    snapshot = snapshot or get_price_service().snapshot()
+    if "state" in farmers.columns:
+        prices = snapshot.price_arrays(farmers["state"])
+    else:
+        prices = snapshot.prices()
+
+    n_percent = farmers["n_percent"].to_numpy(dtype=np.float64)
+    p_ppm = farmers["p_ppm"].to_numpy(dtype=np.float64)
+    k_ppm = farmers["k_ppm"].to_numpy(dtype=np.float64)
+    prev_yield = farmers["previous_yield"].to_numpy(dtype=np.float64)
+    target_yield = farmers["target_yield"].to_numpy(dtype=np.float64)
+    farm_size = farmers["farm_size"].to_numpy(dtype=np.float64)
+
+    # Limitation assessment
+    n_tier = _limitation_tier(n_percent, 1.0, 1.5)
+    p_tier = _limitation_tier(p_ppm, 15, 25)
+    k_tier = _limitation_tier(k_ppm, 120, 200)
+
+    # Base rates (kg/ha), indexed by tier code
+    base_n = np.array([80, 60, 40], dtype=np.float64)[n_tier]
+    base_p = np.array([50, 35, 25], dtype=np.float64)[p_tier]
+    base_k = np.array([40, 30, 20], dtype=np.float64)[k_tier]
+
+    # Adjust for yield target
+    yield_factor = np.minimum(target_yield / 3000, 1.5)
+
+    n_rec = base_n * yield_factor
+    p_rec = base_p * yield_factor
+    k_rec = base_k * yield_factor
+
+    # Convert to fertilizer products
+    urea_needed = (n_rec / 0.46) * farm_size
+    dap_needed = (p_rec / 0.46) * farm_size
+    mop_needed = (k_rec / 0.60) * farm_size
+
+    # Economic analysis
+    fertilizer_cost = (n_rec * prices["urea_usd_kg"] + p_rec * prices["dap_usd_kg"]
+                       + k_rec * prices["mop_usd_kg"]) * farm_size
+    expected_yield = np.minimum(prev_yield * 1.3, target_yield)
+    yield_increase = expected_yield - prev_yield
+
+    revenue_increase = yield_increase * farm_size * prices["maize_usd_kg"]
+    net_profit = revenue_increase - fertilizer_cost
+    with np.errstate(divide="ignore", invalid="ignore"):
+        roi = np.where(fertilizer_cost > 0, net_profit / fertilizer_cost * 100, 0.0)
+
+    levels = pd.CategoricalDtype(LIMITATION_LEVELS)
+    return pd.DataFrame({
+        "n_limitation": pd.Categorical.from_codes(n_tier, dtype=levels),
+        "p_limitation": pd.Categorical.from_codes(p_tier, dtype=levels),
+        "k_limitation": pd.Categorical.from_codes(k_tier, dtype=levels),
+        "n_rate": n_rec,
+        "p2o5_rate": p_rec,
+        "k2o_rate": k_rec,
+        "urea_kg": urea_needed,
+        "dap_kg": dap_needed,
+        "mop_kg": mop_needed,
+        "total_cost": fertilizer_cost,
+        "expected_yield": expected_yield,
+        "yield_increase": yield_increase,
+        "revenue_increase": revenue_increase,
+        "net_profit": net_profit,
+        "roi": roi
+    }, index=farmers.index)
+
+def add_optimal_rates(results: pd.DataFrame, snapshot: Optional[PriceSnapshot] = None) -> pd.DataFrame:
+    """Add economic-optimum rate columns (opt_*) to bulk recommendation output
+
+    Optimizes from each farm's previous yield, priced per state when a state
+    column is present. An optional budget_usd column caps each farm's spend.
+    """
+
+    snapshot = snapshot or get_price_service().snapshot()
+    # Maize and fertilizer prices come from the same per-state rows
+    prices = snapshot.price_arrays(results["state"]) if "state" in results.columns else snapshot.prices()
+    budget = results["budget_usd"].to_numpy(dtype=np.float64) if "budget_usd" in results.columns else None
+    if budget is not None:
+        budget = np.where(np.isnan(budget), np.inf, budget)
+
+    optimum = NutrientCalculator.optimize_rates(
+        results["previous_yield"].to_numpy(dtype=np.float64),
+        results["farm_size"].to_numpy(dtype=np.float64),
+        budget=budget, maize_price=prices["maize_usd_kg"], fertilizer_prices=prices
+    )
+    return results.assign(
+        opt_n_rate=optimum["n_rate"],
+        opt_p2o5_rate=optimum["p_rate"],
+        opt_k2o_rate=optimum["k_rate"],
+        opt_expected_yield=optimum["expected_yield"],
+        opt_total_cost=optimum["fertilizer_cost"],
+        opt_net_profit=optimum["net_profit"]
+    )
+
+def _price_key(prices: Dict[str, float]) -> Tuple[float, ...]:
+    """Hashable USD prices for use in cache keys"""
+    return tuple(prices[col] for col in USD_PRICE_COLUMNS)
+
+def _prices_from_key(price_key: Tuple[float, ...]) -> Dict[str, float]:
+    return dict(zip(USD_PRICE_COLUMNS, price_key))
+
+def _scale_to_farm(per_ha: Dict, farm_size: float, maize_price: float) -> Dict:
+    """Scale a 1-hectare recommendation to farm_size
+
+    Product quantities and cost are linear in farm size; revenue is recomputed
+    in calculate_simple_recommendations' operation order, so the result is
+    bit-identical to calling it with farm_size directly.
+    """
+
+    fertilizers = per_ha['fertilizers']
+    economics = per_ha['economics']
+
+    fertilizer_cost = economics['total_cost'] * farm_size
+    revenue_increase = economics['yield_increase'] * farm_size * maize_price
+    net_profit = revenue_increase - fertilizer_cost
+    roi = (net_profit / fertilizer_cost * 100) if fertilizer_cost > 0 else 0
+
+    return {
+        'limitations': dict(per_ha['limitations']),
+        'fertilizers': {
+            'urea_kg': fertilizers['urea_kg'] * farm_size,
+            'dap_kg': fertilizers['dap_kg'] * farm_size,
+            'mop_kg': fertilizers['mop_kg'] * farm_size
+        },
+        'rates': dict(per_ha['rates']),
+        'economics': {
+            'total_cost': fertilizer_cost,
+            'expected_yield': economics['expected_yield'],
+            'yield_increase': economics['yield_increase'],
+            'revenue_increase': revenue_increase,
+            'net_profit': net_profit,
+            'roi': roi
+        },
+        'farm_size': farm_size
+    }
+
+@lru_cache(maxsize=16)
+def _visual_lookup(price_key: Tuple[float, ...]) -> Dict[Tuple[str, str, str, str], Dict]:
+    """Per-hectare recommendations for every visual assessment combination
+
+    6 colors x 4 textures x 5 yields x 4 targets = 480 entries, built once per
+    distinct set of prices.
+    """
+
+    prices = _prices_from_key(price_key)
+    return {
+        (color, texture, prev, target): calculate_simple_recommendations(
+            n_est, pk["p"], pk["k"], prev_yield, target_yield, 1.0, prices
+        )
+        for color, n_est in COLOR_N_MAP.items()
+        for texture, pk in TEXTURE_PK_MAP.items()
+        for prev, prev_yield in YIELD_MAP.items()
+        for target, target_yield in TARGET_MAP.items()
+    }
+
+@lru_cache(maxsize=SOIL_TEST_CACHE_SIZE)
+def _soil_test_per_hectare(n_key: int, p_key: int, k_key: int, prev_yield: float, target_yield: float,
+                           price_key: Tuple[float, ...]) -> Dict:
+    return calculate_simple_recommendations(n_key * N_STEP, p_key * P_STEP, k_key * K_STEP,
+                                            prev_yield, target_yield, 1.0, _prices_from_key(price_key))
+
+def soil_test_recommendations(n_percent, p_ppm, k_ppm, prev_yield, target_yield, farm_size,
+                              prices: Optional[Dict[str, float]] = None) -> Dict:
+    """calculate_simple_recommendations through a bounded cache keyed on quantized N/P/K"""
+
+    prices = prices or current_prices()
+    per_ha = _soil_test_per_hectare(
+        math.floor(n_percent / N_STEP), math.floor(p_ppm / P_STEP), math.floor(k_ppm / K_STEP),
+        prev_yield, target_yield, _price_key(prices)
+    )
+    return _scale_to_farm(per_ha, farm_size, prices["maize_usd_kg"])
+
+def visual_soil_estimates(soil_color: str, soil_texture: str) -> Tuple[float, float, float]:
+    """Estimated N (%), P (ppm) and K (ppm) from soil color and texture"""
+
+    n_est = COLOR_N_MAP.get(soil_color, 1.2)
+    p_est = TEXTURE_PK_MAP.get(soil_texture, {"p": 15})["p"]
+    k_est = TEXTURE_PK_MAP.get(soil_texture, {"k": 150})["k"]
+    return n_est, p_est, k_est
+
+@timed("recommendations.process_visual_assessment")
+def process_visual_assessment(soil_color, soil_texture, prev_yield, target_yield, 
+                            farm_size, has_test=False, n=None, p=None, k=None, ph=None, state=None):
+    """Process visual soil assessment into recommendations"""
+
+    prices = current_prices(state)
+
+    # Use test results if available, otherwise look up the precomputed estimate
+    if has_test and all([n, p, k, ph]):
+        return soil_test_recommendations(n, p, k, YIELD_MAP[prev_yield], TARGET_MAP[target_yield],
+                                         farm_size, prices)
+
+    per_ha = _visual_lookup(_price_key(prices)).get((soil_color, soil_texture, prev_yield, target_yield))
+    if per_ha is None:
+        n_est, p_est, k_est = visual_soil_estimates(soil_color, soil_texture)
+        return calculate_simple_recommendations(n_est, p_est, k_est, YIELD_MAP[prev_yield],
+                                                TARGET_MAP[target_yield], farm_size, prices)
+
+    return _scale_to_farm(per_ha, farm_size, prices["maize_usd_kg"])
+
+# Build the table for the configured prices at startup
+_visual_lookup(_price_key(current_prices()))
@@ -0,0 +1,72 @@
+# LGA reference data for Northern Nigeria Fertilizer Advisor
+import os
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+from config import AppConfig
+from schema import LGA_COLUMN_DTYPES, LGA_FLOAT32_COLUMNS, compact_frame
+
+class LGAReference:
+    """LGA nutrient status and recommendation table indexed by (state, lga_name)"""
+
+    def __init__(self, frame: pd.DataFrame, version: int):
+        self.frame = frame
+        self.version = version
+
+        states = frame["state"].astype(str).to_numpy()
+        lgas = frame["lga_name"].astype(str).to_numpy()
+        self._positions: Dict[Tuple[str, str], int] = {key: pos for pos, key in enumerate(zip(states, lgas))}
+
+        self._lgas_by_state: Dict[str, List[str]] = {}
+        for state, lga in sorted(self._positions):
+            self._lgas_by_state.setdefault(state, []).append(lga)
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def states(self) -> List[str]:
+        """States with at least one LGA in the table"""
+        return list(self._lgas_by_state)
+
+    def lgas(self, state: str) -> List[str]:
+        """Sorted LGA names for a state (empty if the state has none)"""
+        return self._lgas_by_state.get(state, [])
+
+    def lookup(self, state: str, lga_name: str) -> Optional[Dict]:
+        """Reference row for an LGA as a dict, or None if it is not in the table"""
+
+        pos = self._positions.get((state, lga_name))
+        if pos is None:
+            return None
+        return self.frame.iloc[pos].to_dict()
+
+_cache: Dict[str, LGAReference] = {}
+_cache_lock = threading.Lock()
+
+def _read_lga_table(path: str) -> pd.DataFrame:
+    frame = pd.read_csv(path)
+    dtypes = {col: dtype for col, dtype in LGA_COLUMN_DTYPES.items() if col in frame.columns}
+    # Downcast only the known measurement columns, and only when they parsed as numbers;
+    # compact_frame infers lossless dtypes for everything else (extra text, IDs, coordinates)
+    dtypes.update({col: np.float32 for col in LGA_FLOAT32_COLUMNS
+                   if col in frame.columns and pd.api.types.is_numeric_dtype(frame[col].dtype)})
+    return compact_frame(frame, dtypes, name=f"lga_reference:{os.path.basename(path)}")
+
+def load_lga_reference(path: Optional[str] = None) -> LGAReference:
+    """Load the LGA table once per process, reloading only when the file changes"""
+
+    path = os.path.abspath(path or AppConfig.LGA_DATA_PATH)
+    version = os.stat(path).st_mtime_ns
+
+    cached = _cache.get(path)
+    if cached is not None and cached.version == version:
+        return cached
+
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is None or cached.version != version:
+            cached = LGAReference(_read_lga_table(path), version)
+            _cache[path] = cached
+    return cached
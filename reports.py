@@ -0,0 +1,222 @@
+# Farmer recommendation reports for Northern Nigeria Fertilizer Advisor
+import os
+import re
+import textwrap
+import threading
+import zipfile
+import zlib
+from collections import deque
+from string import Template
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from config import AppConfig
+from parallel import get_process_pool, worker_count
+
+# A4 page in PDF points
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+MARGIN = 56
+WRAP_CHARS = 95
+# Template line prefix -> (font resource, size, leading)
+LINE_STYLES = {"# ": ("F2", 18, 30), "## ": ("F2", 13, 24), "": ("F1", 10, 15)}
+BAG_KG = 50
+
+# Reports rendered per pool task, and tasks queued per worker; together these
+# bound how many finished PDFs can be waiting in memory for the ZIP writer
+REPORTS_PER_TASK = 50
+TASKS_IN_FLIGHT_PER_WORKER = 2
+
+# Bulk result columns used to name and label each farmer's report, first match wins
+NAME_COLUMNS = ["farmer_name", "name", "farmer_id"]
+LOCATION_COLUMNS = ["lga", "village", "location", "state"]
+
+_template_cache: Dict[str, Tuple[int, Template]] = {}
+_template_lock = threading.Lock()
+
+def load_template(path: Optional[str] = None) -> Template:
+    """Report template, parsed once per process and reloaded when the file changes"""
+
+    path = path or AppConfig.REPORT_TEMPLATE_PATH
+    version = os.stat(path).st_mtime_ns
+    cached = _template_cache.get(path)
+    if cached is None or cached[0] != version:
+        with open(path, encoding="utf-8") as f:
+            cached = (version, Template(f.read()))
+        with _template_lock:
+            _template_cache[path] = cached
+    return cached[1]
+
+def recommendation_from_row(row: Dict) -> Dict:
+    """Bulk result row in the nested shape process_visual_assessment returns"""
+
+    return {
+        'limitations': {'N': row['n_limitation'], 'P': row['p_limitation'], 'K': row['k_limitation']},
+        'fertilizers': {'urea_kg': row['urea_kg'], 'dap_kg': row['dap_kg'], 'mop_kg': row['mop_kg']},
+        'rates': {'N': row['n_rate'], 'P2O5': row['p2o5_rate'], 'K2O': row['k2o_rate']},
+        'economics': {key: row[key] for key in
+                      ['total_cost', 'expected_yield', 'yield_increase', 'revenue_increase', 'net_profit', 'roi']},
+    }
+
+def _usd(amount: float) -> str:
+    return f"{'-' if amount < 0 else ''}${abs(amount):,.0f}"
+
+def report_context(rec: Dict, farmer: str = "", location: str = "", farm_size: Optional[float] = None,
+                   season: str = "") -> Dict[str, str]:
+    """Formatted template values for one recommendation"""
+
+    fertilizers, rates, economics = rec['fertilizers'], rec['rates'], rec['economics']
+    context = {
+        'season': season, 'farmer': farmer or "-", 'location': location or "-",
+        'farm_size': "-" if farm_size is None or pd.isna(farm_size) else f"{farm_size:g}",
+        'n_limitation': rec['limitations']['N'], 'p_limitation': rec['limitations']['P'],
+        'k_limitation': rec['limitations']['K'],
+        'n_rate': f"{rates['N']:.0f}", 'p2o5_rate': f"{rates['P2O5']:.0f}", 'k2o_rate': f"{rates['K2O']:.0f}",
+        'total_cost': _usd(economics['total_cost']), 'expected_yield': f"{economics['expected_yield']:,.0f}",
+        'yield_increase': f"{economics['yield_increase']:,.0f}", 'net_profit': _usd(economics['net_profit']),
+        'roi': f"{economics['roi']:.0f}",
+    }
+    for product in ('urea', 'dap', 'mop'):
+        kg = fertilizers[f'{product}_kg']
+        context[f'{product}_kg'] = f"{kg:,.0f}"
+        context[f'{product}_bags'] = f"{-(-kg // BAG_KG):.0f}"  # round up to whole bags
+    return context
+
+def _pdf_text(text: str) -> bytes:
+    encoded = text.encode("cp1252", errors="replace")
+    return encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+def _layout(text: str) -> List[bytes]:
+    """Content stream per page for the template's heading/body lines"""
+
+    pages, ops = [], []
+    y = PAGE_HEIGHT - MARGIN
+    for line in text.splitlines():
+        prefix = next(p for p in LINE_STYLES if line.startswith(p))
+        font, size, leading = LINE_STYLES[prefix]
+        for part in textwrap.wrap(line[len(prefix):], WRAP_CHARS) or [""]:
+            if y - leading < MARGIN:
+                pages.append(b"".join(ops))
+                ops, y = [], PAGE_HEIGHT - MARGIN
+            y -= leading
+            if part:
+                ops.append(b"BT /%s %d Tf %d %d Td (%s) Tj ET\n" % (font.encode(), size, MARGIN, y, _pdf_text(part)))
+    pages.append(b"".join(ops))
+    return pages
+
+def _pdf_document(page_streams: List[bytes]) -> bytes:
+    """Minimal PDF 1.4 file with Helvetica text pages and compressed content streams"""
+
+    n_pages = len(page_streams)
+    page_ids = [5 + 2 * i for i in range(n_pages)]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % pid for pid in page_ids), n_pages),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+    for pid, stream in zip(page_ids, page_streams):
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+                       b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>"
+                       % (PAGE_WIDTH, PAGE_HEIGHT, pid + 1))
+        compressed = zlib.compress(stream)
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(compressed), compressed))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+def render_report(rec: Dict, farmer: str = "", location: str = "", farm_size: Optional[float] = None,
+                  season: str = "") -> bytes:
+    """One farmer's recommendation report as PDF bytes"""
+
+    text = load_template().safe_substitute(report_context(rec, farmer, location, farm_size, season))
+    return _pdf_document(_layout(text))
+
+def _render_batch(batch: List[Tuple[str, Dict, Dict]]) -> List[Tuple[str, bytes]]:
+    return [(file_name, render_report(rec, **labels)) for file_name, rec, labels in batch]
+
+def _first_value(row: Dict, columns: List[str]) -> str:
+    for column in columns:
+        value = row.get(column)
+        if value is not None and not pd.isna(value) and str(value).strip():
+            return str(value).strip()
+    return ""
+
+def _report_items(results: Iterable[pd.DataFrame], season: str) -> Iterator[Tuple[str, Dict, Dict]]:
+    number = 0
+    for chunk in results:
+        for row in chunk.to_dict("records"):
+            number += 1
+            farmer = _first_value(row, NAME_COLUMNS)
+            slug = re.sub(r"[^A-Za-z0-9]+", "_", farmer).strip("_")[:40]
+            labels = {'farmer': farmer, 'location': _first_value(row, LOCATION_COLUMNS),
+                      'farm_size': row.get('farm_size'), 'season': season}
+            yield f"{number:06d}_{slug or 'farmer'}.pdf", recommendation_from_row(row), labels
+
+def iter_rendered_reports(items: Iterable[Tuple[str, Dict, Dict]], parallel: bool = True
+                          ) -> Iterator[Tuple[str, bytes]]:
+    """Render (file_name, rec, labels) items across the process pool, yielding PDFs in input order
+
+    Only a few batches per worker are queued at a time, so a slow consumer
+    never lets rendered reports pile up in memory.
+    """
+
+    batches = _batched(items, REPORTS_PER_TASK)
+    if not parallel:
+        for batch in batches:
+            yield from _render_batch(batch)
+        return
+
+    pool = get_process_pool()
+    max_in_flight = worker_count() * TASKS_IN_FLIGHT_PER_WORKER
+    pending = deque()
+    for batch in batches:
+        pending.append(pool.submit(_render_batch, batch))
+        if len(pending) >= max_in_flight:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
+
+def _batched(items: Iterable, size: int) -> Iterator[List]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def write_reports_zip(results: Iterable[pd.DataFrame], output, season: Optional[str] = None,
+                      progress: Optional[Callable[[int], None]] = None, parallel: bool = True) -> int:
+    """Render one PDF per bulk result row and stream them into a ZIP archive
+
+    results is an iterable of bulk result chunks (e.g. ingest.iter_result_chunks);
+    output is a path or writable file. Each PDF is written as soon as it is
+    rendered. progress, if given, receives the running report count after each
+    batch. Returns the number of reports written.
+    """
+
+    if season is None:
+        from database import current_season
+        season = current_season()
+
+    written = 0
+    # PDF content streams are already deflated, so the archive stores them as is
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_STORED) as archive:
+        for file_name, pdf in iter_rendered_reports(_report_items(results, season), parallel):
+            archive.writestr(file_name, pdf)
+            written += 1
+            if progress is not None and written % REPORTS_PER_TASK == 0:
+                progress(written)
+    if progress is not None:
+        progress(written)
+    return written
@@ -0,0 +1,209 @@
+# Compact column dtypes and memory accounting for Northern Nigeria Fertilizer Advisor
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Column dtypes for npk_fertilizer_recommendations.csv
+LGA_COLUMN_DTYPES = {
+    "lga_name": "category",
+    "state": "category",
+    "N_status": "category",
+    "P_status": "category",
+    "K_status": "category",
+    "pH_status": "category",
+    "priority_rank": "category",
+    "N_rec_kg_ha": np.int16,
+    "P_rec_kg_ha": np.int16,
+    "K_rec_kg_ha": np.int16,
+}
+
+# Measured and derived values in that file, stored as float32 (about 7 significant digits is
+# plenty for them); other numeric columns in a user-supplied table keep their parsed precision
+LGA_FLOAT32_COLUMNS = (
+    "area_km2", "N_percent", "P_ppm", "K_ppm", "pH", "lime_rec_tons_ha", "current_yield_kg_ha",
+    "potential_yield_kg_ha", "yield_increase_kg_ha", "yield_increase_percent", "total_cost_usd_ha",
+    "net_benefit_usd_ha", "roi_percent", "environmental_impact_score", "combined_limitation_index",
+)
+
+# Decimal places farmer list columns are recorded to. A column is stored as
+# float32 only if every value has at most this many decimals and survives the
+# float32 round trip at that precision; restore_precision then recovers the
+# exact float64 values, so calculations see the same numbers as a raw parse.
+FARMER_COLUMN_DECIMALS = {
+    "n_percent": 3,
+    "p_ppm": 1,
+    "k_ppm": 1,
+    "ph": 2,
+    "previous_yield": 1,
+    "target_yield": 1,
+    "farm_size": 2,
+    "latitude": 5,
+    "longitude": 5,
+    "budget_usd": 2,
+}
+
+# String columns known to repeat a few values; other text (names, phone numbers,
+# villages) stays as strings so consumers can fill and edit it freely
+CATEGORY_COLUMNS = ("state", "lga")
+CATEGORY_SUFFIXES = ("_status",)
+
+# Those columns become categoricals while they have at most this many distinct
+# values, and those values are at most this fraction of the rows seen
+CATEGORY_MAX_LEVELS = 10_000
+CATEGORY_MAX_RATIO = 0.5
+
+INTEGER_TYPES = (np.int8, np.int16, np.int32)
+# Integers up to this magnitude are exact in float32
+FLOAT32_EXACT_INT = 2 ** 24
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    """Memory held by a frame, including the Python strings in object columns"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+def float32_exact(values: np.ndarray, decimals: int) -> bool:
+    """True if values have at most decimals places and float32 keeps them at that precision"""
+
+    rounded = np.round(values, decimals)
+    if not np.array_equal(rounded, values, equal_nan=True):
+        return False
+    widened = np.round(rounded.astype(np.float32).astype(np.float64), decimals)
+    return np.array_equal(widened, rounded, equal_nan=True)
+
+def _kind(dtype) -> str:
+    if pd.api.types.is_bool_dtype(dtype):
+        return "bool"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "int"
+    if pd.api.types.is_float_dtype(dtype):
+        return "float"
+    if isinstance(dtype, pd.CategoricalDtype) or dtype == object or pd.api.types.is_string_dtype(dtype):
+        return "text"
+    return "other"
+
+class DtypeNarrower:
+    """Chooses compact dtypes for a frame seen whole or as a stream of chunks
+
+    observe() each chunk, then dtypes() gives the narrowest pandas dtype
+    every chunk fits: the smallest integer type holding the observed range,
+    category for the known low-cardinality string columns (CATEGORY_COLUMNS
+    and *_status), and float32 for columns listed in decimals whose values
+    all survive the round trip. Columns it cannot narrow are left out of the
+    result.
+
+    Chunks may infer a column's type differently; a column seen as both
+    integer and float is treated as float, any other mix is left alone.
+    """
+
+    def __init__(self, decimals: Optional[Dict[str, int]] = None, categorical: Sequence[str] = CATEGORY_COLUMNS):
+        self.decimals = FARMER_COLUMN_DECIMALS if decimals is None else decimals
+        self.categorical = set(categorical)
+        self.rows = 0
+        self._int_ranges: Dict[str, tuple] = {}
+        self._levels: Dict[str, set] = {}
+        self._float32_ok: Dict[str, bool] = {}
+        self._kinds: Dict[str, str] = {}
+        self._rejected = set()
+
+    def observe(self, chunk: pd.DataFrame) -> "DtypeNarrower":
+        self.rows += len(chunk)
+        for column in chunk.columns:
+            if column in self._rejected:
+                continue
+            series = chunk[column]
+            kind = _kind(series.dtype)
+            seen = self._kinds.setdefault(column, kind)
+            if kind != seen:
+                if {kind, seen} != {"int", "float"}:
+                    self._reject(column)
+                    continue
+                self._kinds[column] = "float"
+
+            if self._kinds[column] == "int":
+                if series.empty:
+                    continue
+                low, high = int(series.min()), int(series.max())
+                seen = self._int_ranges.get(column, (low, high))
+                self._int_ranges[column] = (min(seen[0], low), max(seen[1], high))
+            elif self._kinds[column] == "float" and column in self.decimals:
+                ok = self._float32_ok.get(column, True)
+                ints = self._int_ranges.pop(column, None)
+                if ints is not None:
+                    ok = ok and max(abs(ints[0]), abs(ints[1])) <= FLOAT32_EXACT_INT
+                self._float32_ok[column] = ok and float32_exact(series.to_numpy(np.float64),
+                                                                self.decimals[column])
+            elif self._kinds[column] == "text" and self._is_categorical(column):
+                levels = self._levels.setdefault(column, set())
+                levels.update(series.dropna().unique())
+                if len(levels) > CATEGORY_MAX_LEVELS:
+                    self._reject(column)
+            else:
+                self._reject(column)
+        return self
+
+    def _is_categorical(self, column: str) -> bool:
+        return column in self.categorical or column.endswith(CATEGORY_SUFFIXES)
+
+    def _reject(self, column: str):
+        self._rejected.add(column)
+        for tracked in (self._int_ranges, self._levels, self._float32_ok):
+            tracked.pop(column, None)
+
+    def dtypes(self) -> Dict[str, object]:
+        chosen = {}
+        for column, (low, high) in self._int_ranges.items():
+            for candidate in INTEGER_TYPES:
+                bounds = np.iinfo(candidate)
+                if bounds.min <= low and high <= bounds.max:
+                    chosen[column] = candidate
+                    break
+        for column, levels in self._levels.items():
+            if all(isinstance(level, str) for level in levels) and len(levels) <= CATEGORY_MAX_RATIO * self.rows:
+                chosen[column] = "category"
+        for column, ok in self._float32_ok.items():
+            if ok:
+                chosen[column] = np.float32
+        return chosen
+
+def restore_precision(df: pd.DataFrame, decimals: Optional[Dict[str, int]] = None) -> pd.DataFrame:
+    """Widen float32 columns back to the float64 values they were recorded as"""
+
+    decimals = FARMER_COLUMN_DECIMALS if decimals is None else decimals
+    narrowed = [column for column in df.columns if column in decimals and df[column].dtype == np.float32]
+    if not narrowed:
+        return df
+    df = df.copy()
+    for column in narrowed:
+        df[column] = np.round(df[column].to_numpy(np.float64), decimals[column])
+    return df
+
+_memory: Dict[str, Dict] = {}
+_memory_lock = threading.Lock()
+
+def record_memory(name: str, rows: int, before: int, after: int):
+    """Remember a frame's footprint before and after compaction for memory_report()"""
+    with _memory_lock:
+        _memory[name] = {"frame": name, "rows": rows, "before_mb": before / 1e6, "after_mb": after / 1e6,
+                         "saved_pct": (1 - after / before) * 100 if before else 0.0}
+
+def memory_report() -> List[Dict]:
+    """Before/after memory per compacted frame, largest first"""
+    with _memory_lock:
+        return sorted(_memory.values(), key=lambda row: row["before_mb"], reverse=True)
+
+def compact_frame(df: pd.DataFrame, dtypes: Optional[Dict[str, object]] = None,
+                  decimals: Optional[Dict[str, int]] = None, name: Optional[str] = None) -> pd.DataFrame:
+    """Frame with compact dtypes: the given ones first, inferred ones for the remaining columns
+
+    If name is given the before/after footprint is recorded for memory_report().
+    """
+
+    dtypes = dict(dtypes or {})
+    remaining = df.drop(columns=[column for column in dtypes if column in df.columns])
+    for column, dtype in DtypeNarrower(decimals).observe(remaining).dtypes().items():
+        dtypes.setdefault(column, dtype)
+    compact = df.astype({column: dtype for column, dtype in dtypes.items() if column in df.columns})
+    if name is not None:
+        record_memory(name, len(df), frame_bytes(df), frame_bytes(compact))
+    return compact
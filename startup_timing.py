@@ -0,0 +1,110 @@
+# Startup timing for Northern Nigeria Fertilizer Advisor
+import importlib
+import logging
+import subprocess
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Set when this module is first imported, i.e. at the top of the first script run
+PROCESS_START = time.perf_counter()
+
+_import_times: Dict[str, float] = {}
+_first_render_seconds: Optional[float] = None
+
+# Most recent script and fragment reruns, newest last
+RERUN_HISTORY_SIZE = 50
+_reruns: deque = deque(maxlen=RERUN_HISTORY_SIZE)
+
+# Dependencies the app imports, heaviest first; used by the cold-start CLI
+APP_DEPENDENCIES = [
+    "streamlit", "pandas", "numpy", "plotly.express", "folium",
+    "sklearn.ensemble", "sqlalchemy"
+]
+
+@contextmanager
+def import_timer(module_name: str):
+    """Time the import statements in the block, recording only the first load"""
+
+    already_loaded = module_name in sys.modules
+    start = time.perf_counter()
+    yield
+    if not already_loaded and module_name not in _import_times:
+        _import_times[module_name] = time.perf_counter() - start
+
+def lazy_import(module_name: str):
+    """Import a module on first use and record how long the import took"""
+
+    module = sys.modules.get(module_name)
+    if module is None:
+        with import_timer(module_name):
+            module = importlib.import_module(module_name)
+    return module
+
+def mark_first_render():
+    """Record the time from process start to the end of the first script run"""
+
+    global _first_render_seconds
+    if _first_render_seconds is None:
+        _first_render_seconds = time.perf_counter() - PROCESS_START
+        logger.info("First render after %.3fs; imports: %s", _first_render_seconds,
+                    ", ".join(f"{name}={secs:.3f}s" for name, secs in _import_times.items()))
+
+def startup_report() -> List[Dict]:
+    """Import times recorded in this process, followed by time to first render"""
+
+    report = [{"stage": f"import {name}", "seconds": secs} for name, secs in _import_times.items()]
+    if _first_render_seconds is not None:
+        report.append({"stage": "first render", "seconds": _first_render_seconds})
+    return report
+
+@contextmanager
+def rerun_timer(scope: str):
+    """Time one execution of a script or fragment and log it
+
+    ``scope`` names what reran, e.g. ``"app"`` for a full script run or the
+    fragment name, so the log shows which reruns a widget triggered.
+    """
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        _reruns.append({"scope": scope, "seconds": seconds, "at": time.time()})
+        logger.info("Rerun %s took %.1fms", scope, seconds * 1000)
+
+def rerun_report() -> List[Dict]:
+    """Recent rerun timings, newest first"""
+
+    return list(reversed(_reruns))
+
+def measure_cold_imports(modules: List[str] = APP_DEPENDENCIES) -> Dict[str, float]:
+    """Measure each module's cold import time in a fresh interpreter
+
+    Uses ``python -X importtime``, whose line for the top-level module holds
+    the cumulative time in microseconds.
+    """
+
+    timings = {}
+    for module_name in modules:
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            timings[module_name] = float("nan")
+            continue
+        cumulative_us = 0
+        for line in result.stderr.splitlines():
+            fields = line.split("|")
+            if len(fields) == 3 and fields[2].rstrip() == f" {module_name}":
+                cumulative_us = max(cumulative_us, int(fields[1]))
+        timings[module_name] = cumulative_us / 1e6
+    return timings
+
+if __name__ == "__main__":
+    for name, secs in measure_cold_imports().items():
+        print(f"{name:<20} {secs:8.3f}s")
@@ -0,0 +1,22 @@
+# Tests for the sampled analytics event log
+import random
+import uuid
+
+from analytics import SESSION_START_EVENT, EventLog
+
+def test_sessions_are_counted_exactly_when_page_views_are_sampled(tmp_path):
+    random.seed(0)
+    log = EventLog(path=str(tmp_path / "events.db"), sample_rates={"page_view": 0.2, SESSION_START_EVENT: 0.2})
+    try:
+        for _ in range(1000):
+            session_id = uuid.uuid4().hex
+            log.record(SESSION_START_EVENT, None, session_id)
+            log.record("page_view", "farmer", session_id)
+        log.flush()
+        summary = log.summary()
+    finally:
+        log.close()
+
+    assert summary["sessions"] == 1000
+    # Sampled page views are reweighted, so the estimate is near the true count
+    assert 700 <= summary["page_views"] <= 1300
@@ -0,0 +1,55 @@
+# Tests for the sufficient-statistics trial analysis engine
+import numpy as np
+import pandas as pd
+import pytest
+
+from trial_analysis import TrialStatistics, analyze_frame
+
+def _unbalanced_trial(rows: int = 600, seed: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    trt = rng.choice(["T1", "T2", "T3", "T4"], rows, p=[0.4, 0.3, 0.2, 0.1])
+    # Site depends on treatment, so the cell counts are not proportional
+    site = np.where(rng.random(rows) < np.where(trt == "T1", 0.8, 0.3), "S1",
+                    rng.choice(["S2", "S3"], rows))
+    effect = pd.Series(trt).map({"T1": 0, "T2": 300, "T3": 450, "T4": 500}).to_numpy()
+    site_effect = pd.Series(site).map({"S1": 0, "S2": -200, "S3": 150}).to_numpy()
+    return pd.DataFrame({"trt": trt, "site": site,
+                         "yield": 2000 + effect + site_effect + rng.normal(0, 100, rows)})
+
+def _rss(df: pd.DataFrame, terms) -> float:
+    design = [np.ones(len(df))]
+    for term in terms:
+        labels = df[term].astype(str).agg(":".join, axis=1)
+        design.append(pd.get_dummies(labels, drop_first=True).to_numpy(dtype=float))
+    x = np.column_stack(design)
+    y = df["yield"].to_numpy()
+    beta = np.linalg.lstsq(x, y, rcond=None)[0]
+    return float(((y - x @ beta) ** 2).sum())
+
+@pytest.mark.parametrize("interaction", [False, True])
+def test_anova_matches_sequential_ols_on_unbalanced_data(interaction):
+    df = _unbalanced_trial()
+    table = analyze_frame(df, "yield", ["trt", "site"]).anova(interaction).set_index("Source")
+
+    terms = [["trt"], ["site"]] + ([["trt", "site"]] if interaction else [])
+    rss = [_rss(df, terms[:i]) for i in range(len(terms) + 1)]
+    for i, term in enumerate(terms):
+        assert table.loc[":".join(term), "Sum Sq"] == pytest.approx(rss[i] - rss[i + 1], rel=1e-8)
+    assert table.loc["Residuals", "Sum Sq"] == pytest.approx(rss[-1], rel=1e-8)
+
+def test_chunked_statistics_match_in_memory():
+    df = _unbalanced_trial()
+    chunked = TrialStatistics("yield", ["trt", "site"])
+    for start in range(0, len(df), 97):
+        chunked.update(df.iloc[start:start + 97])
+    pd.testing.assert_frame_equal(chunked.anova(True), analyze_frame(df, "yield", ["trt", "site"]).anova(True))
+
+def test_regression_matches_lstsq():
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({"n": rng.uniform(0, 120, 300), "p": rng.uniform(0, 60, 300)})
+    df["yield"] = 1500 + 8 * df["n"] + 5 * df["p"] + rng.normal(0, 50, 300)
+
+    result = analyze_frame(df, "yield", predictors=["n", "p"]).regression()
+    x = np.column_stack([np.ones(len(df)), df[["n", "p"]].to_numpy()])
+    expected = np.linalg.lstsq(x, df["yield"].to_numpy(), rcond=None)[0]
+    np.testing.assert_allclose(result["coefficients"]["Estimate"], expected, rtol=1e-8)
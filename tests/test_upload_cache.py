@@ -0,0 +1,91 @@
+# Tests for the upload cache and its database round trip
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import func, select
+
+from config import AppConfig
+
+class _Upload(io.BytesIO):
+    """Stand-in for a Streamlit UploadedFile"""
+
+    def __init__(self, data: bytes, name: str):
+        super().__init__(data)
+        self.name = name
+
+@pytest.fixture
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.setattr(AppConfig, "UPLOAD_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(AppConfig, "DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    return tmp_path
+
+def _farmer_list(rows: int = 3000) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    names = np.array([f"Farmer {i}" for i in range(40)], dtype=object)[rng.integers(0, 40, rows)]
+    names[::7] = None  # blank names must fall back to "Unnamed farmer"
+    return pd.DataFrame({
+        "name": names,
+        "state": rng.choice(AppConfig.SUPPORTED_STATES, rows),
+        "n_percent": rng.integers(5, 250, rows) / 100,
+        "p_ppm": rng.integers(20, 400, rows) / 10,
+        "k_ppm": rng.integers(500, 3000, rows) / 10,
+        "previous_yield": rng.integers(800, 2500, rows).astype(float),
+        "target_yield": rng.integers(2500, 5000, rows).astype(float),
+        "farm_size": rng.integers(10, 500, rows) / 100,
+    })
+
+def test_cached_upload_round_trips_through_persist_bulk_chunk(isolated):
+    from database import get_recommendation_writer, get_session, persist_bulk_chunk
+    from ingest import stream_bulk_recommendations
+    from models import Farmer, Recommendation
+    from upload_cache import cached_upload
+
+    farmers = _farmer_list()
+    upload = cached_upload(_Upload(farmers.to_csv(index=False).encode(), "farmers.csv"))
+    assert upload.rows == len(farmers)
+
+    rows = stream_bulk_recommendations(upload.path, str(isolated / "out.csv"), chunk_rows=1000,
+                                       on_chunk=persist_bulk_chunk)
+    get_recommendation_writer().flush()
+
+    assert rows == len(farmers)
+    with get_session() as session:
+        names = session.scalars(select(Farmer.name).order_by(Farmer.id)).all()
+        recommendations = session.scalar(select(func.count()).select_from(Recommendation))
+    expected = farmers["name"].fillna("Unnamed farmer").tolist()
+    assert names == expected
+    assert recommendations == len(farmers)
+
+def test_cached_upload_matches_raw_parse(isolated):
+    from ingest import iter_upload_chunks
+    from upload_cache import cached_upload
+
+    farmers = _farmer_list(500)
+    data = farmers.to_csv(index=False).encode()
+    upload = cached_upload(_Upload(data, "farmers.csv"))
+
+    cached = pd.concat(iter_upload_chunks(upload.path))
+    raw = pd.concat(iter_upload_chunks(_Upload(data, "farmers.csv")))
+    assert cached["name"].dtype == object or pd.api.types.is_string_dtype(cached["name"].dtype)
+    assert isinstance(cached["state"].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(cached.astype({"state": object}), raw.astype({"state": object}),
+                                  check_dtype=False)
+
+def test_cached_upload_promotes_types_that_change_between_chunks(isolated):
+    from ingest import iter_upload_chunks
+    from upload_cache import cached_upload
+
+    farmers = _farmer_list(9)
+    # Read in chunks of 3, the first chunk parses farm_size as int64 and phone as all-blank float64
+    farmers["farm_size"] = ["1", "2", "3", "2.5", "1", "4", "2", "2", "3"]
+    farmers["phone"] = [None, None, None, "0803 555 0101", None, "0805 555 0199", None, None, None]
+    data = farmers.to_csv(index=False).encode()
+    upload = cached_upload(_Upload(data, "farmers.csv"), chunk_rows=3)
+
+    cached = pd.concat(iter_upload_chunks(upload.path), ignore_index=True)
+    assert upload.rows == len(farmers)
+    assert cached["farm_size"].tolist() == [1.0, 2.0, 3.0, 2.5, 1.0, 4.0, 2.0, 2.0, 3.0]
+    assert cached["phone"].tolist()[3] == "0803 555 0101"
+    assert cached["phone"].isna().sum() == 7
@@ -0,0 +1,216 @@
+# Statistical analysis of field trial data for Northern Nigeria Fertilizer Advisor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ingest import DEFAULT_CHUNK_ROWS, iter_upload_chunks
+
+ANALYSIS_TYPES = ["ANOVA", "Regression", "Correlation", "Mixed Models"]
+
+def _f_pvalue(f_value, df_num, df_den):
+    from scipy import stats
+    return stats.f.sf(f_value, df_num, df_den)
+
+def _t_pvalue(t_value, df):
+    from scipy import stats
+    return 2 * stats.t.sf(np.abs(t_value), df)
+
+class TrialStatistics:
+    """Sufficient statistics for trial analyses, accumulated chunk by chunk
+
+    Keeps, per combination of factor levels, the count and sum of the
+    response, plus the response sum of squares and the cross-product matrix
+    of [1, predictors..., response]. Every analysis below is computed from
+    these alone, so a dataset of any size is analysed in one streaming pass
+    with memory bounded by the number of factor-level combinations.
+    Rows missing any analysed column are dropped (listwise deletion).
+    """
+
+    def __init__(self, response: str, factors: Sequence[str] = (), predictors: Sequence[str] = ()):
+        self.response = response
+        self.factors = list(factors)
+        self.predictors = list(predictors)
+        self.n = 0
+        self.sum_y2 = 0.0
+        self.cells: Optional[pd.DataFrame] = None
+        self.cross_products = np.zeros((len(self.predictors) + 2, len(self.predictors) + 2))
+
+    def update(self, chunk: pd.DataFrame) -> "TrialStatistics":
+        columns = [self.response] + self.predictors
+        data = chunk[columns + self.factors].copy()
+        data[columns] = data[columns].apply(pd.to_numeric, errors="coerce")
+        data = data.dropna()
+        if data.empty:
+            return self
+
+        y = data[self.response].to_numpy(dtype=np.float64)
+        self.n += len(y)
+        self.sum_y2 += float(y @ y)
+
+        design = np.column_stack([np.ones(len(y)), data[self.predictors].to_numpy(dtype=np.float64), y])
+        self.cross_products += design.T @ design
+
+        if self.factors:
+            cells = data.groupby(self.factors, observed=True, sort=False)[self.response].agg(["count", "sum"])
+            self.cells = cells if self.cells is None else self.cells.add(cells, fill_value=0)
+        return self
+
+    @property
+    def sum_y(self) -> float:
+        return float(self.cross_products[0, -1])
+
+    def _margin(self, factors: List[str]) -> pd.DataFrame:
+        return self.cells.groupby(level=factors, observed=True).sum()
+
+    def _residual_ss(self, cells: pd.DataFrame, terms: List[List[str]]) -> Tuple[float, int]:
+        """Residual SS and model rank of an ANOVA model fitted from the cell counts and sums
+
+        Every term is constant within a cell, so weighted least squares on the
+        cell means (weights = cell counts) gives exactly the raw-data OLS fit.
+        The residual is the within-cell SS plus the weighted lack of fit of the
+        cell means, which needs no balance or orthogonality.
+        """
+
+        counts = cells["count"].to_numpy(dtype=np.float64)
+        means = cells["sum"].to_numpy(dtype=np.float64) / counts
+        blocks = [np.ones((len(cells), 1))]
+        for term in terms:
+            labels = cells[term].astype(str).agg(":".join, axis=1)
+            blocks.append(pd.get_dummies(labels, drop_first=True).to_numpy(dtype=np.float64))
+        design = np.hstack(blocks)
+
+        weighted = design.T * counts
+        beta = np.linalg.pinv(weighted @ design) @ (weighted @ means)
+        lack_of_fit = float(counts @ (means - design @ beta) ** 2)
+        within = self.sum_y2 - float((cells["sum"] ** 2 / cells["count"]).sum())
+        return within + lack_of_fit, int(np.linalg.matrix_rank(weighted @ design))
+
+    def anova(self, interaction: bool = False) -> pd.DataFrame:
+        """Sequential (Type I) ANOVA of the factors in order, plus the first two factors' interaction if asked
+
+        Each term's SS is the drop in residual SS when it is added after the
+        terms before it, fitted exactly from the cell statistics, so the
+        table is correct for unbalanced data too. There, as in any Type I
+        table, the SS depend on the factor order.
+        """
+
+        if not self.factors:
+            raise ValueError("ANOVA needs at least one factor column")
+
+        terms = [[factor] for factor in self.factors]
+        if interaction and len(self.factors) >= 2:
+            terms.append(self.factors[:2])
+
+        cells = self.cells.reset_index()
+        rows = []
+        previous_ss, previous_rank = self._residual_ss(cells, [])
+        for i, term in enumerate(terms, start=1):
+            residual_ss, rank = self._residual_ss(cells, terms[:i])
+            rows.append((":".join(term), rank - previous_rank, previous_ss - residual_ss))
+            previous_ss, previous_rank = residual_ss, rank
+
+        residual_df = self.n - previous_rank
+        if residual_df <= 0:
+            raise ValueError("Not enough observations for a residual term")
+        residual_ms = previous_ss / residual_df
+
+        table = pd.DataFrame(rows, columns=["Source", "DF", "Sum Sq"])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            table["Mean Sq"] = table["Sum Sq"] / table["DF"]
+        table["F Value"] = table["Mean Sq"] / residual_ms
+        table["Pr(>F)"] = _f_pvalue(table["F Value"], table["DF"], residual_df)
+        residuals = pd.DataFrame([{"Source": "Residuals", "DF": residual_df, "Sum Sq": previous_ss,
+                                   "Mean Sq": residual_ms}])
+        return pd.concat([table, residuals], ignore_index=True)
+
+    def regression(self) -> Dict:
+        """OLS of the response on the predictors from the normal equations"""
+
+        if not self.predictors:
+            raise ValueError("Regression needs at least one predictor column")
+        k = len(self.predictors) + 1
+        xtx, xty = self.cross_products[:k, :k], self.cross_products[:k, -1]
+        residual_df = self.n - k
+        if residual_df <= 0:
+            raise ValueError("Not enough observations for the number of predictors")
+
+        xtx_inv = np.linalg.pinv(xtx)
+        beta = xtx_inv @ xty
+        sse = self.sum_y2 - beta @ xty
+        sigma2 = sse / residual_df
+        se = np.sqrt(np.maximum(np.diag(xtx_inv) * sigma2, 0.0))
+        sst = self.sum_y2 - self.sum_y ** 2 / self.n
+        t_value = np.divide(beta, se, out=np.full_like(beta, np.nan), where=se > 0)
+
+        coefficients = pd.DataFrame({
+            "Term": ["(Intercept)"] + self.predictors, "Estimate": beta, "Std. Error": se,
+            "t Value": t_value, "Pr(>|t|)": _t_pvalue(t_value, residual_df),
+        })
+        r2 = 1 - sse / sst if sst > 0 else np.nan
+        return {
+            "coefficients": coefficients,
+            "r_squared": r2,
+            "adj_r_squared": 1 - (1 - r2) * (self.n - 1) / residual_df,
+            "residual_se": float(np.sqrt(sigma2)),
+            "n": self.n,
+        }
+
+    def correlation(self) -> pd.DataFrame:
+        """Pearson correlation matrix of the predictors and the response"""
+
+        names = self.predictors + [self.response]
+        sums = self.cross_products[0, 1:]
+        centered = self.cross_products[1:, 1:] - np.outer(sums, sums) / self.n
+        scale = np.sqrt(np.diag(centered))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return pd.DataFrame(centered / np.outer(scale, scale), index=names, columns=names)
+
+    def mixed_model(self, treatment: str, group: str) -> Dict:
+        """Fixed treatment effects with a random intercept per group (e.g. site or block)
+
+        Variance components use the ANOVA (method-of-moments) estimators,
+        which equal REML for balanced data: residual variance is the residual
+        mean square and the group variance is (MS_group - MS_resid) / n0.
+        """
+
+        table = self.anova().set_index("Source")
+        residual_ms = table.loc["Residuals", "Mean Sq"]
+        group_ms = table.loc[group, "Mean Sq"]
+
+        group_counts = self._margin([group])["count"].to_numpy(dtype=np.float64)
+        n0 = (self.n - (group_counts ** 2).sum() / self.n) / (len(group_counts) - 1)
+        group_var = max((group_ms - residual_ms) / n0, 0.0)
+
+        means = self._margin([treatment])
+        estimates = pd.DataFrame({
+            "Mean": means["sum"] / means["count"],
+            "Std. Error": np.sqrt((group_var + residual_ms / (means["count"] / len(group_counts)))
+                                  / len(group_counts)),
+            "n": means["count"].astype(int),
+        })
+        return {
+            "treatment_means": estimates,
+            "variance_components": pd.DataFrame({
+                "Component": [group, "Residual"], "Variance": [group_var, residual_ms],
+                "Std. Dev.": [np.sqrt(group_var), np.sqrt(residual_ms)],
+            }),
+            "icc": group_var / (group_var + residual_ms) if group_var + residual_ms > 0 else np.nan,
+            "treatment_test": table.loc[[treatment]].reset_index(),
+        }
+
+def analyze_frame(df: pd.DataFrame, response: str, factors: Sequence[str] = (),
+                  predictors: Sequence[str] = ()) -> TrialStatistics:
+    """Sufficient statistics for an in-memory frame"""
+    return TrialStatistics(response, factors, predictors).update(df)
+
+def analyze_upload(source, response: str, factors: Sequence[str] = (), predictors: Sequence[str] = (),
+                   chunk_rows: int = DEFAULT_CHUNK_ROWS) -> TrialStatistics:
+    """Sufficient statistics for an uploaded CSV/Excel file, streamed in chunks"""
+
+    stats = TrialStatistics(response, factors, predictors)
+    for chunk in iter_upload_chunks(source, chunk_rows):
+        stats.update(chunk)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return stats
@@ -0,0 +1,202 @@
+# Content-hashed cache of parsed uploads for Northern Nigeria Fertilizer Advisor
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from config import AppConfig
+from ingest import DEFAULT_CHUNK_ROWS, _source_name, iter_upload_chunks
+from schema import DtypeNarrower, frame_bytes, record_memory, restore_precision
+
+HASH_BLOCK_BYTES = 1024 * 1024
+PREVIEW_ROWS = 5
+
+@dataclass(frozen=True)
+class CachedUpload:
+    """An upload parsed once into a Parquet file named by its content hash"""
+
+    key: str
+    path: str
+    name: str
+    rows: int
+    columns: List[str]
+    preview: pd.DataFrame
+
+_entries: "OrderedDict[str, CachedUpload]" = OrderedDict()
+# Streamlit file_id -> content hash, so reruns skip re-hashing the same upload
+_hashes_by_file_id: "OrderedDict[str, str]" = OrderedDict()
+_lock = threading.Lock()
+
+def content_hash(source) -> str:
+    """BLAKE2b digest of an uploaded file's bytes; the read position is restored"""
+
+    digest = hashlib.blake2b(digest_size=20)
+    source.seek(0)
+    for block in iter(lambda: source.read(HASH_BLOCK_BYTES), b""):
+        digest.update(block)
+    source.seek(0)
+    return digest.hexdigest()
+
+def _arrow_schema(schema, dtypes: Dict[str, object]):
+    """schema with the columns in dtypes switched to their compact Arrow types"""
+    import pyarrow as pa
+
+    fields = []
+    for field in schema:
+        dtype = dtypes.get(field.name)
+        if isinstance(dtype, str) and dtype == "category":
+            field = field.with_type(pa.dictionary(pa.int32(), pa.string()))
+        elif dtype is not None:
+            field = field.with_type(pa.from_numpy_dtype(dtype))
+        fields.append(field)
+    return pa.schema(fields)
+
+def _promoted_schema(chunk_types: List[Dict[str, object]]):
+    """One Arrow schema every chunk can be cast to
+
+    Each chunk is parsed on its own, so a column can be int64 in one chunk
+    and double in the next, or all blank and later text. Columns with no
+    values in a chunk (type None) take the type of the others; integers and
+    floats together widen to float64; any other mix becomes string.
+    """
+    import pyarrow as pa
+
+    fields = []
+    for name in chunk_types[0]:
+        types = {types_[name] for types_ in chunk_types} - {None}
+        if len(types) == 1:
+            arrow_type = types.pop()
+        elif types and all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in types):
+            arrow_type = pa.float64()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+def _convert(source, path: str, chunk_rows: int):
+    """Parse source in chunks into a Parquet file at path, with compact dtypes
+
+    The first pass writes each parsed chunk as its own raw Parquet fragment
+    while DtypeNarrower watches every chunk; the second casts the fragments
+    to one schema that fits them all, then to the compact dtypes.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    raw_dir = f"{path}.{uuid.uuid4().hex}.raw"
+    final_tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    narrower = DtypeNarrower()
+    fragments, chunk_types = [], []
+    before = after = 0
+    try:
+        os.makedirs(raw_dir)
+        for chunk in iter_upload_chunks(source, chunk_rows):
+            narrower.observe(chunk)
+            before += frame_bytes(chunk)
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            chunk_types.append({name: None if column.null_count == len(column) else column.type
+                                for name, column in zip(table.column_names, table.columns)})
+            fragments.append(os.path.join(raw_dir, f"{len(fragments):06d}.parquet"))
+            pq.write_table(table, fragments[-1])
+        if narrower.rows == 0:
+            raise ValueError("Uploaded file has no rows")
+
+        promoted = _promoted_schema(chunk_types)
+        schema = _arrow_schema(promoted, narrower.dtypes())
+        with pq.ParquetWriter(final_tmp, schema) as writer:
+            for fragment in fragments:
+                for batch in pq.ParquetFile(fragment).iter_batches(batch_size=chunk_rows):
+                    table = pa.Table.from_batches([batch]).select(promoted.names).cast(promoted).cast(schema)
+                    writer.write_table(table)
+                    after += frame_bytes(table.to_pandas())
+        os.replace(final_tmp, path)
+    finally:
+        shutil.rmtree(raw_dir, ignore_errors=True)
+        if os.path.exists(final_tmp):
+            os.remove(final_tmp)
+    record_memory(f"upload:{_source_name(source)}", narrower.rows, before, after)
+
+def _load_entry(key: str, path: str, name: str) -> CachedUpload:
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    preview = next(parquet_file.iter_batches(batch_size=PREVIEW_ROWS), None)
+    return CachedUpload(key=key, path=path, name=name, rows=parquet_file.metadata.num_rows,
+                        columns=parquet_file.schema_arrow.names,
+                        preview=restore_precision(preview.to_pandas()) if preview is not None else pd.DataFrame())
+
+def _remember(entry: CachedUpload):
+    with _lock:
+        _entries[entry.key] = entry
+        _entries.move_to_end(entry.key)
+        while len(_entries) > AppConfig.UPLOAD_CACHE_MEMORY_ENTRIES:
+            _entries.popitem(last=False)
+
+def evict(max_bytes: Optional[int] = None, keep: Optional[str] = None):
+    """Delete least recently used cache files until the directory fits in max_bytes"""
+
+    max_bytes = AppConfig.UPLOAD_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    directory = AppConfig.UPLOAD_CACHE_DIR
+    files = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".parquet"):
+            stat = entry.stat()
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in files)
+
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        with _lock:
+            _entries.pop(os.path.basename(path)[:-len(".parquet")], None)
+
+def cached_upload(source, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> CachedUpload:
+    """Parsed upload, converting it to Parquet only the first time its content is seen
+
+    Later calls with the same bytes, from any rerun or session, read the
+    cached file instead of parsing CSV/Excel again. Each hit refreshes the
+    file's position in the least-recently-used eviction order.
+    """
+
+    file_id = getattr(source, "file_id", None)
+    key = _hashes_by_file_id.get(file_id) if file_id else None
+    if key is None:
+        key = content_hash(source)
+        if file_id:
+            with _lock:
+                _hashes_by_file_id[file_id] = key
+                while len(_hashes_by_file_id) > AppConfig.UPLOAD_CACHE_MEMORY_ENTRIES:
+                    _hashes_by_file_id.popitem(last=False)
+
+    path = os.path.join(AppConfig.UPLOAD_CACHE_DIR, f"{key}.parquet")
+    if os.path.exists(path):
+        os.utime(path)
+        entry = _entries.get(key)
+        if entry is None:
+            entry = _load_entry(key, path, _source_name(source))
+            _remember(entry)
+        return entry
+
+    os.makedirs(AppConfig.UPLOAD_CACHE_DIR, exist_ok=True)
+    try:
+        _convert(source, path, chunk_rows)
+    finally:
+        if hasattr(source, "seek"):
+            source.seek(0)
+    entry = _load_entry(key, path, _source_name(source))
+    _remember(entry)
+    evict(keep=path)
+    return entry
@@ -5,10 +5,18 @@ from typing import Dict, List, Tuple
 import requests
 import json
 
+from instrumentation import timed
+
+# Mitscherlich response coefficients per kg/ha of N, P2O5, K2O (derived from field data)
+RESPONSE_COEFFICIENTS = np.array([0.015, 0.020, 0.012])
+YIELD_POTENTIAL_FACTOR = 2.5  # Assume potential is 2.5x current
+MAX_RATES = np.array([200.0, 120.0, 120.0])  # Upper bounds for the rate optimizer, kg/ha
+
 class NutrientCalculator:
     """Advanced nutrient calculation utilities"""
 
     @staticmethod
+    @timed("utils.NutrientCalculator.assess_nutrient_status")
     def assess_nutrient_status(n_percent: float, p_ppm: float, k_ppm: float) -> Dict[str, str]:
         """Assess nutrient limitation status"""
 
@@ -19,6 +27,7 @@ class NutrientCalculator:
         return {"N": n_status, "P": p_status, "K": k_status}
 
     @staticmethod
+    @timed("utils.NutrientCalculator.calculate_fertilizer_needs")
     def calculate_fertilizer_needs(n_rate: float, p_rate: float, k_rate: float, 
                                  farm_size: float) -> Dict[str, float]:
         """Calculate actual fertilizer product requirements"""
@@ -34,35 +43,117 @@ class NutrientCalculator:
         }
 
     @staticmethod
+    @timed("utils.NutrientCalculator.estimate_yield_response")
     def estimate_yield_response(current_yield: float, n_rate: float, 
                               p_rate: float, k_rate: float) -> float:
         """Estimate yield response to fertilizer application"""
 
         # Simplified Mitscherlich response function
-        max_yield = current_yield * 2.5  # Assume potential is 2.5x current
+        max_yield = current_yield * YIELD_POTENTIAL_FACTOR
 
-        # Response coefficients (derived from field data)
-        n_response = 1 - np.exp(-0.015 * n_rate)
-        p_response = 1 - np.exp(-0.020 * p_rate)
-        k_response = 1 - np.exp(-0.012 * k_rate)
+        n_response = 1 - np.exp(-RESPONSE_COEFFICIENTS[0] * n_rate)
+        p_response = 1 - np.exp(-RESPONSE_COEFFICIENTS[1] * p_rate)
+        k_response = 1 - np.exp(-RESPONSE_COEFFICIENTS[2] * k_rate)
 
         # Combined response (multiplicative)
         total_response = n_response * p_response * k_response
 
         return current_yield + (max_yield - current_yield) * total_response
 
+    @staticmethod
+    @timed("utils.NutrientCalculator.optimize_rates")
+    def optimize_rates(current_yield, farm_size=1.0, budget=None, maize_price=None,
+                       fertilizer_prices: Dict[str, float] = None, grid_step: float = 10.0,
+                       refine_iterations: int = 10, chunk_size: int = 512) -> Dict[str, np.ndarray]:
+        """Find profit-maximizing N/P2O5/K2O rates (kg/ha) for arrays of farms
+
+        Profit is evaluated on a broadcast N x P x K grid to pick each farm's
+        best starting point, then each rate is refined in closed form by
+        coordinate ascent on the response surface. budget (USD per farm, scalar
+        or array) caps total fertilizer spend. maize_price and the
+        fertilizer_prices values may be per-farm arrays (e.g. from
+        PriceSnapshot.price_arrays); prices default to the current snapshot.
+        """
+
+        if maize_price is None or fertilizer_prices is None:
+            prices = MarketIntegration.get_current_prices()
+            maize_price = prices["maize_usd_kg"] if maize_price is None else maize_price
+            fertilizer_prices = fertilizer_prices or prices
+
+        current_yield = np.atleast_1d(np.asarray(current_yield, dtype=np.float64))
+        n_farms = len(current_yield)
+        farm_size = np.broadcast_to(np.asarray(farm_size, dtype=np.float64), (n_farms,))
+        maize_price = np.broadcast_to(np.asarray(maize_price, dtype=np.float64), (n_farms,))
+        # Farms with no area have no per-hectare budget to divide out; leave them uncapped
+        budget_ha = np.full(n_farms, np.inf)
+        if budget is not None:
+            np.divide(np.broadcast_to(np.asarray(budget, dtype=np.float64), (n_farms,)), farm_size,
+                      out=budget_ha, where=farm_size > 0)
+
+        # USD per kg of nutrient for each farm (n_farms x 3), priced as in calculate_simple_recommendations
+        unit_cost = np.column_stack([
+            np.broadcast_to(np.asarray(fertilizer_prices[col], dtype=np.float64), (n_farms,))
+            for col in ("urea_usd_kg", "dap_usd_kg", "mop_usd_kg")
+        ])
+        # Value of closing the whole yield gap, USD/ha
+        gap_value = maize_price * (YIELD_POTENTIAL_FACTOR - 1) * current_yield
+
+        # Grid search: response and cost of every rate combination, shared by all farms
+        axes = [np.arange(0, max_rate + grid_step / 2, grid_step) for max_rate in MAX_RATES]
+        responses = [1 - np.exp(-coef * axis) for coef, axis in zip(RESPONSE_COEFFICIENTS, axes)]
+        grid_response = np.einsum("i,j,k->ijk", *responses).ravel()
+        grid_rates = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, 3)
+
+        rates = np.empty((n_farms, 3))
+        for start in range(0, n_farms, chunk_size):
+            chunk = slice(start, start + chunk_size)
+            grid_cost = unit_cost[chunk] @ grid_rates.T
+            profit = gap_value[chunk, None] * grid_response[None, :] - grid_cost
+            profit[grid_cost > budget_ha[chunk, None]] = -np.inf
+            rates[chunk] = grid_rates[np.argmax(profit, axis=1)]
+
+        # Coordinate ascent: with the other two rates fixed, profit is concave in
+        # the third, so its optimum within [0, min(max rate, budget left)] is exact
+        for _ in range(refine_iterations):
+            for j in range(3):
+                others = [i for i in range(3) if i != j]
+                other_response = np.prod(1 - np.exp(-RESPONSE_COEFFICIENTS[others] * rates[:, others]), axis=1)
+                marginal = gap_value * other_response * RESPONSE_COEFFICIENTS[j]
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    best = np.where(marginal > unit_cost[:, j],
+                                    np.log(marginal / unit_cost[:, j]) / RESPONSE_COEFFICIENTS[j], 0.0)
+                budget_left = (budget_ha - (rates[:, others] * unit_cost[:, others]).sum(axis=1)) / unit_cost[:, j]
+                rates[:, j] = np.clip(best, 0, np.minimum(MAX_RATES[j], np.maximum(budget_left, 0)))
+
+        response = np.prod(1 - np.exp(-RESPONSE_COEFFICIENTS * rates), axis=1)
+        expected_yield = current_yield + (YIELD_POTENTIAL_FACTOR - 1) * current_yield * response
+        cost_ha = (rates * unit_cost).sum(axis=1)
+
+        return {
+            "n_rate": rates[:, 0],
+            "p_rate": rates[:, 1],
+            "k_rate": rates[:, 2],
+            "expected_yield": expected_yield,
+            "fertilizer_cost": cost_ha * farm_size,
+            "net_profit": (maize_price * (expected_yield - current_yield) - cost_ha) * farm_size
+        }
+
 class WeatherIntegration:
     """Weather data integration for timing recommendations"""
 
     @staticmethod
     def get_rainfall_forecast(latitude: float, longitude: float) -> Dict:
         """Get rainfall forecast for location"""
-        # Placeholder for weather API integration
-        return {
-            "next_7_days": 45,  # mm
-            "next_14_days": 78,  # mm
-            "recommendation": "Good conditions for fertilizer application"
-        }
+        from weather import get_weather_service
+
+        return get_weather_service().get_forecast(latitude, longitude)
+
+    @staticmethod
+    def get_rainfall_forecasts(farms: pd.DataFrame) -> pd.DataFrame:
+        """Add rainfall forecast and timing advice columns for every farm"""
+        from weather import get_weather_service
+
+        return get_weather_service().attach_rainfall_advice(farms)
 
     @staticmethod
     def get_planting_calendar(latitude: float) -> Dict:
@@ -77,23 +168,19 @@ class MarketIntegration:
     """Market price integration for economic analysis"""
 
     @staticmethod
-    def get_current_prices() -> Dict[str, float]:
+    def get_current_prices(state: str = None) -> Dict[str, float]:
         """Get current market prices"""
-        # Placeholder for market API integration
-        return {
-            "maize_naira_kg": 180,
-            "maize_usd_kg": 0.45,
-            "urea_naira_kg": 480,
-            "dap_naira_kg": 1000,
-            "mop_naira_kg": 400
-        }
+        from prices import current_prices
+
+        return current_prices(state)
 
     @staticmethod
+    @timed("utils.MarketIntegration.calculate_profitability")
     def calculate_profitability(yield_increase: float, fertilizer_cost: float,
-                              farm_size: float) -> Dict[str, float]:
+                              farm_size: float, prices: Dict[str, float] = None) -> Dict[str, float]:
         """Calculate economic profitability"""
 
-        prices = MarketIntegration.get_current_prices()
+        prices = prices or MarketIntegration.get_current_prices()
 
         revenue_increase = yield_increase * farm_size * prices["maize_usd_kg"]
         net_profit = revenue_increase - fertilizer_cost
@@ -106,6 +193,102 @@ class MarketIntegration:
             "breakeven_yield": fertilizer_cost / prices["maize_usd_kg"] / farm_size
         }
 
+    @staticmethod
+    @timed("utils.MarketIntegration.calculate_profitability_bulk")
+    def calculate_profitability_bulk(yield_increase, fertilizer_cost, farm_size,
+                                     maize_price=None) -> Dict[str, np.ndarray]:
+        """Vectorized calculate_profitability over arrays of farms
+
+        maize_price may be a scalar or a per-farm array (e.g. from
+        PriceSnapshot.price_arrays); it defaults to one fetch of the current price.
+        """
+
+        if maize_price is None:
+            maize_price = MarketIntegration.get_current_prices()["maize_usd_kg"]
+
+        yield_increase = np.asarray(yield_increase, dtype=np.float64)
+        fertilizer_cost = np.asarray(fertilizer_cost, dtype=np.float64)
+        farm_size = np.asarray(farm_size, dtype=np.float64)
+
+        revenue_increase = yield_increase * farm_size * maize_price
+        net_profit = revenue_increase - fertilizer_cost
+        with np.errstate(divide="ignore", invalid="ignore"):
+            roi = np.where(fertilizer_cost > 0, net_profit / fertilizer_cost * 100, 0.0)
+            breakeven_yield = fertilizer_cost / maize_price / farm_size
+
+        return {
+            "revenue_increase": revenue_increase,
+            "net_profit": net_profit,
+            "roi_percent": roi,
+            "breakeven_yield": breakeven_yield
+        }
+
+EARTH_RADIUS_KM = 6371
+SIMILARITY_RANGE_KM = 100  # Farms this far apart have zero similarity
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in km; arguments broadcast like NumPy arrays"""
+
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=np.float64)) for x in (lat1, lon1, lat2, lon2))
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(a))
+
+def distance_to_similarity(distance_km) -> np.ndarray:
+    """Convert distance to similarity (closer = more similar)"""
+
+    return np.maximum(0, 1 - np.asarray(distance_km) / SIMILARITY_RANGE_KM)
+
+class SpatialIndex:
+    """Ball tree over farm coordinates for k-nearest and radius queries
+
+    Build once per farm database and reuse it across lookups; queries are
+    O(log n) instead of a scan over every farm. Positions returned by queries
+    are row positions in the frame the index was built from.
+    """
+
+    def __init__(self, latitudes, longitudes):
+        from sklearn.neighbors import BallTree
+
+        coords = np.column_stack([np.asarray(latitudes, dtype=np.float64),
+                                  np.asarray(longitudes, dtype=np.float64)])
+        valid = ~np.isnan(coords).any(axis=1)
+
+        # Farms without coordinates are left out of the tree but keep their positions
+        self.positions = np.flatnonzero(valid)
+        self.tree = BallTree(np.radians(coords[valid]), metric="haversine") if valid.any() else None
+
+    @classmethod
+    def from_frame(cls, farm_database: pd.DataFrame, lat_col: str = "latitude",
+                   lon_col: str = "longitude") -> "SpatialIndex":
+        """Build an index from the latitude/longitude columns of a farm table"""
+
+        return cls(farm_database[lat_col].to_numpy(), farm_database[lon_col].to_numpy())
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def query_knn(self, lat: float, lon: float, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Return positions and distances (km) of the k nearest farms, nearest first"""
+
+        k = min(k, len(self))
+        if k == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+
+        dist, idx = self.tree.query(np.radians([[lat, lon]]), k=k)
+        return self.positions[idx[0]], dist[0] * EARTH_RADIUS_KM
+
+    def query_radius(self, lat: float, lon: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Return positions and distances (km) of all farms within radius_km, nearest first"""
+
+        if len(self) == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+
+        idx, dist = self.tree.query_radius(np.radians([[lat, lon]]), r=radius_km / EARTH_RADIUS_KM,
+                                           return_distance=True, sort_results=True)
+        return self.positions[idx[0]], dist[0] * EARTH_RADIUS_KM
+
 class SpatialAnalysis:
     """Spatial analysis utilities"""
 
@@ -114,34 +297,35 @@ class SpatialAnalysis:
                                    lat2: float, lon2: float) -> float:
         """Calculate spatial similarity between locations"""
 
-        # Haversine distance
-        from math import radians, cos, sin, asin, sqrt
-
-        lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-        c = 2 * asin(sqrt(a))
-        distance_km = 6371 * c
-
-        # Convert to similarity (closer = more similar)
-        similarity = max(0, 1 - distance_km / 100)  # 100km = 0 similarity
-        return similarity
+        distance_km = haversine_km(lat1, lon1, lat2, lon2)
+        return float(distance_to_similarity(distance_km))
 
     @staticmethod
-    def find_similar_farms(target_lat: float, target_lon: float, 
-                          farm_database: pd.DataFrame) -> pd.DataFrame:
-        """Find farms with similar conditions"""
+    @timed("utils.SpatialAnalysis.find_similar_farms")
+    def find_similar_farms(target_lat: float, target_lon: float,
+                          farm_database: pd.DataFrame, k: int = 10,
+                          index: SpatialIndex = None) -> pd.DataFrame:
+        """Find the k farms nearest the target, most similar first
+
+        Pass an index built with SpatialIndex.from_frame(farm_database) to answer
+        repeated lookups in sublinear time. The input frame is not modified.
+        """
 
         if farm_database.empty:
             return pd.DataFrame()
 
-        similarities = []
-        for _, farm in farm_database.iterrows():
-            sim = SpatialAnalysis.calculate_spatial_similarity(
-                target_lat, target_lon, farm['latitude'], farm['longitude']
-            )
-            similarities.append(sim)
+        if index is not None:
+            positions, distances = index.query_knn(target_lat, target_lon, k)
+        else:
+            distances = haversine_km(target_lat, target_lon,
+                                     farm_database['latitude'].to_numpy(),
+                                     farm_database['longitude'].to_numpy())
+            distances = np.where(np.isnan(distances), np.inf, distances)
+            k = min(k, len(distances))
+            nearest = np.argpartition(distances, k - 1)[:k]
+            positions = nearest[np.argsort(distances[nearest], kind="stable")]
+            distances = distances[positions]
 
-        farm_database['similarity'] = similarities
-        return farm_database.sort_values('similarity', ascending=False).head(10)
+        similar = farm_database.iloc[positions].copy()
+        similar['similarity'] = distance_to_similarity(distances)
+        return similar
@@ -0,0 +1,226 @@
+# Weather forecast providers for Northern Nigeria Fertilizer Advisor
+import asyncio
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import requests
+
+from config import AppConfig
+
+logger = logging.getLogger(__name__)
+
+GeoBucket = Tuple[int, int]
+
+def rainfall_advice(next_7_days_mm: float) -> str:
+    """Fertilizer timing advice from expected rainfall over the next week"""
+
+    if next_7_days_mm < 10:
+        return "Too dry: wait for rains before applying fertilizer"
+    if next_7_days_mm > 150:
+        return "Heavy rain expected: delay application to avoid runoff"
+    return "Good conditions for fertilizer application"
+
+class WeatherProvider(ABC):
+    """Source of rainfall forecasts for a point"""
+
+    name = "base"
+
+    @abstractmethod
+    def fetch_forecast(self, latitude: float, longitude: float) -> Dict:
+        """Return {"next_7_days": mm, "next_14_days": mm, "recommendation": str}"""
+
+class StubWeatherProvider(WeatherProvider):
+    """Fixed offline forecast for tests and local development"""
+
+    name = "stub"
+
+    def __init__(self, next_7_days: float = 45, next_14_days: float = 78, delay: float = 0.0):
+        self.next_7_days = next_7_days
+        self.next_14_days = next_14_days
+        self.delay = delay  # Simulated network latency, in seconds
+        self.calls = 0
+
+    def fetch_forecast(self, latitude: float, longitude: float) -> Dict:
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return {
+            "next_7_days": self.next_7_days,
+            "next_14_days": self.next_14_days,
+            "recommendation": rainfall_advice(self.next_7_days)
+        }
+
+class OpenWeatherMapProvider(WeatherProvider):
+    """OpenWeatherMap 16-day daily forecast, authenticated with WEATHER_API_KEY"""
+
+    name = "openweathermap"
+    URL = "https://api.openweathermap.org/data/2.5/forecast/daily"
+
+    def __init__(self, api_key: str, timeout: float = 10.0):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def fetch_forecast(self, latitude: float, longitude: float) -> Dict:
+        response = self.session.get(self.URL, timeout=self.timeout, params={
+            "lat": latitude, "lon": longitude, "cnt": 14, "units": "metric", "appid": self.api_key
+        })
+        response.raise_for_status()
+
+        rain = [day.get("rain", 0.0) for day in response.json()["list"]]
+        next_7_days = float(sum(rain[:7]))
+        return {
+            "next_7_days": next_7_days,
+            "next_14_days": float(sum(rain[:14])),
+            "recommendation": rainfall_advice(next_7_days)
+        }
+
+class TTLCache:
+    """Thread-safe mapping whose entries expire ttl seconds after being set"""
+
+    def __init__(self, ttl: float, max_entries: int = 10_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            if len(self._entries) >= self.max_entries:
+                # Dicts keep insertion order, so the first key is the oldest
+                del self._entries[next(iter(self._entries))]
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class WeatherService:
+    """Forecasts from a provider, cached per geo bucket
+
+    Coordinates are snapped to a grid of bucket_degrees cells and the provider
+    is queried once per cell at its centre, so nearby farms share a fetch.
+    """
+
+    def __init__(self, provider: WeatherProvider, ttl: float = None, bucket_degrees: float = None,
+                 max_concurrency: int = None):
+        self.provider = provider
+        self.bucket_degrees = bucket_degrees or AppConfig.WEATHER_BUCKET_DEGREES
+        self.max_concurrency = max_concurrency or AppConfig.WEATHER_MAX_CONCURRENCY
+        self.cache = TTLCache(ttl if ttl is not None else AppConfig.WEATHER_CACHE_TTL_SECONDS)
+
+    def bucket(self, latitude: float, longitude: float) -> GeoBucket:
+        return (int(np.floor(latitude / self.bucket_degrees)), int(np.floor(longitude / self.bucket_degrees)))
+
+    def bucket_center(self, bucket: GeoBucket) -> Tuple[float, float]:
+        return ((bucket[0] + 0.5) * self.bucket_degrees, (bucket[1] + 0.5) * self.bucket_degrees)
+
+    def get_bucket_forecast(self, bucket: GeoBucket) -> Dict:
+        forecast = self.cache.get(bucket)
+        if forecast is None:
+            forecast = self.provider.fetch_forecast(*self.bucket_center(bucket))
+            self.cache.set(bucket, forecast)
+        return forecast
+
+    def get_forecast(self, latitude: float, longitude: float) -> Dict:
+        """Forecast for one location"""
+        return self.get_bucket_forecast(self.bucket(latitude, longitude))
+
+    async def _fetch_buckets(self, buckets: List[GeoBucket]) -> Dict[GeoBucket, Optional[Dict]]:
+        loop = asyncio.get_running_loop()
+
+        # The pool size is the concurrency limit: providers are blocking HTTP clients
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="weather") as pool:
+            async def fetch(bucket):
+                try:
+                    return bucket, await loop.run_in_executor(pool, self.get_bucket_forecast, bucket)
+                except Exception:
+                    logger.exception("Forecast fetch failed for bucket %s", bucket)
+                    return bucket, None
+
+            return dict(await asyncio.gather(*(fetch(bucket) for bucket in buckets)))
+
+    def get_forecasts_bulk(self, buckets: Iterable[GeoBucket]) -> Dict[GeoBucket, Optional[Dict]]:
+        """Forecasts for many buckets, fetching uncached ones concurrently
+
+        At most max_concurrency provider calls are in flight at once. Buckets
+        whose fetch fails map to None. Must not be called from a running event loop.
+        """
+
+        results = {}
+        missing = []
+        for bucket in set(buckets):
+            forecast = self.cache.get(bucket)
+            if forecast is None:
+                missing.append(bucket)
+            else:
+                results[bucket] = forecast
+
+        if missing:
+            results.update(asyncio.run(self._fetch_buckets(missing)))
+        return results
+
+    def attach_rainfall_advice(self, farms: pd.DataFrame) -> pd.DataFrame:
+        """Add rainfall and timing advice columns to a frame with latitude/longitude
+
+        One forecast is fetched per distinct geo bucket in the frame.
+        """
+
+        missing = [col for col in ("latitude", "longitude") if col not in farms.columns]
+        if missing:
+            raise ValueError(f"Rainfall advice needs columns: {', '.join(missing)}")
+
+        lat = pd.to_numeric(farms["latitude"], errors="coerce").to_numpy(dtype=np.float64)
+        lon = pd.to_numeric(farms["longitude"], errors="coerce").to_numpy(dtype=np.float64)
+        located = ~(np.isnan(lat) | np.isnan(lon))
+
+        cells = np.column_stack([np.floor(lat[located] / self.bucket_degrees),
+                                 np.floor(lon[located] / self.bucket_degrees)]).astype(np.int64)
+        unique_cells, inverse = np.unique(cells, axis=0, return_inverse=True)
+        buckets = [tuple(int(v) for v in cell) for cell in unique_cells]
+        forecasts = self.get_forecasts_bulk(buckets)
+
+        rain_7 = np.full(len(farms), np.nan)
+        advice = np.full(len(farms), None, dtype=object)
+        bucket_rain = np.array([f["next_7_days"] if f else np.nan for f in (forecasts[b] for b in buckets)])
+        bucket_advice = np.array([f["recommendation"] if f else None for f in (forecasts[b] for b in buckets)],
+                                 dtype=object)
+        rain_7[located] = bucket_rain[inverse.ravel()]
+        advice[located] = bucket_advice[inverse.ravel()]
+
+        return farms.assign(rainfall_next_7_days_mm=rain_7, timing_advice=advice)
+
+_service: Optional[WeatherService] = None
+_service_lock = threading.Lock()
+
+def get_weather_service() -> WeatherService:
+    """Process-wide service: OpenWeatherMap when WEATHER_API_KEY is set, else the stub"""
+
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                if AppConfig.WEATHER_API_KEY:
+                    provider = OpenWeatherMapProvider(AppConfig.WEATHER_API_KEY)
+                else:
+                    provider = StubWeatherProvider()
+                _service = WeatherService(provider)
+    return _service
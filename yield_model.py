@@ -0,0 +1,207 @@
+# Yield prediction model for Northern Nigeria Fertilizer Advisor
+import argparse
+import os
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import AppConfig
+from utils import NutrientCalculator
+
+FEATURE_COLUMNS = ["n_percent", "p_ppm", "k_ppm", "ph", "n_rate", "p_rate", "k_rate",
+                   "latitude", "longitude", "previous_yield"]
+TARGET_COLUMN = "yield"
+
+# Used when a farm has no soil pH or coordinates
+DEFAULT_PH = 6.5
+
+def build_training_frame(n_samples: int = 50_000, seed: int = 0) -> pd.DataFrame:
+    """Synthetic training set from the Mitscherlich response, adjusted for soil status
+
+    Stands in for field trial data until enough adoption records are collected;
+    any frame with FEATURE_COLUMNS and a yield column can be passed to
+    train_yield_model instead.
+    """
+
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "n_percent": rng.uniform(0.3, 3.0, n_samples),
+        "p_ppm": rng.uniform(2, 50, n_samples),
+        "k_ppm": rng.uniform(50, 400, n_samples),
+        "ph": rng.uniform(4.5, 8.0, n_samples),
+        "n_rate": rng.uniform(0, 150, n_samples),
+        "p_rate": rng.uniform(0, 90, n_samples),
+        "k_rate": rng.uniform(0, 70, n_samples),
+        "latitude": rng.uniform(10, 14, n_samples),
+        "longitude": rng.uniform(3.5, 13.5, n_samples),
+        "previous_yield": rng.uniform(600, 4500, n_samples)
+    })
+
+    # Native fertility supplies part of each nutrient, so low-status soils respond more
+    response = NutrientCalculator.estimate_yield_response(
+        frame["previous_yield"].to_numpy(),
+        frame["n_rate"].to_numpy() + 20 * frame["n_percent"].to_numpy(),
+        frame["p_rate"].to_numpy() + frame["p_ppm"].to_numpy(),
+        frame["k_rate"].to_numpy() + 0.1 * frame["k_ppm"].to_numpy()
+    )
+    ph_penalty = 1 - 0.08 * np.abs(frame["ph"].to_numpy() - 6.5)
+    # Rainfall rises southwards across the region
+    rainfall_factor = 1 + 0.05 * (12 - frame["latitude"].to_numpy())
+    noise = rng.normal(1.0, 0.08, n_samples)
+    frame[TARGET_COLUMN] = np.maximum(response * ph_penalty * rainfall_factor * noise, 0)
+    return frame
+
+def train_yield_model(training: pd.DataFrame, n_estimators: int = 100, max_depth: int = 14, seed: int = 0):
+    """Fit a random forest on FEATURE_COLUMNS -> yield"""
+
+    from sklearn.ensemble import RandomForestRegressor
+
+    model = RandomForestRegressor(n_estimators=n_estimators, max_depth=max_depth, min_samples_leaf=5,
+                                  n_jobs=-1, random_state=seed)
+    model.fit(training[FEATURE_COLUMNS].to_numpy(dtype=np.float32), training[TARGET_COLUMN].to_numpy())
+    return model
+
+class ForestModel:
+    """Random forest flattened into node arrays for memory-mapped serving
+
+    sklearn trees copy their nodes into private buffers when unpickled, so a
+    fitted RandomForestRegressor cannot be shared between processes through
+    mmap. All trees are stored as one set of plain NumPy arrays instead, which
+    joblib maps read-only straight from the page cache.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.arrays = arrays
+        self.roots = arrays["roots"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.value = arrays["value"]
+        self.max_depth = int(arrays["max_depth"])
+
+    @classmethod
+    def from_sklearn(cls, forest) -> "ForestModel":
+        """Concatenate the trees of a fitted RandomForestRegressor"""
+
+        left, right, feature, threshold, value, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left < 0
+            roots.append(offset)
+            left.append(np.where(is_leaf, -1, tree.children_left + offset))
+            right.append(np.where(is_leaf, -1, tree.children_right + offset))
+            feature.append(np.where(is_leaf, -1, tree.feature))
+            threshold.append(tree.threshold)
+            value.append(tree.value[:, 0, 0])
+            offset += tree.node_count
+
+        return cls({
+            "roots": np.array(roots, dtype=np.int64),
+            "left": np.concatenate(left).astype(np.int64),
+            "right": np.concatenate(right).astype(np.int64),
+            "feature": np.concatenate(feature).astype(np.int16),
+            "threshold": np.concatenate(threshold).astype(np.float64),
+            "value": np.concatenate(value).astype(np.float64),
+            "max_depth": np.array(max(e.tree_.max_depth for e in forest.estimators_))
+        })
+
+    def predict(self, features: np.ndarray, chunk_rows: int = 8192) -> np.ndarray:
+        """Mean leaf value over all trees, walking every tree for a batch in lock-step"""
+
+        features = np.asarray(features, dtype=np.float32)
+        predictions = np.empty(len(features))
+        for start in range(0, len(features), chunk_rows):
+            batch = features[start:start + chunk_rows]
+            rows = np.arange(len(batch))[:, None]
+            nodes = np.repeat(self.roots[None, :], len(batch), axis=0)
+            for _ in range(self.max_depth):
+                feature = self.feature[nodes]
+                is_leaf = feature < 0
+                if is_leaf.all():
+                    break
+                go_left = batch[rows, np.maximum(feature, 0)] <= self.threshold[nodes]
+                nodes = np.where(is_leaf, nodes, np.where(go_left, self.left[nodes], self.right[nodes]))
+            predictions[start:start + chunk_rows] = self.value[nodes].mean(axis=1)
+        return predictions
+
+def save_yield_model(model, path: Optional[str] = None) -> str:
+    """Write the flattened forest uncompressed so it can be memory-mapped on load"""
+
+    import joblib
+
+    if not isinstance(model, ForestModel):
+        model = ForestModel.from_sklearn(model)
+
+    path = path or AppConfig.YIELD_MODEL_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    joblib.dump(model.arrays, tmp_path, compress=0)
+    os.replace(tmp_path, path)  # Workers never see a half-written file
+    return path
+
+_model: Optional[ForestModel] = None
+_model_version = None
+_model_lock = threading.Lock()
+
+def yield_model_available(path: Optional[str] = None) -> bool:
+    return os.path.exists(path or AppConfig.YIELD_MODEL_PATH)
+
+def load_yield_model(path: Optional[str] = None) -> ForestModel:
+    """Process-wide model, memory-mapped so worker processes share its pages
+
+    Reloaded only when the artifact's mtime changes.
+    """
+
+    global _model, _model_version
+    import joblib
+
+    path = path or AppConfig.YIELD_MODEL_PATH
+    version = (path, os.stat(path).st_mtime_ns)
+    if _model is not None and _model_version == version:
+        return _model
+
+    with _model_lock:
+        if _model is None or _model_version != version:
+            _model, _model_version = ForestModel(joblib.load(path, mmap_mode="r")), version
+    return _model
+
+def feature_frame(farms: pd.DataFrame) -> pd.DataFrame:
+    """FEATURE_COLUMNS from a farm frame, filling pH and coordinates with defaults"""
+
+    defaults = {"ph": DEFAULT_PH, "latitude": AppConfig.DEFAULT_LATITUDE, "longitude": AppConfig.DEFAULT_LONGITUDE}
+    features = pd.DataFrame(index=farms.index)
+    for col in FEATURE_COLUMNS:
+        if col in farms.columns:
+            features[col] = pd.to_numeric(farms[col], errors="coerce")
+            if col in defaults:
+                features[col] = features[col].fillna(defaults[col])
+        else:
+            features[col] = defaults.get(col, np.nan)
+    return features
+
+def predict_yield(farms: pd.DataFrame) -> np.ndarray:
+    """Predicted yield (kg/ha) for every row, in one batched predict call"""
+
+    features = feature_frame(farms).to_numpy(dtype=np.float32)
+    return load_yield_model().predict(features)
+
+def add_model_yield(results: pd.DataFrame) -> pd.DataFrame:
+    """Add a model_yield column to bulk recommendation output"""
+
+    farms = results.rename(columns={"p2o5_rate": "p_rate", "k2o_rate": "k_rate"})
+    return results.assign(model_yield=predict_yield(farms))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train and save the yield prediction model")
+    parser.add_argument("command", choices=["train"])
+    parser.add_argument("--data", help="CSV with feature columns and a yield column (default: synthetic)")
+    parser.add_argument("--samples", type=int, default=50_000, help="Synthetic training rows")
+    parser.add_argument("--out", default=AppConfig.YIELD_MODEL_PATH)
+    args = parser.parse_args()
+
+    training = pd.read_csv(args.data) if args.data else build_training_frame(args.samples)
+    print(f"Saved model trained on {len(training):,} rows to {save_yield_model(train_yield_model(training), args.out)}")